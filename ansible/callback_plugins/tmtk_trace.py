@@ -0,0 +1,53 @@
+"""
+Ansible callback plugin that records how long each task took on each host,
+for tm-testkit's --profile flag. Records are appended as JSON lines to the
+file named by the TMTK_ANSIBLE_TRACE environment variable.
+"""
+
+import json
+import os
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "aggregate"
+    CALLBACK_NAME = "tmtk_trace"
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+        self.output = os.environ.get("TMTK_ANSIBLE_TRACE", None)
+        self.starts = dict()
+
+    def record(self, result, status):
+        host = result._host.get_name()
+        task = result._task
+        start = self.starts.pop((host, task._uuid), None)
+        if self.output is None or start is None:
+            return
+        with open(self.output, "at") as f:
+            f.write(json.dumps({
+                "host": host,
+                "task": task.get_name(),
+                "start": start,
+                "end": time.time(),
+                "status": status,
+            }) + "\n")
+
+    def v2_runner_on_start(self, host, task):
+        self.starts[(host.get_name(), task._uuid)] = time.time()
+
+    def v2_runner_on_ok(self, result):
+        self.record(result, "ok")
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self.record(result, "failed")
+
+    def v2_runner_on_skipped(self, result):
+        self.record(result, "skipped")
+
+    def v2_runner_on_unreachable(self, result):
+        self.record(result, "unreachable")
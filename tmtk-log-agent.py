@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Summarizes a Tendermint node's log on the node itself, for tm-testkit's
+"network fetch_logs --summarize", so that only a compact JSON summary has to
+be sent back instead of the raw log. The summary covers per-height consensus
+timing, counts of log levels, events and error messages, peer connections and
+disconnections, and raw excerpts of the log around anomalies (errors,
+timeouts, round changes and unusually slow heights).
+
+The log is read line by line, so memory use doesn't grow with its size. Only
+the standard library is used, so that it runs on any host with Python 3. To
+try it out on a sample log:
+
+    python3 tmtk-log-agent.py /path/to/tendermint.log
+"""
+
+import argparse
+import calendar
+import collections
+import functools
+import gzip
+import json
+import os
+import re
+import sys
+
+# The log events we look for, along with the messages that Tendermint logs for
+# each of them (keep in sync with LOG_EVENTS in tmtk.py).
+LOG_EVENTS = [
+    ("new_round", [b"entering new round"]),
+    ("proposal", [b"received complete proposal block"]),
+    ("commit", [b"finalizing commit of block"]),
+    ("timeout", [b"Timed out", b"timed out"]),
+    ("peer_added", [b"Added peer", b"added peer", b"peer connected"]),
+    ("peer_removed", [b"Stopping peer for error", b"stopping peer for error", b"peer disconnected"]),
+]
+
+LOG_EVENTS_RE = re.compile(b"|".join(
+    b"(?P<" + name.encode("utf-8") + b">" + b"|".join(re.escape(msg) for msg in msgs) + b")"
+    for name, msgs in LOG_EVENTS
+))
+
+# Searching every line with LOG_EVENTS_RE is slow, so only lines that contain
+# one of these (which every event message does) are searched.
+LOG_EVENT_HINTS = (b"new round", b"proposal block", b"commit of", b"imed out", b"peer")
+
+# Matches both the Tendermint v0.34 ("I[2021-01-01|12:00:00.000] ...") and
+# v0.35 ("2021-01-01T12:00:00Z INFO ...") plain log line prefixes.
+LOG_PREFIX_RE = re.compile(
+    rb"^(?:(?P<level>[DIEW])\[(?P<date>\d{4}-\d\d-\d\d)\|(?P<time>\d\d:\d\d:\d\d(?:\.\d+)?)\]|"
+    rb"(?P<iso>\d{4}-\d\d-\d\d)T(?P<isotime>\d\d:\d\d:\d\d(?:\.\d+)?)(?P<tz>Z|[+-]\d\d:?\d\d)?\s+(?P<isolevel>[A-Za-z]+))\s*"
+)
+
+LOG_HEIGHT_RE = re.compile(rb"\bheight=(\d+)")
+LOG_ROUND_RE = re.compile(rb"\bround=(\d+)")
+LOG_PEER_RE = re.compile(rb"\bpeer=\"?(?:Peer\{[^ ]* )?([0-9a-fA-F]{40}|[^\s\"}]+)")
+# The start of the key=value pairs that follow a log line's message
+LOG_FIELDS_RE = re.compile(rb"\s[\w.-]+=")
+
+LOG_LEVELS = {b"D": "debug", b"I": "info", b"W": "warn", b"E": "error"}
+
+# Caps on the size of the summary, however large or noisy the log
+MAX_LINE_BYTES = 500
+MAX_EXCERPT_LINES = 100
+MAX_ERROR_MESSAGES = 100
+MAX_PEER_EVENTS = 1000
+# How many recent block intervals a height is compared with to tell whether
+# it was slow
+SLOW_HEIGHT_WINDOW = 100
+SLOW_HEIGHT_MIN_SAMPLES = 10
+
+
+@functools.lru_cache(maxsize=64)
+def day_start_ms(date: bytes) -> int:
+    year, month, day = (int(v) for v in date.split(b"-"))
+    return calendar.timegm((year, month, day, 0, 0, 0)) * 1000
+
+
+def parse_prefix(line: bytes):
+    """Returns the timestamp (in milliseconds since the epoch, UTC) and
+    message of the given log line, or None for lines without a recognizable
+    prefix (e.g. stack traces)."""
+    m = LOG_PREFIX_RE.match(line)
+    if m is None:
+        return None
+    if m.group("iso") is not None:
+        date, tod, tz = m.group("iso"), m.group("isotime"), m.group("tz")
+    else:
+        date, tod, tz = m.group("date"), m.group("time"), None
+    hms, _, frac = tod.partition(b".")
+    hour, minute, second = (int(v) for v in hms.split(b":"))
+    ts = day_start_ms(date) + ((hour * 60 + minute) * 60 + second) * 1000 + int((frac + b"000")[:3])
+    if tz and tz != b"Z":
+        sign = 1 if tz[:1] == b"+" else -1
+        tz = tz[1:].replace(b":", b"")
+        ts -= sign * (int(tz[:2]) * 60 + int(tz[2:])) * 60000
+    rest = line[m.end():]
+    fields = LOG_FIELDS_RE.search(rest)
+    message = rest[:fields.start()] if fields is not None else rest
+    return ts, message.strip()
+
+
+class LogSummarizer:
+    """Accumulates the summary of a log from its lines, in order."""
+
+    def __init__(self, context: int = 5, max_excerpts: int = 50, slow_factor: float = 3.0):
+        self.context = context
+        self.max_excerpts = max_excerpts
+        self.slow_factor = slow_factor
+        self.lines = 0
+        self.bytes = 0
+        self.first_ms = None
+        self.last_ms = None
+        self.levels = collections.Counter()
+        self.events = collections.OrderedDict((name, 0) for name, _ in LOG_EVENTS)
+        self.heights = []
+        self.pending = dict()
+        self.intervals = collections.deque(maxlen=SLOW_HEIGHT_WINDOW)
+        self.last_commit_ms = None
+        self.errors = collections.OrderedDict()
+        self.other_errors = 0
+        self.peer_events = []
+        self.anomalies = collections.Counter()
+        self.excerpts = []
+        self.recent = collections.deque(maxlen=context)
+        self.capturing = None
+        self.remaining = 0
+        self.last_line = None
+
+    def add(self, line: bytes):
+        self.lines += 1
+        self.bytes += len(line)
+        line = line.rstrip(b"\r\n")
+        # most lines only need their level, which is cheap to find; only
+        # errors and events need their timestamp and message
+        level = None
+        if line[1:2] == b"[":
+            level = LOG_LEVELS.get(line[:1])
+        elif line[4:5] == b"-" and line[:1].isdigit():
+            space = line.find(b" ")
+            level = LOG_LEVELS.get(line[space + 1:space + 2].upper())
+        if level is None:
+            self.capture(line, self.last_ms, [])
+            return
+        self.levels[level] += 1
+        self.last_line = line
+        m = None
+        for hint in LOG_EVENT_HINTS:
+            if hint in line:
+                m = LOG_EVENTS_RE.search(line)
+                break
+        if m is None and level != "error" and self.first_ms is not None:
+            self.capture(line, self.last_ms, [])
+            return
+        prefix = parse_prefix(line)
+        if prefix is None:
+            self.capture(line, self.last_ms, [])
+            return
+        ts, message = prefix
+        if self.first_ms is None:
+            self.first_ms = ts
+        self.last_ms = ts
+        reasons = []
+        if level == "error":
+            self.add_error(ts, message, line)
+            reasons.append("error")
+        if m is not None:
+            reasons.extend(self.add_event(ts, m.lastgroup, line))
+        self.capture(line, ts, reasons)
+
+    def add_error(self, ts: int, message: bytes, line: bytes):
+        key = message[:200].decode("utf-8", errors="replace")
+        if key not in self.errors and len(self.errors) >= MAX_ERROR_MESSAGES:
+            self.other_errors += 1
+            return
+        error = self.errors.setdefault(key, {
+            "message": key,
+            "count": 0,
+            "first_ms": ts,
+            "last_ms": ts,
+            "sample": line[:MAX_LINE_BYTES].decode("utf-8", errors="replace"),
+        })
+        error["count"] += 1
+        error["last_ms"] = ts
+
+    def add_event(self, ts: int, event: str, line: bytes):
+        """Records the given event, returning the reasons (if any) for which
+        it is an anomaly."""
+        self.events[event] += 1
+        if event == "timeout":
+            return ["timeout"]
+        if event in ("peer_added", "peer_removed"):
+            if len(self.peer_events) < MAX_PEER_EVENTS:
+                peer = LOG_PEER_RE.search(line)
+                self.peer_events.append([ts, event, peer.group(1).decode("utf-8", errors="replace") if peer else None])
+            return ["peer_removed"] if event == "peer_removed" else []
+        height = LOG_HEIGHT_RE.search(line)
+        if height is None:
+            return []
+        height = int(height.group(1))
+        # height -> [height, start_ms, proposal_ms, commit_ms, max_round]
+        row = self.pending.setdefault(height, [height, None, None, None, 0])
+        reasons = []
+        if event == "new_round":
+            rnd = LOG_ROUND_RE.search(line)
+            rnd = int(rnd.group(1)) if rnd else 0
+            if row[1] is None:
+                row[1] = ts
+            if rnd > row[4]:
+                if row[4] == 0:
+                    reasons.append("round_change")
+                row[4] = rnd
+        elif event == "proposal":
+            if row[2] is None:
+                row[2] = ts
+        elif event == "commit" and row[3] is None:
+            row[3] = ts
+            if self.last_commit_ms is not None:
+                interval = ts - self.last_commit_ms
+                if len(self.intervals) >= SLOW_HEIGHT_MIN_SAMPLES and \
+                        interval > self.slow_factor * sorted(self.intervals)[len(self.intervals) // 2]:
+                    reasons.append("slow_height")
+                self.intervals.append(interval)
+            self.last_commit_ms = ts
+            self.heights.append(row)
+            del self.pending[height]
+            # forget heights that were abandoned without a commit
+            for stale in [h for h in self.pending if h < height - 100]:
+                del self.pending[stale]
+        return reasons
+
+    def capture(self, line: bytes, ts: int, reasons: list):
+        """Keeps the lines around anomalies: the `context` lines before the
+        first anomaly, and up to `context` lines after the last of the
+        anomalies that follow each other closely."""
+        line = line[:MAX_LINE_BYTES]
+        for reason in reasons:
+            self.anomalies[reason] += 1
+        if self.capturing is not None:
+            excerpt = self.capturing
+            excerpt["lines"].append(line.decode("utf-8", errors="replace"))
+            if reasons:
+                excerpt["reasons"] = sorted(set(excerpt["reasons"]) | set(reasons))
+                self.remaining = self.context
+            else:
+                self.remaining -= 1
+            if self.remaining <= 0 or len(excerpt["lines"]) >= MAX_EXCERPT_LINES:
+                self.capturing = None
+        elif reasons and len(self.excerpts) < self.max_excerpts:
+            self.capturing = {
+                "line": self.lines,
+                "time_ms": ts,
+                "reasons": sorted(set(reasons)),
+                "lines": [l.decode("utf-8", errors="replace") for l in self.recent] + [line.decode("utf-8", errors="replace")],
+            }
+            self.remaining = self.context
+            self.excerpts.append(self.capturing)
+            if self.context == 0:
+                self.capturing = None
+        self.recent.append(line)
+
+    def summary(self) -> dict:
+        if self.last_line is not None:
+            prefix = parse_prefix(self.last_line)
+            if prefix is not None:
+                self.last_ms = prefix[0]
+        return collections.OrderedDict([
+            ("lines", self.lines),
+            ("bytes", self.bytes),
+            ("first_ms", self.first_ms),
+            ("last_ms", self.last_ms),
+            ("levels", collections.OrderedDict(sorted(self.levels.items()))),
+            ("events", self.events),
+            ("heights", collections.OrderedDict([
+                ("columns", ["height", "start_ms", "proposal_ms", "commit_ms", "max_round"]),
+                ("rows", self.heights),
+            ])),
+            ("errors", sorted(self.errors.values(), key=lambda e: -e["count"])),
+            ("other_errors", self.other_errors),
+            ("peers", collections.OrderedDict([
+                ("added", self.events["peer_added"]),
+                ("removed", self.events["peer_removed"]),
+                ("events", self.peer_events),
+            ])),
+            ("anomalies", collections.OrderedDict(sorted(self.anomalies.items()))),
+            ("excerpts", self.excerpts),
+        ])
+
+
+def summarize_log(filename: str, offset: int = 0, **kwargs) -> dict:
+    """Summarizes the given log file from the given byte offset onwards."""
+    summarizer = LogSummarizer(**kwargs)
+    size = os.path.getsize(filename) if os.path.isfile(filename) else 0
+    if offset > size:
+        offset = 0
+    if size > 0:
+        with open(filename, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                summarizer.add(line)
+    summary = summarizer.summary()
+    summary["log_file"] = filename
+    summary["log_size"] = size
+    summary["offset"] = offset
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a Tendermint log")
+    parser.add_argument("log_file", help="The log file to summarize")
+    parser.add_argument("--offset", type=int, default=0, help="The byte offset from which to summarize the log (default: 0)")
+    parser.add_argument("--context", type=int, default=5, help="The number of lines to keep before and after each anomaly (default: 5)")
+    parser.add_argument("--max-excerpts", type=int, default=50, help="The maximum number of excerpts to keep (default: 50)")
+    parser.add_argument("--slow-factor", type=float, default=3.0,
+        help="How many times longer than the median recent block interval a height must take to count as slow (default: 3)")
+    parser.add_argument("--gzip", action="store_true", help="Compress the summary")
+    args = parser.parse_args()
+    summary = summarize_log(
+        args.log_file,
+        offset=args.offset,
+        context=args.context,
+        max_excerpts=args.max_excerpts,
+        slow_factor=args.slow_factor,
+    )
+    data = json.dumps(summary, separators=(",", ":")).encode("utf-8")
+    if args.gzip:
+        data = gzip.compress(data, compresslevel=6)
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -24,15 +24,98 @@ import json
 import datetime
 import base64
 import tempfile
+import concurrent.futures
+import asyncio
+import zlib
+import mmap
+import array
+import csv
+import collections
+import multiprocessing
+import urllib.parse
+import queue
+import itertools
+import struct
+import sqlite3
+import random
+import math
+import threading
+import glob
+import signal
+import socket
 
 import yaml
 import colorlog
 import requests
 import toml
 import pytz
+import numpy as np
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives import serialization
 
 logger = logging.getLogger("")
 
+class Tracer:
+    """Collects timed events for export in the Chrome trace event format
+    (which Perfetto also reads). Events are grouped into named tracks, e.g.
+    one for the main process and one per host. Nothing is recorded unless
+    the tracer is enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.tracks = OrderedDict()
+
+    def track_id(self, track: str) -> int:
+        if track not in self.tracks:
+            self.tracks[track] = len(self.tracks)
+        return self.tracks[track]
+
+    def add(self, name: str, start: float, duration: float, track: str = "tmtk", cat: str = "phase", args: dict = None):
+        """Records an event that started at the given UNIX time and lasted
+        for the given number of seconds."""
+        if not self.enabled:
+            return
+        self.events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": int(start * 1000000),
+            "dur": int(duration * 1000000),
+            "pid": 1,
+            "tid": self.track_id(track),
+            "args": args or dict(),
+        })
+
+    def export(self, filename: str):
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": track}}
+            for track, tid in self.tracks.items()
+        ]
+        with open(filename, "wt") as f:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f)
+        logger.debug("Wrote trace with %d event(s) to %s", len(self.events), filename)
+
+    def summary(self) -> List[tuple]:
+        """Aggregates the recorded events by category and name, returning
+        (category, name, count, total, mean, max) tuples, in seconds,
+        ordered by total duration."""
+        totals = OrderedDict()
+        for event in self.events:
+            key = (event["cat"], event["name"])
+            count, total, longest = totals.get(key, (0, 0, 0))
+            totals[key] = (count + 1, total + event["dur"], max(longest, event["dur"]))
+        return sorted(
+            [
+                (cat, name, count, total / 1e6, total / count / 1e6, longest / 1e6)
+                for (cat, name), (count, total, longest) in totals.items()
+            ],
+            key=lambda row: row[3],
+            reverse=True,
+        )
+
+TRACER = Tracer()
+
 def main():
     parser = argparse.ArgumentParser(
         description="Test kit for Tendermint testnet",
@@ -54,6 +137,18 @@ def main():
         default=False,
         help="Increase output verbosity",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="Record how long each phase of the command takes (including per-host Ansible tasks), print a summary and export a Chrome trace/Perfetto JSON file to <home>/traces",
+    )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        default=False,
+        help="Run the network as separate Tendermint processes on this machine instead of on remote hosts. The tendermint binary is taken from $TMTEST_TENDERMINT_BINARY, or otherwise the PATH",
+    )
     subparsers = parser.add_subparsers(
         required=True,
         dest="command",
@@ -81,6 +176,35 @@ def main():
         action="store_true",
         help="If this flag is specified and configuration is already present for a particular node group, it will not be overwritten/regenerated",
     )
+    parser_network_deploy.add_argument(
+        "--force",
+        action="store_true",
+        help="Redeploy to all hosts, even those whose configuration and binary have not changed since the last deployment",
+    )
+    parser_network_deploy.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of worker processes to use when generating node configuration (default: the number of CPUs)",
+    )
+    parser_network_deploy.add_argument(
+        "--fanout",
+        type=int,
+        default=0,
+        help="Upload the Tendermint binary to a single host, and have each host that has it pass it on to this many others over their private IPs, instead of uploading it to every host from here. Hosts that already have the binary are skipped (default: 0, i.e. upload to every host)",
+    )
+    parser_network_deploy.add_argument(
+        "--nodes",
+        type=int,
+        default=4,
+        help="With --local, the number of nodes to run (default: 4)",
+    )
+    parser_network_deploy.add_argument(
+        "--base-port",
+        type=int,
+        default=LOCAL_BASE_PORT,
+        help="With --local, the first port to assign to the nodes. Each node uses %d consecutive ports (default: %d)" % (LOCAL_NODE_PORTS, LOCAL_BASE_PORT),
+    )
 
     # network destroy
     parser_network_destroy = subparsers_network.add_parser(
@@ -110,6 +234,22 @@ def main():
         action="store_true",
         help="By default, this command fails if a group/node reference has not yet been deployed. Specifying this flag will just skip that group/node instead.",
     )
+    parser_network_start.add_argument(
+        "--wait",
+        action="store_true",
+        help="Wait until the started nodes have connected to all of their peers and committed their first block. When starting the whole network, the startup times are recorded in the results database",
+    )
+    parser_network_start.add_argument(
+        "--wait-timeout",
+        type=float,
+        default=300.0,
+        help="With --wait, the number of seconds after which to give up waiting (default: 300)",
+    )
+    parser_network_start.add_argument(
+        "--label",
+        default=None,
+        help="With --wait, the label under which to record the startup times (default: the binary's name in the test plan, or its version)",
+    )
 
     # network stop
     parser_network_stop = subparsers_network.add_parser(
@@ -133,9 +273,25 @@ def main():
     parser_network_fetch_logs = subparsers_network.add_parser(
         "fetch_logs",
         help="Fetch the logs for one or more node(s) or node group(s). " +
-            "Note that this stops any running service instances on the target " +
-            "nodes prior to fetching the logs, and then restarts those instances " +
-            "that were running previously.",
+            "Logs are streamed from the running nodes without stopping them, " +
+            "and only data written since the previous fetch is transferred.",
+    )
+    parser_network_fetch_logs.add_argument(
+        "node_or_group_ids",
+        metavar="node_or_group_id",
+        nargs="*",
+        help="Zero or more node or group IDs of network node(s) whose logs must be fetched. If this is not supplied, logs will be fetched from all nodes."
+    )
+    parser_network_fetch_logs.add_argument(
+        "--no-fail-on-missing",
+        default=False,
+        action="store_true",
+        help="By default, this command fails if a group/node reference has not yet been deployed. Specifying this flag will just skip that group/node instead.",
+    )
+    parser_network_fetch_logs.add_argument(
+        "--summarize",
+        action="store_true",
+        help="Instead of fetching the raw logs, summarize them on each node and only fetch the summaries (per-height timing, error counts, peer events and excerpts around anomalies), which are then analyzed like \"logs analyze\" does",
     )
 
     # network reset
@@ -150,9 +306,122 @@ def main():
     )
 
     # network info
-    subparsers_network.add_parser(
+    parser_network_info = subparsers_network.add_parser(
         "info",
-        help="Show information about a deployed network (e.g. hostnames and node IDs)",
+        help="Show information about a deployed network (e.g. hostnames and node IDs), along with each node's current height, catch-up state and RPC response time",
+    )
+    parser_network_info.add_argument(
+        "node_or_group_ids",
+        metavar="node_or_group_id",
+        nargs="*",
+        help="Zero or more node or group IDs of network node(s) to show. If this is not supplied, all nodes will be shown."
+    )
+    parser_network_info.add_argument(
+        "--no-fail-on-missing",
+        default=False,
+        action="store_true",
+        help="By default, this command fails if a group/node reference has not yet been deployed. Specifying this flag will just skip that group/node instead.",
+    )
+    parser_network_info.add_argument(
+        "--rpc-timeout",
+        type=float,
+        default=2.0,
+        help="The number of seconds to wait for each node's status (default: 2.0)",
+    )
+    parser_network_info.add_argument(
+        "-o", "--output",
+        default=None,
+        help="A JSON file to which to also write the network information",
+    )
+
+    # network metrics
+    parser_network_metrics = subparsers_network.add_parser(
+        "metrics",
+        help="Generate a Prometheus scrape configuration for the deployed network, and poll all nodes' Prometheus metrics endpoints, recording derived block interval, TPS and mempool size series",
+    )
+    parser_network_metrics.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="The number of seconds between polls (default: 1.0)",
+    )
+    parser_network_metrics.add_argument(
+        "--duration",
+        type=float,
+        default=60.0,
+        help="The number of seconds for which to poll the nodes' metrics, or 0 to only generate the scrape configuration (default: 60)",
+    )
+    parser_network_metrics.add_argument(
+        "--scrape-config",
+        default=None,
+        help="An additional path to which to write the generated Prometheus scrape configuration (e.g. ./prometheus.yml)",
+    )
+
+    # network blocks
+    parser_network_blocks = subparsers_network.add_parser(
+        "blocks",
+        help="Fetch block metadata for a range of heights from the deployed nodes (caching it locally), and report per-block transaction counts, sizes and inter-block times",
+    )
+    parser_network_blocks.add_argument(
+        "--from-height",
+        type=int,
+        default=1,
+        help="The first height to fetch (default: 1)",
+    )
+    parser_network_blocks.add_argument(
+        "--to-height",
+        type=int,
+        default=None,
+        help="The last height to fetch (default: the latest height)",
+    )
+    parser_network_blocks.add_argument(
+        "--rate",
+        type=float,
+        default=50.0,
+        help="The maximum number of RPC requests per second to send across all nodes (default: 50)",
+    )
+    parser_network_blocks.add_argument(
+        "--with-results",
+        action="store_true",
+        help="Also fetch each block's results, to count failed transactions",
+    )
+    parser_network_blocks.add_argument(
+        "--endpoints",
+        default=None,
+        help="A comma-separated list of RPC endpoint URLs to query instead of the deployed nodes",
+    )
+    parser_network_blocks.add_argument(
+        "-o", "--output",
+        default=None,
+        help="The CSV file to which to write per-block statistics (default: <home>/blocks/<chain ID>.csv)",
+    )
+
+    # logs
+    parser_logs = subparsers.add_parser(
+        "logs",
+        help="Log analysis functionality",
+    )
+    subparsers_logs = parser_logs.add_subparsers(
+        required=True,
+        dest="subcommand",
+        help="The log analysis-related command to execute",
+    )
+
+    # logs analyze
+    parser_logs_analyze = subparsers_logs.add_parser(
+        "analyze",
+        help="Index the logs previously fetched through \"network fetch_logs\" and report on block commit timing, round changes and per-node lag",
+    )
+    parser_logs_analyze.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild the log index even if the fetched logs have not changed since it was built",
+    )
+    parser_logs_analyze.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of worker processes to use when parsing logs (default: the number of CPUs)",
     )
 
     # loadtest
@@ -172,6 +441,207 @@ def main():
         "load_test_id", 
         help="The ID of the load test to start",
     )
+    parser_loadtest_start.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of load-generating worker processes to run (default: the number of CPUs)",
+    )
+    parser_loadtest_start.add_argument(
+        "--local-clients",
+        action="store_true",
+        help="Run the load test's client_nodes clients as separate processes on this machine instead of on the hosts in the \"loadtest\" inventory group",
+    )
+    parser_loadtest_start.add_argument(
+        "--label",
+        default=None,
+        help="The label under which to record the run in the results database (e.g. a commit ID). By default, runs are labelled with the name of the matching binary in the test plan's tendermint_binaries, or otherwise its version",
+    )
+    parser_loadtest_start.add_argument(
+        "--endpoints",
+        default=None,
+        help="A comma-separated list of RPC endpoint URLs to target instead of the deployed nodes (e.g. http://127.0.0.1:26657)",
+    )
+    parser_loadtest_start.add_argument(
+        "--capture",
+        action="store_true",
+        help="While the load test runs, take CPU and heap profiles of all nodes at once, and sample the CPU, memory, disk and network usage of their hosts",
+    )
+    parser_loadtest_start.add_argument(
+        "--profile-delay",
+        type=float,
+        default=5.0,
+        help="With --capture, the number of seconds into the load test at which to start profiling (default: 5)",
+    )
+    parser_loadtest_start.add_argument(
+        "--profile-seconds",
+        type=int,
+        default=30,
+        help="With --capture, the number of seconds for which to take CPU profiles, at most until the end of the load test (default: 30)",
+    )
+    parser_loadtest_start.add_argument(
+        "--sample-interval",
+        type=float,
+        default=1.0,
+        help="With --capture, the number of seconds between samples of the hosts' resource usage (default: 1)",
+    )
+
+    # loadtest capacity <id>
+    parser_loadtest_capacity = subparsers_loadtest.add_parser(
+        "capacity",
+        help="Find the highest rate at which the deployed network can sustain a load test: the rate is ramped up until the committed throughput no longer keeps up with it or the p99 latency exceeds the SLO, and then narrowed down by bisection",
+    )
+    parser_loadtest_capacity.add_argument(
+        "load_test_id",
+        help="The ID of the load test to run at each rate (its rate is only used as the starting rate)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of load-generating worker processes to run (default: the number of CPUs)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--label",
+        default=None,
+        help="The label under which to record each probe's run in the results database",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--start-rate",
+        type=float,
+        default=None,
+        help="The first rate to try, in tx/s (default: the load test's rate)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--max-rate",
+        type=float,
+        default=None,
+        help="The highest rate to try, in tx/s (default: no limit)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--precision",
+        type=float,
+        default=0.05,
+        help="Stop narrowing down once the highest sustained and lowest unsustained rates are within this fraction of each other (default: 0.05)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.95,
+        help="The fraction of the offered rate that must be accepted and committed for it to count as sustained (default: 0.95)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--slo-p99-ms",
+        type=float,
+        default=1000.0,
+        help="The highest p99 transaction latency, in milliseconds, at which a rate counts as sustained. Use broadcast_tx_method: commit for this to be the commit latency (default: 1000)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--probe-time",
+        type=int,
+        default=None,
+        help="The number of seconds for which to run each probe (default: the load test's time)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--warmup",
+        type=float,
+        default=5.0,
+        help="The number of seconds at the start of each probe to leave out when measuring the committed throughput (default: 5)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--cooldown",
+        type=float,
+        default=30.0,
+        help="The longest time, in seconds, to wait for the nodes' mempools to drain before each probe (default: 30)",
+    )
+    parser_loadtest_capacity.add_argument(
+        "--confirmations",
+        type=int,
+        default=2,
+        help="The number of times to probe the highest sustained rate again before accepting it (default: 2)",
+    )
+
+    # loadtest replay <trace>
+    parser_loadtest_replay = subparsers_loadtest.add_parser(
+        "replay",
+        help="Replay a recorded trace of RPC calls (one JSON object per line, with the call's \"method\", \"params\" and \"time\" in seconds) against the deployed nodes",
+    )
+    parser_loadtest_replay.add_argument(
+        "trace_file",
+        help="The JSONL trace file to replay",
+    )
+    parser_loadtest_replay.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="The factor by which to speed up the trace's original timing, or 0 to replay it as fast as possible (default: 1)",
+    )
+    parser_loadtest_replay.add_argument(
+        "--concurrency",
+        type=int,
+        default=256,
+        help="The maximum number of calls in flight at once. Once reached, the replay falls behind the trace's schedule (default: 256)",
+    )
+    parser_loadtest_replay.add_argument(
+        "--rewrite-txs",
+        action="store_true",
+        help="Replace the transactions of broadcast_tx_* calls with unique load test transactions of the same size, so that they are not rejected as duplicates and their commit latency can be measured",
+    )
+    parser_loadtest_replay.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Only replay the first this many calls of the trace",
+    )
+    parser_loadtest_replay.add_argument(
+        "--endpoints",
+        default=None,
+        help="A comma-separated list of RPC endpoint URLs to target instead of the deployed nodes (e.g. http://127.0.0.1:26657)",
+    )
+
+    # loadtest report <csv>...
+    parser_loadtest_report = subparsers_loadtest.add_parser(
+        "report",
+        help="Aggregate one or more load test stats CSV files (from \"loadtest start\" or tm-load-test's --stats-output) into a summary",
+    )
+    parser_loadtest_report.add_argument(
+        "stats_files",
+        metavar="stats_file",
+        nargs="+",
+        help="The stats CSV file(s) to aggregate",
+    )
+    parser_loadtest_report.add_argument(
+        "--window",
+        type=float,
+        default=1.0,
+        help="The width, in seconds, of the time windows over which to compute throughput (default: 1.0)",
+    )
+    parser_loadtest_report.add_argument(
+        "--align-start",
+        action="store_true",
+        help="Align the start of each stats file to time zero, instead of aggregating them by absolute time (useful when combining separate runs)",
+    )
+    parser_loadtest_report.add_argument(
+        "--max-points",
+        type=int,
+        default=500,
+        help="The maximum number of points in the reported time series (default: 500)",
+    )
+    parser_loadtest_report.add_argument(
+        "-o", "--output",
+        default="./loadtest-report",
+        help="The path prefix for the report's output files (default: ./loadtest-report)",
+    )
+
+    # loadtest client (used internally by distributed load tests)
+    parser_loadtest_client = subparsers_loadtest.add_parser(
+        "client",
+        help="Run a single load testing client from a JSON specification (used internally by \"loadtest start\")",
+    )
+    parser_loadtest_client.add_argument(
+        "spec",
+        help="The JSON specification of the client's share of the load test",
+    )
 
     # loadtest stop <id>
     parser_loadtest_stop = subparsers_loadtest.add_parser(
@@ -189,9 +659,127 @@ def main():
         help="Stop any currently running load tests",
     )
 
+    # bench
+    parser_bench = subparsers.add_parser(
+        "bench",
+        help="Benchmarking functionality",
+    )
+    subparsers_bench = parser_bench.add_subparsers(
+        required=True,
+        dest="subcommand",
+        help="The benchmarking-related command to execute",
+    )
+
+    # bench sweep <id>
+    parser_bench_sweep = subparsers_bench.add_parser(
+        "sweep",
+        help="Redeploy the network for each point in a parameter sweep's grid, run its load test, and tabulate the resulting throughput and latency. Interrupted sweeps resume from the first incomplete point",
+    )
+    parser_bench_sweep.add_argument(
+        "sweep_id",
+        help="The ID of the sweep to run",
+    )
+    parser_bench_sweep.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of load-generating worker processes to run (default: the number of CPUs)",
+    )
+    parser_bench_sweep.add_argument(
+        "--restart",
+        action="store_true",
+        help="Discard the results of any previous run of this sweep and start it from the beginning",
+    )
+    parser_bench_sweep.add_argument(
+        "--label",
+        default=None,
+        help="The label under which to record the sweep's load test runs in the results database (e.g. a commit ID)",
+    )
+
+    # bench faults <id>
+    parser_bench_faults = subparsers_bench.add_parser(
+        "faults",
+        help="Run a fault schedule's load test against the deployed network while killing, stopping, restarting or partitioning nodes on its timeline, and measure the throughput dip, the time to regain liveness and how quickly nodes catch up",
+    )
+    parser_bench_faults.add_argument(
+        "fault_schedule_id",
+        help="The ID of the fault schedule to run",
+    )
+    parser_bench_faults.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of load-generating worker processes to run (default: the number of CPUs)",
+    )
+    parser_bench_faults.add_argument(
+        "--label",
+        default=None,
+        help="The label under which to record the load test run in the results database",
+    )
+
+    # bench runs
+    parser_bench_runs = subparsers_bench.add_parser(
+        "runs",
+        help="List the most recent load test runs in the results database",
+    )
+    parser_bench_runs.add_argument(
+        "--load-test",
+        dest="load_test_id",
+        default=None,
+        help="Only list runs of this load test",
+    )
+    parser_bench_runs.add_argument(
+        "--last",
+        type=int,
+        default=20,
+        help="The number of runs to list (default: 20)",
+    )
+
+    # bench compare <baseline> <candidate>
+    parser_bench_compare = subparsers_bench.add_parser(
+        "compare",
+        help="Compare the throughput and latency of the recorded load test runs of two Tendermint binaries, and fail if the candidate is significantly slower",
+    )
+    parser_bench_compare.add_argument(
+        "baseline",
+        help="The baseline binary's label, version or hash prefix",
+    )
+    parser_bench_compare.add_argument(
+        "candidate",
+        help="The candidate binary's label, version or hash prefix",
+    )
+    parser_bench_compare.add_argument(
+        "--load-test",
+        dest="load_test_id",
+        default=None,
+        help="Only compare runs of this load test",
+    )
+    parser_bench_compare.add_argument(
+        "--last",
+        type=int,
+        default=10,
+        help="The number of most recent runs of each binary to compare (default: 10)",
+    )
+    parser_bench_compare.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="The significance level of the Mann-Whitney U tests (default: 0.05)",
+    )
+    parser_bench_compare.add_argument(
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="The smallest relative change in a metric's median that counts as a regression (default: 0.05)",
+    )
+
     args = parser.parse_args()
 
     configure_logging(verbose=args.verbose)
+    # Load testing clients are driven entirely by their specification, and may
+    # run on hosts that don't have the test plan
+    if args.command == "loadtest" and args.subcommand == "client":
+        sys.exit(loadtest_client(args.spec))
     # Allow for interpolation of environment variables within YAML files
     configure_env_var_yaml_loading(fail_on_missing=args.fail_on_missing_envvars)
 
@@ -204,8 +792,60 @@ def main():
         "load_test_id": getattr(args, "load_test_id", None),
         "keep_monitoring": getattr(args, "keep_monitoring", False),
         "truncate_logs": getattr(args, "truncate_logs", False),
+        "summarize": getattr(args, "summarize", False),
+        "workers": getattr(args, "workers", None),
+        "force": getattr(args, "force", False),
+        "rebuild": getattr(args, "rebuild", False),
+        "endpoints": getattr(args, "endpoints", None),
+        "local_clients": getattr(args, "local_clients", False),
+        "stats_files": getattr(args, "stats_files", []),
+        "window": getattr(args, "window", 1.0),
+        "align_start": getattr(args, "align_start", False),
+        "max_points": getattr(args, "max_points", 500),
+        "output": getattr(args, "output", None),
+        "interval": getattr(args, "interval", 1.0),
+        "duration": getattr(args, "duration", 60.0),
+        "scrape_config": getattr(args, "scrape_config", None),
+        "from_height": getattr(args, "from_height", 1),
+        "to_height": getattr(args, "to_height", None),
+        "rate": getattr(args, "rate", None),
+        "with_results": getattr(args, "with_results", False),
+        "local": args.local,
+        "nodes": getattr(args, "nodes", 4),
+        "base_port": getattr(args, "base_port", LOCAL_BASE_PORT),
+        "fanout": getattr(args, "fanout", 0),
+        "rpc_timeout": getattr(args, "rpc_timeout", 2.0),
+        "fault_schedule_id": getattr(args, "fault_schedule_id", None),
+        "start_rate": getattr(args, "start_rate", None),
+        "max_rate": getattr(args, "max_rate", None),
+        "precision": getattr(args, "precision", 0.05),
+        "tolerance": getattr(args, "tolerance", 0.95),
+        "slo_p99_ms": getattr(args, "slo_p99_ms", 1000.0),
+        "probe_time": getattr(args, "probe_time", None),
+        "warmup": getattr(args, "warmup", 5.0),
+        "cooldown": getattr(args, "cooldown", 30.0),
+        "confirmations": getattr(args, "confirmations", 2),
+        "capture": getattr(args, "capture", False),
+        "profile_delay": getattr(args, "profile_delay", 5.0),
+        "profile_seconds": getattr(args, "profile_seconds", 30),
+        "sample_interval": getattr(args, "sample_interval", 1.0),
+        "trace_file": getattr(args, "trace_file", None),
+        "speed": getattr(args, "speed", 1.0),
+        "concurrency": getattr(args, "concurrency", 256),
+        "rewrite_txs": getattr(args, "rewrite_txs", False),
+        "limit": getattr(args, "limit", None),
+        "wait": getattr(args, "wait", False),
+        "wait_timeout": getattr(args, "wait_timeout", 300.0),
+        "sweep_id": getattr(args, "sweep_id", None),
+        "restart": getattr(args, "restart", False),
+        "label": getattr(args, "label", None),
+        "baseline": getattr(args, "baseline", None),
+        "candidate": getattr(args, "candidate", None),
+        "last": getattr(args, "last", 10),
+        "alpha": getattr(args, "alpha", 0.05),
+        "threshold": getattr(args, "threshold", 0.05),
     }
-    sys.exit(tmtest(args.config, args.command, args.subcommand, **kwargs))
+    sys.exit(tmtest(args.config, args.command, args.subcommand, profile=args.profile, **kwargs))
 
 
 # -----------------------------------------------------------------------------
@@ -223,6 +863,322 @@ TMTEST_HOME = os.environ.get("TMTEST_HOME", "~/.tmtestkit")
 
 NODE_PUB_IPS_FILE = "./pub_ips.txt"
 NODE_PRI_IPS_FILE = "./pri_ips.txt"
+# Optional list of hosts from which to run distributed load tests
+NODE_CLIENT_IPS_FILE = "./client_ips.txt"
+
+# Where load testing clients' copy of this script is placed on client hosts
+REMOTE_CLIENT_SCRIPT = "~/.tmtestkit/tmtk.py"
+
+# Prefixes the line of output in which a load testing client reports its
+# results
+LOAD_TEST_RESULT_MARKER = "TMTK-RESULT "
+
+# Matches the transactions generated by make_load_test_tx: a 22-character
+# unique key (whose 7th and 8th characters are the index of the client that
+# sent it), followed by the time at which the transaction was sent
+LOAD_TEST_TX_PATTERN = re.compile(rb"^[0-9a-f]{6}([0-9a-f]{2})[0-9a-f]{14}=([0-9a-f]{16})")
+
+# The number of bits of precision in each power-of-two range of a latency
+# histogram (8 bits gives a relative error of under 0.4%).
+HISTOGRAM_PRECISION_BITS = 8
+
+TENDERMINT_LOG_FILE = "/var/log/tendermint.log"
+
+# The log summarization agent run by "network fetch_logs --summarize", and
+# where the install role puts it on each host
+LOG_AGENT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmtk-log-agent.py")
+
+TENDERMINT_RPC_PORT = 26657
+TENDERMINT_P2P_PORT = 26656
+TENDERMINT_PROMETHEUS_PORT = 26660
+TENDERMINT_PPROF_PORT = 6060
+
+# The Tendermint binary that is deployed to remote hosts, and where it and the
+# node's home folder are installed on each host
+TENDERMINT_SOURCE_BINARY = "/root/goApps/bin/tendermint"
+TENDERMINT_REMOTE_BINARY = "/usr/local/bin/tendermint"
+TENDERMINT_REMOTE_HOME = "/root/.tendermint"
+
+# Where files distributed between hosts (see --fanout) are kept on each host,
+# named by their hash, and the port on which hosts serve them to each other
+REMOTE_DIST_PATH = "/var/tmp/tmtk-dist"
+REMOTE_DIST_PORT = 26680
+
+# The arguments with which each Tendermint node is run
+TENDERMINT_NODE_ARGS = ["node", "--mode", "validator", "--proxy-app=kvstore"]
+
+# The nodes of a local network (see --local) are each assigned consecutive
+# P2P, RPC, Prometheus and pprof ports, starting from the base port.
+LOCAL_BASE_PORT = 30000
+LOCAL_NODE_PORTS = 4
+# How long to wait for local nodes to exit gracefully before killing them
+LOCAL_STOP_TIMEOUT = 10.0
+
+# The maximum number of block headers returned by a single call to
+# Tendermint's /blockchain RPC endpoint.
+BLOCKCHAIN_RPC_PAGE_SIZE = 20
+
+# The Prometheus metrics we poll from each node, keyed by the name we record
+# them under.
+POLLED_METRICS = OrderedDict([
+    ("height", "tendermint_consensus_height"),
+    ("total_txs", "tendermint_consensus_total_txs"),
+    ("mempool_size", "tendermint_mempool_size"),
+    ("peers", "tendermint_p2p_peers"),
+])
+
+# A single sample in a metrics time series file: time, node index, height,
+# total transactions, mempool size, peers, TPS and block interval (seconds).
+METRICS_RECORD = struct.Struct("<dHqqiiff")
+
+VALID_TOPOLOGY_TYPES = ["full", "ring", "k-regular", "hub", "region"]
+
+VALID_BROADCAST_TX_METHODS = {"async", "sync", "commit"}
+VALID_LOAD_TEST_METHODS = {"tmtk"}
+
+# The largest number of pairs (baseline x candidate runs) for which "bench
+# compare" computes exact p-values rather than approximating them.
+MANN_WHITNEY_EXACT_MAX_PAIRS = 400
+
+# The log events we index, along with the messages that Tendermint logs for
+# each of them. The position of an event in this list is its code in the
+# index.
+LOG_EVENTS = [
+    ("new_round", [b"entering new round"]),
+    ("proposal", [b"received complete proposal block"]),
+    ("commit", [b"finalizing commit of block"]),
+    ("timeout", [b"Timed out", b"timed out"]),
+    ("peer_added", [b"Added peer", b"added peer", b"peer connected"]),
+    ("peer_removed", [b"Stopping peer for error", b"stopping peer for error", b"peer disconnected"]),
+]
+
+LOG_EVENTS_RE = re.compile(b"|".join(
+    b"(?P<e%d>%s)" % (code, b"|".join(re.escape(msg) for msg in msgs))
+    for code, (_, msgs) in enumerate(LOG_EVENTS)
+))
+
+# Matches both the Tendermint v0.34 ("I[2021-01-01|12:00:00.000] ...") and
+# v0.35 ("2021-01-01T12:00:00Z INFO ...") plain log timestamp formats.
+LOG_TIMESTAMP_RE = re.compile(
+    rb"^(?:[DIEW]\[(?P<date>\d{4}-\d\d-\d\d)\|(?P<time>\d\d:\d\d:\d\d(?:\.\d+)?)\]|"
+    rb"(?P<iso>\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:?\d\d)?))"
+)
+INDEXED_GROUP_REF_RE = re.compile(r"^(?P<group>[^\[\]]+)\[(?P<index>\d+)\]$")
+
+LOG_HEIGHT_RE = re.compile(rb"\bheight=(\d+)")
+LOG_ROUND_RE = re.compile(rb"\bround=(\d+)")
+
+# Prints a compact sample of the host's CPU, memory, disk and network counters
+# every interval, each followed by an "END" line, up to the given number of
+# samples (so that it stops by itself should we go away).
+HOST_SAMPLE_SCRIPT = (
+    'n=%(count)d; while [ "$n" -gt 0 ]; do '
+    'head -n 1 /proc/stat; '
+    'grep -E "^(MemTotal|MemAvailable):" /proc/meminfo; '
+    'awk \'$3 !~ /^(loop|ram|zram)/ {print "disk", $3, $6, $10}\' /proc/diskstats; '
+    'tail -n +3 /proc/net/dev | tr ":" " " | awk \'{print "net", $1, $2, $10}\'; '
+    'echo END; n=$((n-1)); sleep %(interval)s; done'
+)
+
+# The columns of the host samples taken by "loadtest start --capture"
+HOST_SAMPLE_COLUMNS = [
+    "time", "host", "cpu_pct", "iowait_pct", "mem_used_pct",
+    "disk_read_bps", "disk_write_bps", "net_rx_bps", "net_tx_bps",
+]
+
+# The columns of the probes.csv written by "loadtest capacity".
+CAPACITY_PROBE_COLUMNS = ["rate", "accepted_rate", "committed_rate", "failed", "latency_p99_ms", "sustained", "run_path"]
+
+# The columns of the sweep results table that follow its parameters
+SWEEP_RESULT_COLUMNS = [
+    "accepted_rate", "committed_rate", "latency_p50_ms", "latency_p90_ms", "latency_p99_ms",
+    "failed", "mean_block_interval_ms", "mean_block_size",
+]
+
+# The columns of the log index, along with their array type codes.
+LOG_INDEX_COLUMNS = [
+    ("height", "q"),
+    ("round", "i"),
+    ("timestamp", "q"),
+    ("node", "i"),
+    ("event", "B"),
+]
+
+# Emits a header line with the byte range being sent, followed by a
+# gzip-compressed stream of the log file's contents within that range. If the
+# log file has shrunk since the last fetch (e.g. it was truncated on deploy),
+# we start again from the beginning.
+LOG_FETCH_SCRIPT = (
+    'f=%(path)s; o=%(offset)d; s=$(stat -c %%s "$f" 2>/dev/null || echo 0); '
+    '[ "$s" -lt "$o" ] && o=0; echo "$o $s"; '
+    'tail -c +$((o+1)) "$f" 2>/dev/null | head -c $((s-o)) | gzip -1 -c'
+)
+
+# The subset of Tendermint's default node configuration that we render for
+# each node. Tendermint falls back to its built-in defaults for anything left
+# out here.
+TENDERMINT_DEFAULT_CONFIG = {
+    "proxy-app": "tcp://127.0.0.1:26658",
+    "mode": "validator",
+    "db-backend": "goleveldb",
+    "db-dir": "data",
+    "log-level": "info",
+    "log-format": "plain",
+    "genesis-file": "config/genesis.json",
+    "node-key-file": "config/node_key.json",
+    "abci": "socket",
+    "filter-peers": False,
+    "priv-validator": {
+        "key-file": "config/priv_validator_key.json",
+        "state-file": "data/priv_validator_state.json",
+        "laddr": "",
+    },
+    "rpc": {
+        "laddr": "tcp://127.0.0.1:26657",
+        "cors-allowed-origins": [],
+        "unsafe": False,
+        "max-open-connections": 900,
+        "max-subscription-clients": 100,
+        "max-subscriptions-per-client": 5,
+        "timeout-broadcast-tx-commit": "10s",
+        "pprof-laddr": "",
+    },
+    "p2p": {
+        "laddr": "tcp://0.0.0.0:26656",
+        "external-address": "",
+        "persistent-peers": "",
+        "upnp": False,
+        "addr-book-file": "config/addrbook.json",
+        "addr-book-strict": False,
+        "max-num-inbound-peers": 40,
+        "max-num-outbound-peers": 10,
+        "max-connections": 64,
+        "pex": True,
+        "allow-duplicate-ip": True,
+    },
+    "mempool": {
+        "version": "v0",
+        "recheck": True,
+        "broadcast": True,
+        "size": 5000,
+        "max-txs-bytes": 1073741824,
+        "cache-size": 10000,
+        "max-tx-bytes": 1048576,
+    },
+    "statesync": {
+        "enable": False,
+    },
+    "blocksync": {
+        "enable": True,
+        "version": "v0",
+    },
+    "consensus": {
+        "wal-file": "data/cs.wal/wal",
+        "timeout-propose": "3s",
+        "timeout-propose-delta": "500ms",
+        "timeout-prevote": "1s",
+        "timeout-prevote-delta": "500ms",
+        "timeout-precommit": "1s",
+        "timeout-precommit-delta": "500ms",
+        "timeout-commit": "1s",
+        "skip-timeout-commit": False,
+        "create-empty-blocks": True,
+        "create-empty-blocks-interval": "0s",
+        "peer-gossip-sleep-duration": "100ms",
+        "peer-query-maj23-sleep-duration": "2s",
+    },
+    "tx-index": {
+        "indexer": ["kv"],
+    },
+    "instrumentation": {
+        "prometheus": False,
+        "prometheus-listen-addr": ":26660",
+        "max-open-connections": 3,
+        "namespace": "tendermint",
+    },
+}
+
+# The consensus parameters with which Tendermint v0.35 starts a chain by
+# default. Written to the genesis file only when overridden.
+TENDERMINT_DEFAULT_CONSENSUS_PARAMS = {
+    "block": {
+        "max_bytes": "22020096",
+        "max_gas": "-1",
+    },
+    "evidence": {
+        "max_age_num_blocks": "100000",
+        "max_age_duration": "172800000000000",
+        "max_bytes": "1048576",
+    },
+    "validator": {
+        "pub_key_types": ["ed25519"],
+    },
+    "version": {
+        "app_version": "0",
+    },
+}
+
+# The actions that a fault schedule can take on nodes, along with the action
+# that undoes each of them (taken automatically after an event's duration)
+FAULT_ACTIONS = OrderedDict([
+    ("kill", "start"),
+    ("stop", "start"),
+    ("partition", "heal"),
+    ("start", None),
+    ("restart", None),
+    ("heal", None),
+])
+
+# The commands that take each fault action on a remote host. A partitioned
+# host drops all P2P traffic, while its RPC endpoint (and SSH) stay reachable.
+# Killed nodes are stopped too, so that systemd doesn't restart them.
+REMOTE_FAULT_COMMANDS = {
+    "kill": "systemctl kill -s KILL tendermint; systemctl stop tendermint",
+    "stop": "systemctl stop tendermint",
+    "start": "systemctl start tendermint",
+    "restart": "systemctl restart tendermint",
+    "partition": "iptables -I INPUT -p tcp --dport %(port)d -j DROP && iptables -I OUTPUT -p tcp --dport %(port)d -j DROP",
+    "heal": "while iptables -D INPUT -p tcp --dport %(port)d -j DROP 2>/dev/null; do :; done; " +
+        "while iptables -D OUTPUT -p tcp --dport %(port)d -j DROP 2>/dev/null; do :; done",
+}
+
+# Node-specific Tendermint configuration parameters, which are left out when
+# recording and comparing the configuration of the network
+NODE_SPECIFIC_CONFIG = {
+    "moniker": None,
+    "p2p": ["laddr", "external-address", "persistent-peers"],
+    "rpc": ["laddr", "pprof-laddr"],
+    "instrumentation": ["prometheus-listen-addr"],
+}
+
+# The metrics on which runs are compared: (name, whether higher is better,
+# function returning the metric's value for each of a list of runs)
+RUN_COMPARISON_METRICS = [
+    ("throughput (tx/s, steady state)", True, lambda runs: steady_state_rates(runs)),
+    ("throughput (tx/s, per run)", True, lambda runs: [run["accepted_rate"] for run in runs]),
+    ("latency p50 (ms)", False, lambda runs: [run["latency_p50_us"] / 1000.0 for run in runs]),
+    ("latency p99 (ms)", False, lambda runs: [run["latency_p99_us"] / 1000.0 for run in runs]),
+]
+
+# The configuration overrides applied to every node on top of its generated
+# configuration, by section.
+TENDERMINT_CONFIG_OVERLAY = {
+    "rpc": {
+        "laddr": "tcp://0.0.0.0:26657",
+        # so that "loadtest start --capture" can profile the nodes
+        "pprof-laddr": "0.0.0.0:%d" % TENDERMINT_PPROF_PORT,
+    },
+    "instrumentation": {
+        "prometheus": True,
+    },
+    "consensus": {
+        "create-empty-blocks": False,
+        "peer-gossip-sleep-duration": "0ms",
+    },
+}
+
+# State shared by all jobs in a configuration finalization worker process.
+_finalize_worker_state = dict()
 
 # -----------------------------------------------------------------------------
 #
@@ -231,8 +1187,34 @@ NODE_PRI_IPS_FILE = "./pri_ips.txt"
 # -----------------------------------------------------------------------------
 
 TestConfig = namedtuple("TestConfig",
-    ["id", "bin","monitoring", "validators", "abci", "load_tests", "home", "tendermint_binaries"],
-    defaults=[None, None, None, dict(), dict(), OrderedDict(), TMTEST_HOME, dict()],
+    ["id", "bin","monitoring", "validators", "abci", "load_tests", "home", "tendermint_binaries", "topology",
+     "tendermint_config", "consensus_params", "sweeps", "faults"],
+    defaults=[None, None, None, dict(), dict(), OrderedDict(), TMTEST_HOME, dict(), None, dict(), dict(), OrderedDict(), OrderedDict()],
+)
+
+FaultScheduleConfig = namedtuple("FaultScheduleConfig",
+    ["id", "load_test", "events", "monitor_interval", "recovery"],
+    defaults=[None, None, [], 0.5, 30],
+)
+
+FaultEvent = namedtuple("FaultEvent",
+    ["at", "action", "nodes", "count", "fraction", "duration"],
+    defaults=[0, None, [], None, None, None],
+)
+
+SweepConfig = namedtuple("SweepConfig",
+    ["id", "load_test", "parameters", "repeat", "settle"],
+    defaults=[None, None, OrderedDict(), 1, 10],
+)
+
+TopologyConfig = namedtuple("TopologyConfig",
+    ["type", "degree", "seed", "hubs", "regions", "bridges", "pex"],
+    defaults=["full", 4, 0, 1, OrderedDict(), 2, False],
+)
+
+LoadTestConfig = namedtuple("LoadTestConfig",
+    ["id", "method", "client_nodes", "targets", "time", "broadcast_tx_method", "connections", "rate", "size"],
+    defaults=[None, "tmtk", 1, [], 60, "async", 1, 1000, 250],
 )
 
 TestNodeRef = namedtuple("TestNodeRef",
@@ -257,6 +1239,25 @@ AnsibleInventoryEntry = namedtuple("AnsibleInventoryEntry",
     defaults=[None, None, None],
 )
 
+LogFetchResult = namedtuple("LogFetchResult",
+    ["alias", "host", "start", "end", "transferred", "duration", "error"],
+    defaults=[None],
+)
+
+LogIndex = namedtuple("LogIndex",
+    ["nodes"] + [name for name, _ in LOG_INDEX_COLUMNS],
+)
+
+LocalNode = namedtuple("LocalNode",
+    ["alias", "home", "p2p_port", "rpc_port", "prometheus_port", "pprof_port"],
+    defaults=[None],
+)
+
+HostResult = namedtuple("HostResult",
+    ["alias", "host", "returncode", "output", "duration", "finished"],
+    defaults=[None],
+)
+
 def load_key(d, ctx) -> TendermintNodeKey:
     if not isinstance(d, dict):
         raise Exception("Expected key to consist of key/value pairs (%s)" % ctx)
@@ -281,10 +1282,11 @@ def load_tendermint_priv_validator_key(path: str) -> TendermintNodePrivValidator
 #
 # -----------------------------------------------------------------------------
 
-def tmtest(cfg_file, command, subcommand, **kwargs) -> int:
+def tmtest(cfg_file, command, subcommand, profile=False, **kwargs) -> int:
     """The primary programmatic interface to the tm-test tool. Allows the
     tool to be imported from other Python code. Returns the intended exit code
     from execution."""
+    TRACER.enabled = profile
     
     try:
         cfg = load_test_config(cfg_file)
@@ -304,13 +1306,35 @@ def tmtest(cfg_file, command, subcommand, **kwargs) -> int:
             fn = network_stop
         elif subcommand == "fetch_logs":
             fn = network_fetch_logs
-    #     elif subcommand == "reset":
-    #         fn = network_reset
-        # elif subcommand == "info":
-        #     fn = network_info
-    # elif command == "loadtest":
-    #     if subcommand == "start":
-    #         fn = loadtest_start
+        elif subcommand == "metrics":
+            fn = network_metrics
+        elif subcommand == "blocks":
+            fn = network_blocks
+        elif subcommand == "reset":
+            fn = network_reset
+        elif subcommand == "info":
+            fn = network_info
+    elif command == "logs":
+        if subcommand == "analyze":
+            fn = logs_analyze
+    elif command == "loadtest":
+        if subcommand == "start":
+            fn = loadtest_start
+        elif subcommand == "report":
+            fn = loadtest_report
+        elif subcommand == "capacity":
+            fn = loadtest_capacity
+        elif subcommand == "replay":
+            fn = loadtest_replay
+    elif command == "bench":
+        if subcommand == "sweep":
+            fn = bench_sweep
+        elif subcommand == "faults":
+            fn = bench_faults
+        elif subcommand == "runs":
+            fn = bench_runs
+        elif subcommand == "compare":
+            fn = bench_compare
     #     elif subcommand == "stop":
     #         fn = loadtest_stop
     #     elif subcommand == "destroy":
@@ -321,20 +1345,43 @@ def tmtest(cfg_file, command, subcommand, **kwargs) -> int:
         return 1
     
     try:
-        fn(cfg, **kwargs)
+        with phase_timer("%s %s" % (command, subcommand)):
+            fn(cfg, **kwargs)
     except Exception as e:
         logger.error("Failed to execute \"%s %s\" for configuration file: %s", command, subcommand, cfg_file)
         logger.exception(e)
         return 1
+    finally:
+        if TRACER.enabled:
+            trace_file = os.path.join(
+                cfg.home,
+                "traces",
+                "%s-%s-%s.json" % (datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ"), command, subcommand),
+            )
+            ensure_path_exists(os.path.dirname(trace_file))
+            TRACER.export(trace_file)
+            print_trace_summary(TRACER.summary())
+            logger.info("Trace written to %s (open it with https://ui.perfetto.dev or chrome://tracing)", trace_file)
     
     return 0
 
 def network_deploy(
     cfg: "TestConfig",
     keep_existing_tendermint_config: bool = False,
+    local: bool = False,
     **kwargs,
 ):
     """Deploys the network according to the given configuration."""
+    # the redeployed network starts a new chain under the same chain ID
+    remove_block_caches(cfg)
+
+    if local:
+        deploy_local_tendermint_network(
+            cfg,
+            keep_existing_tendermint_config=keep_existing_tendermint_config,
+            **kwargs,
+        )
+        return
 
     test_home = os.path.join(cfg.home, cfg.id)
 
@@ -353,114 +1400,870 @@ def network_stop(cfg: "TestConfig", **kwargs):
 def network_state(
     cfg: "TestConfig",
     state: str,
+    local: bool = False,
+    wait: bool = False,
+    wait_timeout: float = 300.0,
+    label: str = None,
     **kwargs,
 ):
     logger.info("Attempting to change state of network component(s): %s", state)
-    ansible_set_tendermint_nodes_state(
-        os.path.join(cfg.home, "tendermint"),
-        state,
-    )
+    started, wall_started = time.monotonic(), time.time()
+    if local:
+        node_started = set_local_nodes_state(cfg, state, **kwargs)
+    else:
+        node_started = set_tendermint_nodes_state(
+            cfg,
+            os.path.join(cfg.home, "tendermint"),
+            state,
+            **kwargs,
+        )
     logger.info("Successfully changed state of network component(s): %s", state)
+    if wait and state == "started":
+        wait_for_network_startup(
+            cfg,
+            started,
+            wall_started,
+            node_started=node_started,
+            node_or_group_ids=kwargs.get("node_or_group_ids", None),
+            fail_on_missing=kwargs.get("fail_on_missing", True),
+            local=local,
+            timeout=wait_timeout,
+            label=label,
+        )
+
+def network_info(
+    cfg: "TestConfig",
+    node_or_group_ids: List[str] = None,
+    fail_on_missing: bool = True,
+    rpc_timeout: float = 2.0,
+    output: str = None,
+    local: bool = False,
+    **kwargs,
+):
+    state, selected = load_deployed_nodes(cfg, node_or_group_ids, fail_on_missing, local)
+    start = time.monotonic()
+    statuses = asyncio.run(query_node_statuses([node["rpc"] for node in selected], timeout=rpc_timeout))
+    logger.info("Queried the status of %d node(s) in %.2fs", len(selected), time.monotonic() - start)
+    print_network_info(state, selected, statuses)
+    if output is not None:
+        save_json_config(output, OrderedDict([
+            ("chain_id", state["chain_id"]),
+            ("deployed", state["deployed"]),
+            ("nodes", [dict(node, status=status) for node, status in zip(selected, statuses)]),
+        ]))
+        logger.info("Network information written to %s", output)
+
+def wait_for_network_startup(
+    cfg: "TestConfig",
+    started: float,
+    wall_started: float,
+    node_or_group_ids: List[str] = None,
+    fail_on_missing: bool = True,
+    local: bool = False,
+    timeout: float = 300.0,
+    label: str = None,
+    node_started: Dict[str, float] = None,
+):
+    """Blocks until the referenced nodes (or all nodes) have connected to all
+    of their peers and committed their first block, and reports how long
+    each step took since the nodes were started (i.e. since their start
+    commands returned, if given in `node_started`, so that the overhead of
+    reaching the hosts isn't counted). Startups of the whole network are
+    recorded in the results database."""
+    state, selected = load_deployed_nodes(cfg, node_or_group_ids, fail_on_missing, local)
+    if not selected:
+        logger.warning("No nodes to wait for")
+        return
+    logger.info("Waiting for %d node(s) to peer and commit their first block", len(selected))
+    times = asyncio.run(wait_for_network_ready(selected, started, timeout=timeout, node_started=node_started))
+    for node, node_times in zip(selected, times):
+        node_wall_started = wall_started + (node_started or dict()).get(node["alias"], started) - started
+        for name, elapsed in node_times.items():
+            if elapsed is not None:
+                TRACER.add(name, node_wall_started, elapsed, track="node: %s" % node["alias"], cat="startup")
+
+    not_ready = [node["alias"] for node, node_times in zip(selected, times) if None in node_times.values()]
+    if not_ready:
+        raise Exception("%d node(s) not ready after %.0fs: %s" % (len(not_ready), timeout, ", ".join(not_ready[:20])))
+    startup = startup_times(times)
+    logger.info(
+        "Network ready after %.2fs: first block after %.2fs, fully peered after %.2fs",
+        startup["ready_s"],
+        startup["first_block_s"],
+        startup["full_peering_s"],
+    )
+    rpc_times = sorted(node_times["rpc"] for node_times in times)
+    logger.info(
+        "Node RPC startup: median %.2fs, slowest %.2fs (%s)",
+        rpc_times[len(rpc_times) // 2],
+        rpc_times[-1],
+        selected[max(range(len(times)), key=lambda i: times[i]["rpc"])]["alias"],
+    )
+    if node_or_group_ids:
+        return
+    binary_hash, label, binary_version = deployed_binary_label(cfg, local, label)
+    startup.update({
+        "started": datetime.datetime.utcfromtimestamp(wall_started).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "chain_id": cfg.id,
+        "binary_hash": binary_hash,
+        "binary_label": label,
+        "binary_version": binary_version,
+        "nodes": len(selected),
+        "local": int(local),
+        "node_times": json.dumps(OrderedDict(zip([node["alias"] for node in selected], times))),
+    })
+    with ResultsDB(os.path.join(cfg.home, "results.sqlite")) as db:
+        startup_id = db.record_startup(startup)
+    logger.info("Startup recorded in the results database as startup %d (%s)", startup_id, label)
+
+def network_reset(
+    cfg: "TestConfig",
+    truncate_logs: bool = False,
+    local: bool = False,
+    transport=None,
+    **kwargs,
+):
+    """Stops all nodes, wipes their blockchain data and restarts them, so
+    that the network starts again from its genesis without redeploying."""
+    if local:
+        nodes = list(load_local_nodes(cfg).values())
+        stop_local_nodes(nodes)
+        binary = local_tendermint_binary()
+        for node in nodes:
+            subprocess.run([binary, "unsafe-reset-all", "--home", node.home], capture_output=True, check=True)
+            if truncate_logs and os.path.isfile(local_node_log_file(node)):
+                os.truncate(local_node_log_file(node), 0)
+        start_local_nodes(nodes, binary)
+    else:
+        inventory = load_ansible_inventory(os.path.join(cfg.home, "tendermint", "inventory"))
+        entries = resolve_inventory_entries(inventory, [])
+        cmds = [
+            "systemctl stop tendermint",
+            "%s unsafe-reset-all --home %s" % (TENDERMINT_REMOTE_BINARY, TENDERMINT_REMOTE_HOME),
+        ]
+        if truncate_logs:
+            cmds.append("truncate -s 0 %s" % TENDERMINT_LOG_FILE)
+        cmds.append("systemctl start tendermint")
+        logger.info("Resetting %d host(s)", len(entries))
+        log_host_results(asyncio.run(run_on_hosts(
+            transport or default_transport(cfg),
+            entries,
+            remote_become("sh -c %s" % shlex.quote(" && ".join(cmds))),
+        )))
+    # the cached blocks belong to the chain that has just been wiped
+    remove_block_caches(cfg)
+    logger.info("Network successfully reset")
 
 def network_fetch_logs(
     cfg: "TestConfig",
+    local: bool = False,
     **kwargs
 ):
     logger.info("Fetching logs")
-    ansible_fetch_logs(
+    if local:
+        fetch_tendermint_logs(
+            cfg,
+            local_network_path(cfg),
+            transport=LocalTransport(),
+            log_files={node.alias: local_node_log_file(node) for node in load_local_nodes(cfg).values()},
+            **kwargs,
+        )
+        return
+    fetch_tendermint_logs(
+        cfg,
         os.path.join(cfg.home, "tendermint"),
+        **kwargs,
     )
 
-def deploy_tendermint_network(
+def network_metrics(
     cfg: "TestConfig",
-    keep_existing_tendermint_config: bool = False,
+    interval: float = 1.0,
+    duration: float = 60.0,
+    scrape_config: str = None,
+    node_or_group_ids: List[str] = None,
     **kwargs,
 ):
-    """Install Tendermint on all target nodes."""
+    inventory = load_ansible_inventory(os.path.join(cfg.home, "tendermint", "inventory"))
+    entries = resolve_inventory_entries(inventory, node_or_group_ids or [])
+    for filename in [os.path.join(cfg.home, "prometheus.yml"), scrape_config]:
+        if filename is not None:
+            save_yaml_config(filename, prometheus_scrape_config(cfg, entries, interval))
+            logger.info("Wrote Prometheus scrape configuration to %s", filename)
+    if duration > 0:
+        metrics_path = os.path.join(cfg.home, "metrics")
+        ensure_path_exists(metrics_path)
+        poll_node_metrics(
+            entries,
+            os.path.join(metrics_path, datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")),
+            interval=interval,
+            duration=duration,
+        )
 
-    node_ips = load_node_ips()
-    # 1. generate tendermint testnet config
-    config_path = os.path.join(cfg.home, "tendermint", "config")
-    peers = tendermint_generate_config(
-        config_path,
-        len(node_ips['pub']),
-        keep_existing_tendermint_config,
-        node_ips,
+def network_blocks(
+    cfg: "TestConfig",
+    from_height: int = 1,
+    to_height: int = None,
+    rate: float = None,
+    with_results: bool = False,
+    endpoints: str = None,
+    output: str = None,
+    local: bool = False,
+    **kwargs,
+):
+    targets = endpoints.split(",") if endpoints else load_rpc_endpoints(cfg, local=local)
+    blocks_path = os.path.join(cfg.home, "blocks")
+    ensure_path_exists(blocks_path)
+    # we can't tell which chain arbitrary endpoints serve, so their blocks
+    # aren't cached
+    with (BlockCache(":memory:") if endpoints else open_chain_block_cache(cfg, local=local)) as cache:
+        blocks = asyncio.run(harvest_blocks(
+            targets,
+            cache,
+            from_height,
+            to_height,
+            rate=rate or 50.0,
+            with_results=with_results,
+        ))
+    output = output or os.path.join(blocks_path, "%s.csv" % cfg.id)
+    stats = block_stats(blocks)
+    with open(output, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["height", "time", "num_txs", "failed_txs", "block_size", "interval_ms"])
+        writer.writerows(stats)
+    log_block_stats(stats)
+    logger.info("Per-block statistics written to %s", output)
+
+def logs_analyze(
+    cfg: "TestConfig",
+    rebuild: bool = False,
+    workers: int = None,
+    **kwargs,
+):
+    logs_path = os.path.join(cfg.home, "logs")
+    index = build_log_index(logs_path, os.path.join(logs_path, "index"), rebuild=rebuild, workers=workers)
+    report = analyze_log_index(index, os.path.join(logs_path, "commits.csv"))
+    save_json_config(os.path.join(logs_path, "analysis.json"), report)
+    print_log_analysis(report)
+
+def loadtest_start(
+    cfg: "TestConfig",
+    load_test_id: str,
+    workers: int = None,
+    endpoints: str = None,
+    local_clients: bool = False,
+    local: bool = False,
+    label: str = None,
+    capture: bool = False,
+    profile_delay: float = 5.0,
+    profile_seconds: int = 30,
+    sample_interval: float = 1.0,
+    **kwargs,
+):
+    if load_test_id not in cfg.load_tests:
+        raise Exception("Unrecognized load test ID: %s" % load_test_id)
+    lt = cfg.load_tests[load_test_id]
+    targets = endpoints.split(",") if endpoints else load_rpc_endpoints(cfg, lt.targets, local=local)
+    resources = None
+    if capture:
+        profile_delay = min(profile_delay, lt.time / 2)
+        resources = load_resource_capture(
+            cfg,
+            local=local,
+            profile_delay=profile_delay,
+            profile_seconds=max(1, min(profile_seconds, int(lt.time - profile_delay))),
+            sample_interval=sample_interval,
+        )
+        resources.start()
+    tracker = CommitTracker(targets, since=time.time())
+    # distributed load testing clients measure the commit latencies of their
+    # own transactions, against their own clocks
+    distributed = local_clients or bool(load_test_client_hosts(cfg))
+    if not distributed:
+        tracker.start()
+    try:
+        summary = run_load_test_from_clients(cfg, lt, targets, workers=workers, local_clients=local_clients)
+    finally:
+        if resources is not None:
+            resources.stop()
+        if not distributed:
+            tracker.stop()
+    for client_latencies in summary.pop("client_commit_latencies", []):
+        tracker.merge(client_latencies)
+    summary["commit_latency_us"] = tracker.summary()
+    log_commit_latencies(summary)
+    if resources is not None:
+        summary["capture"] = resources.summary()
+        log_resource_capture(summary["capture"])
+    run_path = os.path.join(
+        cfg.home,
+        "loadtests",
+        lt.id,
+        datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ"),
+    )
+    ensure_path_exists(run_path)
+    tracker.save(os.path.join(run_path, "commit-latency.npz"))
+    if resources is not None:
+        resources.save(os.path.join(run_path, "capture"))
+    timeseries = summary.pop("timeseries")
+    save_load_test_timeseries(os.path.join(run_path, "stats.csv"), timeseries)
+    save_json_config(os.path.join(run_path, "summary.json"), summary)
+    logger.info("Load test results written to %s", run_path)
+    with ResultsDB(os.path.join(cfg.home, "results.sqlite")) as db:
+        run_id = db.record(load_test_run_record(cfg, summary, timeseries, run_path, local=local, label=label))
+    logger.info("Recorded as run %d in the results database", run_id)
+    return run_path
+
+def run_load_test_from_clients(
+    cfg: "TestConfig",
+    lt: LoadTestConfig,
+    targets: List[str],
+    workers: int = None,
+    local_clients: bool = False,
+) -> dict:
+    """Runs the given load test from this machine, or from the deployed (or
+    local) load testing clients if it needs more than one."""
+    if local_clients:
+        clients = [AnsibleInventoryEntry(alias="client%d" % i, ansible_host="localhost") for i in range(lt.client_nodes)]
+        summary = run_distributed_load_test(lt, targets, clients, LocalTransport(), os.path.abspath(__file__), workers=workers)
+    else:
+        client_hosts = load_test_client_hosts(cfg)
+        if client_hosts:
+            if len(client_hosts) < lt.client_nodes:
+                raise Exception("Load test \"%s\" needs %d client node(s), but only %d are available" % (lt.id, lt.client_nodes, len(client_hosts)))
+            summary = run_distributed_load_test(lt, targets, client_hosts[:lt.client_nodes], default_transport(cfg), workers=workers)
+        elif lt.client_nodes > 1:
+            raise Exception("Load test \"%s\" needs %d client nodes, but no \"loadtest\" hosts have been deployed (see %s), and --local-clients was not specified" % (
+                lt.id, lt.client_nodes, NODE_CLIENT_IPS_FILE))
+        else:
+            summary = run_load_test(lt, targets, workers=workers)
+    return summary
+
+def load_test_client_hosts(cfg: "TestConfig") -> List[AnsibleInventoryEntry]:
+    """Returns the deployed load testing client hosts, if any."""
+    inventory_file = os.path.join(cfg.home, "tendermint", "inventory")
+    return load_ansible_inventory(inventory_file).get("loadtest", []) if os.path.isfile(inventory_file) else []
+
+def loadtest_report(
+    cfg: "TestConfig",
+    stats_files: List[str],
+    window: float = 1.0,
+    align_start: bool = False,
+    max_points: int = 500,
+    output: str = "./loadtest-report",
+    **kwargs,
+):
+    report = build_load_test_report(stats_files, window=window, align_start=align_start, max_points=max_points)
+    timeseries = report.pop("timeseries")
+    with open("%s-timeseries.csv" % output, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time", "sent", "accepted", "failed", "accepted_rate"])
+        writer.writerows(timeseries)
+    save_json_config("%s.json" % output, report)
+    logger.info("Report written to %s.json and %s-timeseries.csv", output, output)
+    print(json.dumps(report, indent=2))
+
+def loadtest_capacity(
+    cfg: "TestConfig",
+    load_test_id: str,
+    workers: int = None,
+    local: bool = False,
+    label: str = None,
+    start_rate: float = None,
+    max_rate: float = None,
+    precision: float = 0.05,
+    tolerance: float = 0.95,
+    slo_p99_ms: float = 1000.0,
+    probe_time: int = None,
+    warmup: float = 5.0,
+    cooldown: float = 30.0,
+    confirmations: int = 2,
+    **kwargs,
+):
+    if load_test_id not in cfg.load_tests:
+        raise Exception("Unrecognized load test ID: %s" % load_test_id)
+    lt = cfg.load_tests[load_test_id]
+    lt = lt._replace(time=probe_time or lt.time)
+    if lt.time <= warmup:
+        raise Exception("Each probe (%ds) must run for longer than the warmup (%.0fs)" % (lt.time, warmup))
+    endpoints = load_rpc_endpoints(cfg, local=local)
+    capacity_path = os.path.join(
+        cfg.home,
+        "capacity",
+        lt.id,
+        datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ"),
+    )
+    ensure_path_exists(capacity_path)
+    probes = []
+    with BlockCache(os.path.join(capacity_path, "blocks.sqlite")) as cache:
+        def probe(rate: float) -> bool:
+            wait_for_mempool_drain(endpoints, cooldown)
+            logger.info("Probing %.1f tx/s", rate)
+            result = capacity_probe(cfg, lt, rate, endpoints, cache, workers=workers, local=local, label=label, warmup=warmup)
+            reasons = capacity_probe_failures(result, tolerance, slo_p99_ms)
+            result["sustained"] = not reasons
+            logger.info("%.1f tx/s %s", rate, "sustained" if not reasons else "not sustained: %s" % ", ".join(reasons))
+            probes.append(result)
+            save_capacity_probes(os.path.join(capacity_path, "probes.csv"), probes)
+            return not reasons
+
+        result = find_capacity(probe, start_rate or lt.rate, max_rate=max_rate, precision=precision, confirmations=confirmations)
+    knee_committed = [p["committed_rate"] for p in probes if p["rate"] == result["knee"]]
+    result.update({
+        "committed_min": min(knee_committed),
+        "committed_max": max(knee_committed),
+        "knee_probes": len(knee_committed),
+        "load_test": lt.id,
+        "tolerance": tolerance,
+        "slo_p99_ms": slo_p99_ms,
+    })
+    save_json_config(os.path.join(capacity_path, "capacity.json"), dict(result, probes=probes))
+    print_capacity(result, probes)
+    logger.info("Capacity search results written to %s", capacity_path)
+
+def loadtest_replay(
+    cfg: "TestConfig",
+    trace_file: str,
+    speed: float = 1.0,
+    concurrency: int = 256,
+    rewrite_txs: bool = False,
+    limit: int = None,
+    endpoints: str = None,
+    local: bool = False,
+    **kwargs,
+):
+    if not os.path.isfile(trace_file):
+        raise Exception("Cannot find trace file: %s" % trace_file)
+    if speed < 0:
+        raise Exception("The replay speed cannot be negative")
+    targets = endpoints.split(",") if endpoints else load_rpc_endpoints(cfg, local=local)
+    logger.info("Replaying %s against %d endpoint(s) at %s with up to %d call(s) in flight",
+        trace_file, len(targets), ("%gx speed" % speed) if speed > 0 else "full speed", concurrency)
+    tracker = CommitTracker(targets, since=time.time())
+    tracker.start()
+    try:
+        summary = asyncio.run(replay_trace(trace_file, targets, speed=speed, concurrency=concurrency, rewrite_txs=rewrite_txs, limit=limit))
+    finally:
+        tracker.stop()
+    log_replay_summary(summary)
+    if tracker.count() > 0:
+        summary["commit_latency_us"] = tracker.summary()
+        log_commit_latencies(summary)
+    run_path = os.path.join(
+        cfg.home,
+        "replays",
+        os.path.splitext(os.path.basename(trace_file))[0],
+        datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ"),
+    )
+    ensure_path_exists(run_path)
+    if tracker.count() > 0:
+        tracker.save(os.path.join(run_path, "commit-latency.npz"))
+    with open(os.path.join(run_path, "stats.csv"), "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time", "sent", "ok", "failed"])
+        writer.writerows(summary.pop("timeseries"))
+    save_json_config(os.path.join(run_path, "summary.json"), summary)
+    logger.info("Replay results written to %s", run_path)
+    return run_path
+
+def bench_sweep(
+    cfg: "TestConfig",
+    sweep_id: str,
+    workers: int = None,
+    restart: bool = False,
+    local: bool = False,
+    label: str = None,
+    **kwargs,
+):
+    if sweep_id not in cfg.sweeps:
+        raise Exception("Unrecognized sweep ID: %s" % sweep_id)
+    sweep = cfg.sweeps[sweep_id]
+    sweep_path = os.path.join(cfg.home, "sweeps", sweep.id)
+    if restart and os.path.isdir(sweep_path):
+        logger.info("Discarding previous results of sweep \"%s\"", sweep.id)
+        shutil.rmtree(sweep_path)
+    ensure_path_exists(sweep_path)
+    deploy_kwargs = dict()
+    if local and os.path.isfile(os.path.join(local_network_path(cfg), "nodes.json")):
+        # keep the shape of the currently deployed local network
+        nodes = list(load_local_nodes(cfg).values())
+        deploy_kwargs = {"nodes": len(nodes), "base_port": nodes[0].p2p_port}
+    rows = run_sweep(cfg, sweep, sweep_path, workers=workers, local=local, deploy_kwargs=deploy_kwargs, label=label)
+    print_sweep_results(sweep, rows)
+    logger.info("Sweep results written to %s", os.path.join(sweep_path, "results.csv"))
+
+def bench_faults(
+    cfg: "TestConfig",
+    fault_schedule_id: str,
+    workers: int = None,
+    local: bool = False,
+    label: str = None,
+    transport=None,
+    **kwargs,
+):
+    if fault_schedule_id not in cfg.faults:
+        raise Exception("Unrecognized fault schedule ID: %s" % fault_schedule_id)
+    schedule = cfg.faults[fault_schedule_id]
+    run_path = os.path.join(
+        cfg.home,
+        "faults",
+        schedule.id,
+        datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ"),
     )
+    ensure_path_exists(run_path)
+    report = run_fault_schedule(cfg, schedule, run_path, workers=workers, local=local, label=label, transport=transport)
+    save_json_config(os.path.join(run_path, "report.json"), report)
+    print_fault_report(report)
+    logger.info("Fault schedule results written to %s", run_path)
+
+def bench_runs(
+    cfg: "TestConfig",
+    load_test_id: str = None,
+    last: int = 20,
+    **kwargs,
+):
+    with ResultsDB(os.path.join(cfg.home, "results.sqlite")) as db:
+        runs = db.runs(load_test=load_test_id, limit=last)
+    print_results_runs(runs)
+
+def bench_compare(
+    cfg: "TestConfig",
+    baseline: str,
+    candidate: str,
+    load_test_id: str = None,
+    last: int = 10,
+    alpha: float = 0.05,
+    threshold: float = 0.05,
+    **kwargs,
+):
+    with ResultsDB(os.path.join(cfg.home, "results.sqlite")) as db:
+        baseline_runs = db.runs(binary=baseline, load_test=load_test_id, limit=last)
+        candidate_runs = db.runs(binary=candidate, load_test=load_test_id, limit=last)
+    for name, runs in [(baseline, baseline_runs), (candidate, candidate_runs)]:
+        if not runs:
+            raise Exception("No recorded runs match \"%s\"%s (see \"bench runs\")" % (
+                name, (" for load test \"%s\"" % load_test_id) if load_test_id else ""))
+        load_tests = set(run["load_test"] for run in runs)
+        if len(load_tests) > 1:
+            logger.warning("Runs for \"%s\" span several load tests (%s), consider using --load-test", name, ", ".join(sorted(load_tests)))
+    if mann_whitney_min_p(len(baseline_runs), len(candidate_runs)) >= alpha:
+        logger.warning("With %d baseline and %d candidate run(s), no difference can be significant at alpha=%g (with the default alpha, at least 4 runs of each are needed)",
+            len(baseline_runs), len(candidate_runs), alpha)
+    comparisons = compare_runs(baseline_runs, candidate_runs, alpha=alpha, threshold=threshold)
+    print_run_comparison(baseline, candidate, len(baseline_runs), len(candidate_runs), comparisons)
+    regressions = [c["metric"] for c in comparisons if c["verdict"] == "regression"]
+    if regressions:
+        raise Exception("Performance regression(s) in %s relative to %s: %s" % (candidate, baseline, ", ".join(regressions)))
+    logger.info("No significant performance regressions in %s relative to %s", candidate, baseline)
+
+def deploy_tendermint_network(
+    cfg: "TestConfig",
+    keep_existing_tendermint_config: bool = False,
+    workers: int = None,
+    force: bool = False,
+    fanout: int = 0,
+    **kwargs,
+):
+    """Install Tendermint on all target nodes."""
+
+    node_ips = load_node_ips()
+    # 1. generate tendermint testnet config
+    config_path = os.path.join(cfg.home, "tendermint", "config")
+    with phase_timer("generate config"):
+        peers = tendermint_generate_config(
+            config_path,
+            len(node_ips['pub']),
+            keep_existing_tendermint_config,
+            node_ips,
+            workers=workers,
+        )
 
-    tendermint_finalize_config(cfg, peers)
+    with phase_timer("finalize config"):
+        tendermint_finalize_config(cfg, peers, workers=workers)
 
     binary_path = os.path.join(cfg.home, "bin")
     # deploy all nodes configuration and start the network
-    ansible_deploy_tendermint(
-        cfg,
-        binary_path,
-        peers,
+    with phase_timer("deploy"):
+        ansible_deploy_tendermint(
+            cfg,
+            binary_path,
+            peers,
+            force=force,
+            fanout=fanout,
+        )
+
+    save_deployment_state(
+        os.path.join(cfg.home, "tendermint", "state.json"),
+        build_deployment_state(
+            cfg,
+            peers,
+            node_ips["pub"],
+            node_ips["pri"],
+            ["http://%s:%d" % (host, TENDERMINT_RPC_PORT) for host in node_ips["pub"]],
+        ),
     )
 
-def tendermint_finalize_config(cfg: "TestConfig", peers: List[TendermintNodeConfig]):
-    genesis_doc = {
-        "genesis_time": pytz.utc.localize(datetime.datetime.utcnow()).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-        "chain_id": cfg.id,
-        "validators": [],
-        "app_hash": "",
-    }
+def tendermint_finalize_config(
+    cfg: "TestConfig",
+    peers: List[TendermintNodeConfig],
+    workers: int = None,
+    workdir: str = None,
+    node_overrides: List[dict] = None,
+):
+    """Writes the genesis file and each node's final configuration. The
+    genesis document is built and written once, and hard-linked into each
+    node's configuration folder. Each node's configuration is rendered from
+    its generated configuration plus the shared overlay, its own persistent
+    peers and any per-node overrides (by section), across a pool of worker
+    processes."""
+    workdir = workdir or os.path.join(cfg.home, "tendermint")
+    node_overrides = node_overrides or [dict() for _ in peers]
+    shared_genesis_file = os.path.join(workdir, "genesis.json")
+
+    with phase_timer("build genesis"):
+        genesis_doc = {
+            "genesis_time": pytz.utc.localize(datetime.datetime.utcnow()).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "chain_id": cfg.id,
+            "validators": [
+                {
+                    "address": node_cfg.priv_validator_key.address,
+                    "pub_key": {
+                        "type": node_cfg.priv_validator_key.pub_key.type,
+                        "value": node_cfg.priv_validator_key.pub_key.value,
+                    },
+                    "name": node_cfg.config["moniker"],
+                    "power": "10",
+                }
+                for node_cfg in peers
+            ],
+            "app_hash": "",
+        }
+        if cfg.consensus_params:
+            genesis_doc["consensus_params"] = merge_consensus_params(TENDERMINT_DEFAULT_CONSENSUS_PARAMS, cfg.consensus_params)
+        existing_genesis_doc = load_existing_genesis_doc(shared_genesis_file, peers)
+        # Keep the genesis time stable if the chain itself hasn't changed, so that
+        # redeploys only see the nodes whose configuration actually changed
+        if existing_genesis_doc is not None and \
+                existing_genesis_doc.get("chain_id") == genesis_doc["chain_id"] and \
+                existing_genesis_doc.get("validators") == genesis_doc["validators"] and \
+                existing_genesis_doc.get("consensus_params") == genesis_doc.get("consensus_params"):
+            genesis_doc["genesis_time"] = existing_genesis_doc["genesis_time"]
 
-    persistent_peers = unique_peer_ids(peers)
+    with phase_timer("write genesis"):
+        tmp_genesis_file = shared_genesis_file + ".tmp"
+        with open(tmp_genesis_file, "wt") as f:
+            json.dump(genesis_doc, f, indent=2)
+        os.replace(tmp_genesis_file, shared_genesis_file)
+        for node_cfg in peers:
+            link_or_copy(shared_genesis_file, os.path.join(node_cfg.config_path, "genesis.json"))
+
+    with phase_timer("build peer topology"):
+        topology = cfg.topology or TopologyConfig()
+        topology_file = os.path.join(workdir, "topology.json")
+        adjacency = None
+        if topology.type != "full":
+            adjacency = build_peer_topology(topology, len(peers))
+            save_json_config(
+                topology_file,
+                describe_peer_topology(topology, adjacency, [node_cfg.config["moniker"] for node_cfg in peers]),
+            )
+        elif os.path.isfile(topology_file):
+            os.remove(topology_file)
 
-    for pp in persistent_peers:
-        logger.info("Get persistent peers: %s", persistent_peers)
+    with phase_timer("render node configuration"):
+        peer_ids = sorted(unique_peer_ids(peers))
+        workers = workers or os.cpu_count() or 1
+        jobs = []
+        for i, node_cfg in enumerate(peers):
+            overrides = merge_config_overrides(cfg.tendermint_config, node_overrides[i])
+            if adjacency is not None:
+                overrides["p2p"] = dict(
+                    overrides.get("p2p", dict()),
+                    **topology_node_p2p_config(topology, [peers[j].peer_id for j in sorted(adjacency[i])]),
+                )
+            jobs.append((node_cfg.config_path, node_cfg.config, node_cfg.peer_id, overrides))
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_finalize_worker,
+            initargs=(peer_ids,),
+        ) as pool:
+            list(pool.map(finalize_node_config, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    logger.info("Finalized configuration for %d node(s)", len(peers))
 
-    for node_cfg in peers:
-        genesis_doc["validators"].append({
-            "address": node_cfg.priv_validator_key.address,
-            "pub_key": {
-                "type": node_cfg.priv_validator_key.pub_key.type,
-                "value": node_cfg.priv_validator_key.pub_key.value,
-            },
-            "name": node_cfg.config["moniker"],
-            "power": "10",
+def init_finalize_worker(peer_ids: List[str]):
+    joined = ",".join(peer_ids)
+    # the offset of each peer ID within the joined string
+    offsets = dict()
+    pos = 0
+    for peer_id in peer_ids:
+        offsets[peer_id] = pos
+        pos += len(peer_id) + 1
+    _finalize_worker_state["joined_peer_ids"] = joined
+    _finalize_worker_state["peer_id_offsets"] = offsets
+
+def finalize_node_config(job):
+    """Renders and writes a single node's final configuration. Intended to
+    be run in a worker process initialized by init_finalize_worker, so takes
+    a single tuple of (config path, generated config, peer ID, overrides)
+    as its argument. Unless the overrides specify its persistent peers, the
+    node is peered with every other node."""
+    config_path, config, peer_id, overrides = job
+    _cfg = dict(config)
+    for section, section_overrides in TENDERMINT_CONFIG_OVERLAY.items():
+        _cfg[section] = dict(config.get(section, dict()), **section_overrides)
+    if "persistent-peers" not in overrides.get("p2p", dict()):
+        _cfg["p2p"] = dict(config.get("p2p", dict()), **{
+            "persistent-peers": persistent_peers_without(
+                _finalize_worker_state["joined_peer_ids"],
+                _finalize_worker_state["peer_id_offsets"],
+                peer_id,
+            ),
         })
+    for section, section_overrides in overrides.items():
+        if isinstance(section_overrides, dict):
+            _cfg[section] = dict(_cfg.get(section, dict()), **section_overrides)
+        else:
+            _cfg[section] = section_overrides
+    save_toml_config(os.path.join(config_path, "config.toml"), _cfg)
 
-    for node_cfg in peers:
-        _cfg = deepcopy(node_cfg.config)
-        _cfg["p2p"]["persistent-peers"] = ",".join(persistent_peers - {node_cfg.peer_id})
-        _cfg["rpc"]["laddr"] = "tcp://0.0.0.0:26657"
-        _cfg["instrumentation"]["prometheus"] = True
-        _cfg["consensus"]["create-empty-blocks"] = False
-        _cfg["consensus"]["peer-gossip-sleep-duration"] = "0ms"
-        save_toml_config(os.path.join(node_cfg.config_path, "config.toml"), _cfg)
-
-        node_genesis_file = os.path.join(node_cfg.config_path, "genesis.json")
-        with open(node_genesis_file, "wt") as f:
-            json.dump(genesis_doc, f, indent=2)
+def merge_config_overrides(base: dict, overrides: dict) -> dict:
+    """Merges the given Tendermint configuration overrides into the base
+    overrides, section by section."""
+    result = dict(base)
+    for section, section_overrides in overrides.items():
+        if isinstance(section_overrides, dict) and isinstance(result.get(section, None), dict):
+            result[section] = dict(result[section], **section_overrides)
+        else:
+            result[section] = section_overrides
+    return result
+
+def merge_consensus_params(defaults: dict, params: dict) -> dict:
+    """Merges the given consensus parameters into the defaults, section by
+    section, encoding integers as strings as Tendermint expects."""
+    result = deepcopy(defaults)
+    for section, section_params in params.items():
+        if not isinstance(section_params, dict):
+            raise Exception("Expected consensus parameters section \"%s\" to be a mapping of parameters" % section)
+        result.setdefault(section, dict())
+        for name, value in section_params.items():
+            is_int = isinstance(value, int) and not isinstance(value, bool)
+            result[section][name] = str(value) if is_int else value
+    return result
 
+def persistent_peers_without(joined: str, offsets: Dict[str, int], peer_id: str) -> str:
+    """Returns the given comma-separated list of peer IDs without the given
+    peer ID, by slicing it out of the list rather than rebuilding it."""
+    if peer_id not in offsets:
+        return joined
+    start = offsets[peer_id]
+    end = start + len(peer_id)
+    if start == 0:
+        return joined[end + 1:]
+    return joined[:start - 1] + joined[end:]
+
+def load_existing_genesis_doc(shared_genesis_file: str, peers: List[TendermintNodeConfig]) -> dict:
+    """Loads the previously written genesis document, if any."""
+    candidates = [shared_genesis_file]
+    if peers:
+        candidates.append(os.path.join(peers[0].config_path, "genesis.json"))
+    for genesis_file in candidates:
+        if os.path.isfile(genesis_file):
+            with open(genesis_file, "rt") as f:
+                return json.load(f)
+    return None
 
 def tendermint_generate_config(
     workdir: str,
     validators: int,
     keep_existing: bool,
     node_ips: list,
+    workers: int = None,
 ) -> List[TendermintNodeConfig]:
     """Generates the Tendermint network configureation for a testnet."""
     logger.info("Genrating Tendermint configuration for testnet")
     if os.path.isdir(workdir):
         if keep_existing:
             logger.info("Configuration already exists, keeping existing configuration")
-            return tendermint_load_peers(workdir, validators)
+            return tendermint_load_peers(workdir, validators, node_ips)
         
         logger.info("Removing existing configuration directory: %s", workdir)
         shutil.rmtree(workdir)
 
     ensure_path_exists(workdir)
-    cmd = [
-        "tendermint", "testnet",
-        "--v", "%d" % validators,
-        "--populate-persistent-peers=false", # we'll handle this ourselves later
-        "--o", workdir,
-    ]
-    sh(cmd)
-    return tendermint_load_peers(workdir, validators, node_ips)
+    return tendermint_generate_testnet(workdir, validators, node_ips, workers=workers)
+
+def tendermint_generate_testnet(
+    workdir: str,
+    validators: int,
+    node_ips: dict,
+    workers: int = None,
+) -> List[TendermintNodeConfig]:
+    """Generates the keys and configuration for every node in the testnet in
+    memory, without relying on a local `tendermint` binary. Node generation is
+    spread across a pool of worker processes, each of which writes its node's
+    files out in a single pass."""
+    workers = workers or os.cpu_count() or 1
+    logger.info("Generating keys and configuration for %d nodes using %d worker(s)", validators, workers)
+    jobs = [(workdir, i, node_ips['pub'][i]) for i in range(validators)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(
+            tendermint_generate_node,
+            jobs,
+            chunksize=max(1, validators // (workers * 4)),
+        ))
+
+def tendermint_generate_node(job) -> TendermintNodeConfig:
+    """Generates and writes the keys and configuration for a single node.
+    Intended to be run in a worker process, so takes a single tuple of
+    (workdir, node index, public IP) as its argument."""
+    workdir, index, host = job
+    node_id = "node%d" % index
+    node_path = os.path.join(workdir, node_id)
+    host_cfg_path = os.path.join(node_path, "config")
+    ensure_path_exists(host_cfg_path)
+    ensure_path_exists(os.path.join(node_path, "data"))
+
+    priv_val_key = generate_tendermint_priv_validator_key()
+    node_key = TendermintNodeKey(
+        type="tendermint/PrivKeyEd25519",
+        value=base64.b64encode(generate_ed25519_priv_key()).decode("utf-8"),
+    )
+    node_address = ed25519_pub_key_to_id(
+        get_ed25519_pub_key(node_key.value, "generated key for %s" % node_id),
+    )
+    config = tendermint_default_config(node_id)
+
+    save_toml_config(os.path.join(host_cfg_path, "config.toml"), config)
+    save_json_config(os.path.join(host_cfg_path, "priv_validator_key.json"), {
+        "address": priv_val_key.address,
+        "pub_key": priv_val_key.pub_key._asdict(),
+        "priv_key": priv_val_key.priv_key._asdict(),
+    })
+    save_json_config(os.path.join(host_cfg_path, "node_key.json"), {
+        "id": node_address,
+        "priv_key": node_key._asdict(),
+    })
+    save_json_config(os.path.join(node_path, "data", "priv_validator_state.json"), {
+        "height": "0",
+        "round": 0,
+        "step": 0,
+    })
+    return TendermintNodeConfig(
+        config_path=host_cfg_path,
+        config=config,
+        priv_validator_key=priv_val_key,
+        node_key=node_key,
+        peer_id=tendermint_peer_id(host, node_address),
+    )
+
+def tendermint_default_config(moniker: str) -> dict:
+    """Builds a fresh copy of the default node configuration for the node with
+    the given moniker."""
+    config = {
+        k: (dict(v) if isinstance(v, dict) else v)
+        for k, v in TENDERMINT_DEFAULT_CONFIG.items()
+    }
+    config["moniker"] = moniker
+    return config
 
 def tendermint_load_peers(base_path: str, node_count: int, node_ips: list) -> List[TendermintNodeConfig]:
     """Loads the relevant Tendermint node configuration for all nodes in the given base path."""
@@ -506,6 +2309,10 @@ def load_node_ips():
         pri_ips.append(item.strip())
     node_ips['pub'] = pub_ips
     node_ips['pri'] = pri_ips
+    node_ips['client'] = []
+    if os.path.isfile(NODE_CLIENT_IPS_FILE):
+        with open(NODE_CLIENT_IPS_FILE, "r") as client_f:
+            node_ips['client'] = [item.strip() for item in client_f.readlines() if item.strip()]
 
     return node_ips
 
@@ -525,15 +2332,167 @@ def load_test_config(filename: str) -> TestConfig:
         raise Exception("Missing required \"id\" parameter in configuration file")
 
     config_base_path = os.path.dirname(os.path.abspath(filename))
+    load_tests = load_load_tests_config(cfg_dict.get("load_tests", []))
     return TestConfig(
         id=cfg_dict["id"],
         # monitoring=load_monitoring_config(cfg_dict.get("monitoring", dict())),
         # abci=load_abci_configs(cfg_dict.get("abci", dict()), config_base_path),
         # node_groups=load_node_groups_config(cfg_dict.get("node_groups", []), config_base_path, abci_config),
-        # load_tests=load_load_tests_config(cfg_dict.get("load_tests", [])),
+        load_tests=load_tests,
         home=tmtest_home,
+        topology=load_topology_config(cfg_dict.get("topology", dict())),
+        tendermint_config=load_tendermint_config_overrides(cfg_dict.get("tendermint_config", None) or dict()),
+        consensus_params=cfg_dict.get("consensus_params", None) or dict(),
+        sweeps=load_sweeps_config(cfg_dict.get("sweeps", []), load_tests),
+        faults=load_faults_config(cfg_dict.get("faults", []), load_tests),
+        tendermint_binaries=OrderedDict([
+            (label, resolve_relative_path(os.path.expanduser(path), config_base_path))
+            for label, path in (cfg_dict.get("tendermint_binaries", None) or dict()).items()
+        ]),
     )
 
+def load_load_tests_config(cfg: list) -> OrderedDictType[str, LoadTestConfig]:
+    """Loads the `load_tests` section of the configuration file, which is a
+    list of single-entry mappings of load test IDs to their parameters."""
+    if not isinstance(cfg, list):
+        raise Exception("Expected \"load_tests\" to be a list")
+    result = OrderedDict()
+    for entry in cfg:
+        if not isinstance(entry, dict) or len(entry) != 1:
+            raise Exception("Expected each load test to be a mapping of its ID to its parameters")
+        for lt_id, lt_cfg in entry.items():
+            lt_cfg = lt_cfg or dict()
+            unknown = set(lt_cfg.keys()) - set(LoadTestConfig._fields)
+            if unknown:
+                raise Exception("Unrecognized parameter(s) for load test \"%s\": %s" % (lt_id, ", ".join(sorted(unknown))))
+            lt = LoadTestConfig(**dict(lt_cfg, id=lt_id))
+            if lt.method not in VALID_LOAD_TEST_METHODS:
+                raise Exception("Unsupported method for load test \"%s\": %s (only \"tmtk\" is supported)" % (lt_id, lt.method))
+            if lt.broadcast_tx_method not in VALID_BROADCAST_TX_METHODS:
+                raise Exception("Invalid broadcast_tx_method for load test \"%s\": %s" % (lt_id, lt.broadcast_tx_method))
+            for field in ["time", "connections", "rate", "size"]:
+                if not isinstance(getattr(lt, field), (int, float)) or getattr(lt, field) <= 0:
+                    raise Exception("Expected \"%s\" for load test \"%s\" to be a positive number" % (field, lt_id))
+            result[lt_id] = lt
+    return result
+
+def load_tendermint_config_overrides(cfg: dict) -> dict:
+    """Loads the `tendermint_config` section of the configuration file, which
+    overrides Tendermint configuration parameters for all nodes, either by
+    section (e.g. `consensus: {timeout-commit: 500ms}`) or at the top level
+    (e.g. `log-level: debug`)."""
+    if not isinstance(cfg, dict):
+        raise Exception("Expected \"tendermint_config\" to be a mapping of Tendermint configuration parameters")
+    for key, value in cfg.items():
+        if isinstance(TENDERMINT_DEFAULT_CONFIG.get(key, None), dict) and not isinstance(value, dict):
+            raise Exception("Expected Tendermint configuration section \"%s\" to be a mapping of parameters" % key)
+    return cfg
+
+def load_faults_config(cfg: list, load_tests: OrderedDictType[str, LoadTestConfig]) -> OrderedDictType[str, FaultScheduleConfig]:
+    """Loads the `faults` section of the configuration file, which is a list
+    of single-entry mappings of fault schedule IDs to their parameters. Each
+    schedule's events name an action, when to take it (in seconds since its
+    load test started) and the nodes to take it on, either as node/group
+    references or as a count of validators."""
+    if not isinstance(cfg, list):
+        raise Exception("Expected \"faults\" to be a list")
+    result = OrderedDict()
+    for entry in cfg:
+        if not isinstance(entry, dict) or len(entry) != 1:
+            raise Exception("Expected each fault schedule to be a mapping of its ID to its parameters")
+        for schedule_id, schedule_cfg in entry.items():
+            schedule_cfg = schedule_cfg or dict()
+            unknown = set(schedule_cfg.keys()) - set(FaultScheduleConfig._fields)
+            if unknown:
+                raise Exception("Unrecognized parameter(s) for fault schedule \"%s\": %s" % (schedule_id, ", ".join(sorted(unknown))))
+            events = []
+            for event_cfg in schedule_cfg.get("events", None) or []:
+                unknown = set(event_cfg.keys()) - set(FaultEvent._fields)
+                if unknown:
+                    raise Exception("Unrecognized parameter(s) for an event of fault schedule \"%s\": %s" % (schedule_id, ", ".join(sorted(unknown))))
+                event = FaultEvent(**dict(event_cfg, nodes=event_cfg.get("nodes", None) or []))
+                if event.action not in FAULT_ACTIONS:
+                    raise Exception("Invalid action for an event of fault schedule \"%s\": %s (expected one of %s)" % (
+                        schedule_id, event.action, ", ".join(FAULT_ACTIONS)))
+                if [bool(event.nodes), event.count is not None, event.fraction is not None].count(True) != 1:
+                    raise Exception("Expected each event of fault schedule \"%s\" to have one of \"nodes\", \"count\" or \"fraction\"" % schedule_id)
+                if event.fraction is not None and (not isinstance(event.fraction, (int, float)) or not 0 < event.fraction <= 1):
+                    raise Exception("Expected \"fraction\" for an event of fault schedule \"%s\" to be between 0 and 1" % schedule_id)
+                if event.duration is not None and FAULT_ACTIONS[event.action] is None:
+                    raise Exception("Action \"%s\" in fault schedule \"%s\" can't have a duration" % (event.action, schedule_id))
+                events.append(event)
+            schedule = FaultScheduleConfig(**dict(schedule_cfg, id=schedule_id, events=events))
+            if schedule.load_test not in load_tests:
+                raise Exception("Unrecognized load test for fault schedule \"%s\": %s" % (schedule_id, schedule.load_test))
+            if not schedule.events:
+                raise Exception("Fault schedule \"%s\" has no events" % schedule_id)
+            result[schedule_id] = schedule
+    return result
+
+def load_sweeps_config(cfg: list, load_tests: OrderedDictType[str, LoadTestConfig]) -> OrderedDictType[str, SweepConfig]:
+    """Loads the `sweeps` section of the configuration file, which is a list
+    of single-entry mappings of sweep IDs to their parameters. Each sweep's
+    parameters map dotted parameter paths (e.g. `consensus.timeout-commit`,
+    or `consensus_params.block.max_bytes` for genesis consensus parameters) to
+    the list of values to try."""
+    if not isinstance(cfg, list):
+        raise Exception("Expected \"sweeps\" to be a list")
+    result = OrderedDict()
+    for entry in cfg:
+        if not isinstance(entry, dict) or len(entry) != 1:
+            raise Exception("Expected each sweep to be a mapping of its ID to its parameters")
+        for sweep_id, sweep_cfg in entry.items():
+            sweep_cfg = sweep_cfg or dict()
+            unknown = set(sweep_cfg.keys()) - set(SweepConfig._fields)
+            if unknown:
+                raise Exception("Unrecognized parameter(s) for sweep \"%s\": %s" % (sweep_id, ", ".join(sorted(unknown))))
+            sweep = SweepConfig(**dict(
+                sweep_cfg,
+                id=sweep_id,
+                parameters=OrderedDict(sweep_cfg.get("parameters", None) or dict()),
+            ))
+            if sweep.load_test not in load_tests:
+                raise Exception("Unrecognized load test for sweep \"%s\": %s" % (sweep_id, sweep.load_test))
+            if not sweep.parameters:
+                raise Exception("Sweep \"%s\" has no parameters" % sweep_id)
+            for path, values in sweep.parameters.items():
+                parts = path.split(".")
+                if parts[0] == "consensus_params" and len(parts) != 3:
+                    raise Exception("Expected consensus parameter \"%s\" in sweep \"%s\" to be of the form consensus_params.<section>.<name>" % (path, sweep_id))
+                if parts[0] != "consensus_params" and len(parts) > 2:
+                    raise Exception("Expected Tendermint parameter \"%s\" in sweep \"%s\" to be of the form <section>.<name> or <name>" % (path, sweep_id))
+                if not isinstance(values, list) or not values:
+                    raise Exception("Expected the values of parameter \"%s\" in sweep \"%s\" to be a non-empty list" % (path, sweep_id))
+            for field in ["repeat", "settle"]:
+                if not isinstance(getattr(sweep, field), (int, float)) or getattr(sweep, field) < 0:
+                    raise Exception("Expected \"%s\" for sweep \"%s\" to be a non-negative number" % (field, sweep_id))
+            result[sweep_id] = sweep
+    return result
+
+def load_topology_config(cfg: dict) -> TopologyConfig:
+    """Loads the `topology` section of the configuration file, which
+    describes how the validators are connected to each other through their
+    persistent peers."""
+    cfg = cfg or dict()
+    if not isinstance(cfg, dict):
+        raise Exception("Expected \"topology\" to be a mapping of parameters")
+    unknown = set(cfg.keys()) - set(TopologyConfig._fields)
+    if unknown:
+        raise Exception("Unrecognized topology parameter(s): %s" % ", ".join(sorted(unknown)))
+    topology = TopologyConfig(**dict(cfg, regions=OrderedDict(cfg.get("regions", None) or dict())))
+    if topology.type not in VALID_TOPOLOGY_TYPES:
+        raise Exception("Invalid topology type \"%s\", must be one of: %s" % (topology.type, ", ".join(VALID_TOPOLOGY_TYPES)))
+    for field in ["degree", "hubs", "bridges"]:
+        if not isinstance(getattr(topology, field), int) or getattr(topology, field) <= 0:
+            raise Exception("Expected topology \"%s\" to be a positive integer" % field)
+    if not isinstance(topology.seed, int):
+        raise Exception("Expected topology \"seed\" to be an integer")
+    for region, count in topology.regions.items():
+        if not isinstance(count, int) or count <= 0:
+            raise Exception("Expected the node count for topology region \"%s\" to be a positive integer" % region)
+    if topology.type == "region" and len(topology.regions) == 0:
+        raise Exception("The \"region\" topology requires \"regions\" to map region names to node counts")
+    return topology
 
 def configure_env_var_yaml_loading(fail_on_missing=False):
     for matcher in ENV_VAR_MATCHERS:
@@ -574,7 +2533,16 @@ def ansible_deploy_tendermint(
     cfg: TestConfig,
     binary_path: str,
     peers: List[TendermintNodeConfig],
+    force: bool = False,
+    fanout: int = 0,
 ):
+    """Deploys the given nodes' configuration and the Tendermint binary to all
+    hosts. Unless `force` is set, only those hosts whose configuration or
+    binary has changed since the last successful deployment (according to the
+    deployment manifest) are touched. If `fanout` is set, the binary is
+    uploaded to a single host and then spread between the hosts themselves
+    (see distribute_file) rather than being uploaded to each host by
+    Ansible."""
     workdir = os.path.join(cfg.home, "tendermint")
     if not os.path.isdir(workdir):
         raise Exception("Missing working directory: %s", workdir)
@@ -585,12 +2553,12 @@ def ansible_deploy_tendermint(
         "service_user": "root",
         "service_group": "tendermint",
         "service_user_shell": "/bin/bash",
-        "service_state": "started",
+        "service_state": "restarted",
         "service_template": "tendermint.service.jinja2",
         "service_desc": "Tendermint",
-        "service_exec_cmd": "/usr/local/bin/tendermint node --mode validator --proxy-app=kvstore",
-        "src_binary": "/root/goApps/bin/tendermint",
-        "dest_binary": "/usr/local/bin/tendermint",
+        "service_exec_cmd": " ".join([TENDERMINT_REMOTE_BINARY] + TENDERMINT_NODE_ARGS),
+        "src_binary": TENDERMINT_SOURCE_BINARY,
+        "dest_binary": TENDERMINT_REMOTE_BINARY,
         "src_config_path": os.path.join(workdir, "config"),
     }
 
@@ -607,128 +2575,4465 @@ def ansible_deploy_tendermint(
             ),
         )
         i += 1
-
+    client_ips = load_node_ips()['client']
+    if client_ips:
+        inventory["loadtest"] = [
+            AnsibleInventoryEntry(alias="client%d" % i, ansible_host=ip)
+            for i, ip in enumerate(client_ips)
+        ]
 
     inventory_file = os.path.join(workdir, "inventory")
     save_ansible_inventory(inventory_file, inventory)
+
+    manifest_file = os.path.join(workdir, "deploy-manifest.json")
+    manifest = build_deploy_manifest(
+        extra_vars["src_binary"],
+        extra_vars["src_config_path"],
+        inventory["tendermint"],
+    )
+    prev_manifest = dict() if force else load_deploy_manifest(manifest_file)
+    hosts = changed_deploy_hosts(prev_manifest, manifest)
+    if not hosts:
+        logger.info("No configuration or binary changes since the last deployment, nothing to do")
+        return
+    extra_vars["copy_binary"] = prev_manifest.get("binary") != manifest["binary"]
+    if fanout > 0 and extra_vars["copy_binary"]:
+        node_ips = load_node_ips()
+        private_ips = dict(zip(node_ips["pub"], node_ips["pri"]))
+        with phase_timer("distribute binary"):
+            extra_vars["staged_binary"] = asyncio.run(distribute_file(
+                default_transport(cfg),
+                [
+                    (entry, private_ips.get(entry.ansible_host, entry.ansible_host))
+                    for entry in inventory["tendermint"] if entry.alias in hosts
+                ],
+                extra_vars["src_binary"],
+                manifest["binary"],
+                fanout=fanout,
+            ))
+
     extra_vars_file = os.path.join(workdir, "extra-vars.yaml")
     save_yaml_config(extra_vars_file, extra_vars)
-    
-    logger.info("Deploying Tendermint network")
-    sh([
+
+    cmd = [
         "ansible-playbook",
         "-i", inventory_file,
         "-e", "@%s" % extra_vars_file,
-        os.path.join("ansible","deploy.yaml"),
-    ])
+    ]
+    if len(hosts) < len(inventory["tendermint"]):
+        logger.info("Deploying Tendermint to %d of %d host(s): %s", len(hosts), len(inventory["tendermint"]), ", ".join(hosts))
+        cmd.extend(["--limit", ",".join(hosts)])
+    else:
+        logger.info("Deploying Tendermint network")
+    cmd.append(os.path.join("ansible","deploy.yaml"))
+    ansible_playbook(cmd)
+    save_json_config(manifest_file, manifest)
     logger.info("Tendermint network successfully deployed")
 
-def ansible_set_tendermint_nodes_state(
-    workdir: str,
-    state: str,
+def ansible_playbook(cmd: List[str]):
+    """Runs the given ansible-playbook command. When profiling, the duration
+    of each task on each host is captured through our callback plugin and
+    added to the trace."""
+    if not TRACER.enabled:
+        sh(cmd)
+        return
+    with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as f:
+        trace_file = f.name
+    try:
+        sh(cmd, env=dict(
+            os.environ,
+            ANSIBLE_CALLBACK_PLUGINS=os.path.abspath(os.path.join("ansible", "callback_plugins")),
+            ANSIBLE_CALLBACKS_ENABLED="tmtk_trace",
+            TMTK_ANSIBLE_TRACE=trace_file,
+        ))
+    finally:
+        with open(trace_file, "rt") as f:
+            for line in f:
+                record = json.loads(line)
+                TRACER.add(
+                    record["task"],
+                    record["start"],
+                    record["end"] - record["start"],
+                    track="ansible: %s" % record["host"],
+                    cat="ansible",
+                    args={"status": record["status"]},
+                )
+        os.remove(trace_file)
+
+async def distribute_file(
+    transport,
+    hosts: List[tuple],
+    local_file: str,
+    file_hash: str,
+    fanout: int = 2,
+    dist_path: str = REMOTE_DIST_PATH,
+    port: int = REMOTE_DIST_PORT,
+    max_attempts: int = 3,
+) -> str:
+    """Makes sure that each of the given (inventory entry, private IP) hosts
+    has a copy of the given file, stored under its hash in the remote
+    distribution folder, and returns the path to the remote copies. Hosts
+    that already have a copy with the right hash are skipped. The file is
+    uploaded from here to one host only. From then on, in each round, every
+    host that has the file serves it over HTTP on its private IP to up to
+    `fanout` hosts that don't, so the number of rounds grows with the
+    logarithm of the number of hosts."""
+    remote_file = "%s/%s" % (dist_path, file_hash)
+    verify = '[ "$(sha256sum "%(tmp)s" | cut -d" " -f1)" = "%(hash)s" ] && mv "%(tmp)s" "%(file)s"' % {
+        "tmp": remote_file + ".tmp",
+        "hash": file_hash,
+        "file": remote_file,
+    }
+    entries = [entry for entry, _ in hosts]
+    private_ips = dict((entry.alias, private_ip) for entry, private_ip in hosts)
+
+    results = await run_on_hosts(
+        transport,
+        entries,
+        '[ -f "%s" ] && sha256sum "%s" | cut -d" " -f1 || true' % (remote_file, remote_file),
+    )
+    have = [entry for entry, result in zip(entries, results) if result.output.strip() == file_hash]
+    need = [entry for entry in entries if entry not in have]
+    logger.info("%d of %d host(s) already have %s", len(have), len(entries), os.path.basename(local_file))
+    if not need:
+        return remote_file
+
+    start = time.monotonic()
+    if not have:
+        seed = need.pop(0)
+        with open(local_file, "rb") as f:
+            data = f.read()
+        logger.info("Uploading %s (%d bytes) to %s", os.path.basename(local_file), len(data), seed.alias)
+        log_host_results(await run_on_hosts(
+            transport,
+            [seed],
+            'mkdir -p "%s" && cat > "%s" && %s' % (dist_path, remote_file + ".tmp", verify),
+            timeout=600,
+            stdin=data,
+        ))
+        have.append(seed)
+
+    serve = '(cd "%s" && setsid nohup timeout 1800 python3 -m http.server %d --bind %%s >/dev/null 2>&1 &)' % (dist_path, port)
+    # the bracket keeps the pattern from matching the shell that runs it
+    stop = 'pkill -f "[h]ttp.server %d --bind" || true' % port
+    serving = list(have)
+    log_host_results(await run_on_hosts(transport, serving, lambda entry: serve % private_ips[entry.alias]))
+    attempts = collections.Counter()
+    rounds = 0
+    try:
+        while need:
+            rounds += 1
+            targets = need[:len(have) * fanout]
+            sources = dict(
+                (target.alias, have[(i + attempts[target.alias]) % len(have)])
+                for i, target in enumerate(targets)
+            )
+            logger.info("Distribution round %d: %d host(s) fetching from %d host(s)", rounds, len(targets), len(have))
+            results = await run_on_hosts(
+                transport,
+                targets,
+                lambda entry: 'mkdir -p "%s" && curl -fsS --retry 5 --retry-connrefused --retry-delay 1 -o "%s" http://%s:%d/%s && %s' % (
+                    dist_path,
+                    remote_file + ".tmp",
+                    private_ips[sources[entry.alias].alias],
+                    port,
+                    file_hash,
+                    verify,
+                ),
+                timeout=600,
+            )
+            received = []
+            for target, result in zip(targets, results):
+                if result.returncode == 0:
+                    received.append(target)
+                    continue
+                attempts[target.alias] += 1
+                logger.warning("%s (%s): failed to fetch from %s (attempt %d): %s", target.alias, target.ansible_host,
+                    sources[target.alias].alias, attempts[target.alias], result.output.strip())
+                if attempts[target.alias] >= max_attempts:
+                    raise Exception("Failed to distribute %s to %s" % (os.path.basename(local_file), target.alias))
+            log_host_results(await run_on_hosts(transport, received, lambda entry: serve % private_ips[entry.alias]))
+            serving.extend(received)
+            have.extend(received)
+            need = [entry for entry in need if entry not in received]
+    finally:
+        await run_on_hosts(transport, serving, stop)
+    logger.info("Distributed %s to %d host(s) in %d round(s) in %.2fs",
+        os.path.basename(local_file), len(entries), rounds, time.monotonic() - start)
+    return remote_file
+
+def build_deployment_state(
+    cfg: "TestConfig",
+    peers: List[TendermintNodeConfig],
+    hosts: List[str],
+    private_ips: List[str],
+    rpc_urls: List[str],
+    local: bool = False,
+) -> dict:
+    """Builds a compact description of the deployed network, from which
+    commands can find each node without reparsing its configuration."""
+    cache = dict()
+    return OrderedDict([
+        ("chain_id", cfg.id),
+        ("deployed", datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")),
+        ("local", local),
+        ("nodes", [
+            OrderedDict([
+                ("alias", "node%d" % i),
+                ("node_id", peer.peer_id.split("@")[0]),
+                ("peer_id", peer.peer_id),
+                ("validator_address", peer.priv_validator_key.address),
+                ("host", hosts[i]),
+                ("private_ip", private_ips[i]),
+                ("rpc", rpc_urls[i]),
+                ("peers", len(persistent_peers(peer.config_path))),
+                ("config_hash", hash_directory(peer.config_path, cache)),
+            ])
+            for i, peer in enumerate(peers)
+        ]),
+    ])
+
+def persistent_peers(config_path: str) -> List[str]:
+    """Returns the persistent peers in the given node configuration folder."""
+    p2p = load_toml_config(os.path.join(config_path, "config.toml")).get("p2p", dict())
+    return [peer for peer in p2p.get("persistent-peers", "").split(",") if peer]
+
+def save_deployment_state(filename: str, state: dict):
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wt") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp_filename, filename)
+
+def load_deployment_state(filename: str) -> dict:
+    if not os.path.isfile(filename):
+        raise Exception("Missing deployment state %s (has the network been deployed?)" % filename)
+    return load_json_config(filename)
+
+def load_deployed_nodes(
+    cfg: "TestConfig",
+    node_or_group_ids: List[str] = None,
+    fail_on_missing: bool = True,
+    local: bool = False,
 ):
-    """Attmpts to collect all nodes' details from the given refernces list
-    and ensure that they are all set to the desired state (Ansible state)."""
-    valid_states = {"started", "stopped", "restarted"}
-    if state not in valid_states:
-        raise Exception("Desired service state must be one of: %s", ",".join(valid_states))
-    state_verb = "starting" if state in {"started", "restarted"} else "stopping"
+    """Returns the deployment state of the network, along with that of each
+    of the referenced nodes (or all nodes, if no references are given)."""
+    workdir = local_network_path(cfg) if local else os.path.join(cfg.home, "tendermint")
+    state = load_deployment_state(os.path.join(workdir, "state.json"))
+    nodes = OrderedDict([(node["alias"], node) for node in state["nodes"]])
+    inventory = load_ansible_inventory(os.path.join(workdir, "inventory"))
+    return state, [
+        nodes[entry.alias]
+        for entry in resolve_inventory_entries(inventory, node_or_group_ids or [], fail_on_missing)
+        if entry.alias in nodes
+    ]
 
-    inventory_file = os.path.join(workdir, "inventory")
-    logger.info("%s hosts", state_verb.capitalize())
-    sh([
-        "ansible-playbook",
-        "-i", inventory_file,
-        "-e", "state=%s" % state,
-        os.path.join("ansible", "tendermint-state.yaml"),
+async def wait_for_network_ready(
+    nodes: List[dict],
+    started: float,
+    timeout: float = 300.0,
+    poll_interval: float = 0.25,
+    node_started: Dict[str, float] = None,
+) -> List[dict]:
+    """Polls all of the given nodes at once until each of them has connected
+    to (at least) its configured number of peers and committed its first
+    block, or until the timeout expires. Returns, for each node, the number
+    of seconds after its (monotonic) start time in `node_started` (or the
+    given start time) at which its RPC endpoint first responded, it was
+    fully peered, and it committed its first block (None for steps that
+    weren't reached)."""
+    deadline = started + timeout
+    node_started = node_started or dict()
+
+    async def watch(node: dict) -> dict:
+        node_start = node_started.get(node["alias"], started)
+        times = OrderedDict([("rpc", None), ("peered", None), ("first_block", None)])
+        client = RPCClient(node["rpc"], timeout=2.0)
+        try:
+            while None in times.values() and time.monotonic() < deadline:
+                try:
+                    status = await client.call("status")
+                    if times["rpc"] is None:
+                        times["rpc"] = time.monotonic() - node_start
+                    if times["first_block"] is None and int(status["sync_info"]["latest_block_height"]) > 0:
+                        times["first_block"] = time.monotonic() - node_start
+                    if times["peered"] is None:
+                        net_info = await client.call("net_info")
+                        if int(net_info["n_peers"]) >= node.get("peers", 0):
+                            times["peered"] = time.monotonic() - node_start
+                except Exception as e:
+                    # the node isn't up yet
+                    logger.debug("%s: %s", node["alias"], e)
+                    await client.close()
+                if None in times.values():
+                    await asyncio.sleep(poll_interval)
+        finally:
+            await client.close()
+        return times
+
+    return await asyncio.gather(*[watch(node) for node in nodes])
+
+def startup_times(times: List[dict]) -> dict:
+    """Summarizes the per-node startup times of a network: when the first
+    node committed a block, when all nodes had, when all of them were fully
+    peered, and when the last node was ready."""
+    return OrderedDict([
+        ("first_block_s", min(node_times["first_block"] for node_times in times)),
+        ("all_first_block_s", max(node_times["first_block"] for node_times in times)),
+        ("full_peering_s", max(node_times["peered"] for node_times in times)),
+        ("ready_s", max(max(node_times.values()) for node_times in times)),
     ])
-    logger.info("Hosts' state successfully set to \"%s\"", state)
 
-def ansible_fetch_logs(
+async def query_node_statuses(urls: List[str], timeout: float = 2.0, concurrency: int = 256) -> List[dict]:
+    """Queries the status of all of the given nodes at once, returning each
+    node's height, catch-up state and response time (or the error that
+    occurred), in the same order as the given URLs."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def query(url: str) -> dict:
+        async with sem:
+            client = RPCClient(url, timeout=timeout)
+            start = time.monotonic()
+            try:
+                status = await asyncio.wait_for(client.call("status"), timeout)
+                sync_info = status["sync_info"]
+                return OrderedDict([
+                    ("height", int(sync_info["latest_block_height"])),
+                    ("catching_up", bool(sync_info["catching_up"])),
+                    ("latest_block_time", sync_info.get("latest_block_time", None)),
+                    ("latency_ms", (time.monotonic() - start) * 1000.0),
+                    ("error", None),
+                ])
+            except Exception as e:
+                return OrderedDict([
+                    ("height", None),
+                    ("catching_up", None),
+                    ("latest_block_time", None),
+                    ("latency_ms", (time.monotonic() - start) * 1000.0),
+                    ("error", str(e) or e.__class__.__name__),
+                ])
+            finally:
+                await client.close()
+
+    return await asyncio.gather(*[query(url) for url in urls])
+
+def print_network_info(state: dict, nodes: List[dict], statuses: List[dict]):
+    heights = [status["height"] for status in statuses if status["height"] is not None]
+    max_height = max(heights) if heights else 0
+    print("")
+    print("Chain ID: %s (deployed %s%s)" % (state["chain_id"], state["deployed"], ", local" if state.get("local", False) else ""))
+    print("%-10s  %-21s  %-12s  %8s  %6s  %8s  %10s  %s" % ("node", "rpc", "node ID", "height", "behind", "catching", "latency ms", "error"))
+    for node, status in zip(nodes, statuses):
+        print("%-10s  %-21s  %-12s  %8s  %6s  %8s  %10.1f  %s" % (
+            node["alias"],
+            urllib.parse.urlparse(node["rpc"]).netloc,
+            node["node_id"][:12],
+            status["height"] if status["height"] is not None else "-",
+            (max_height - status["height"]) if status["height"] is not None else "-",
+            ("yes" if status["catching_up"] else "no") if status["catching_up"] is not None else "-",
+            status["latency_ms"],
+            status["error"] or "",
+        ))
+    unreachable = sum(1 for status in statuses if status["error"] is not None)
+    catching_up = sum(1 for status in statuses if status["catching_up"])
+    print("")
+    print("%d node(s): max height %d, min height %s, %d catching up, %d unreachable" % (
+        len(nodes), max_height, min(heights) if heights else "-", catching_up, unreachable))
+    print("")
+
+def build_deploy_manifest(
+    src_binary: str,
+    src_config_path: str,
+    entries: List[AnsibleInventoryEntry],
+) -> dict:
+    """Builds a deployment manifest containing content hashes of the
+    Tendermint binary and each node's rendered configuration directory."""
+    cache = dict()
+    return {
+        "binary": hash_file(src_binary),
+        "nodes": OrderedDict([
+            (entry.alias, {
+                "host": entry.ansible_host,
+                "config": hash_directory(os.path.join(src_config_path, entry.node_id), cache),
+            })
+            for entry in entries
+        ]),
+    }
+
+def load_deploy_manifest(filename: str) -> dict:
+    if not os.path.isfile(filename):
+        return dict()
+    with open(filename, "rt") as f:
+        return json.load(f)
+
+def changed_deploy_hosts(prev_manifest: dict, manifest: dict) -> List[str]:
+    """Returns the aliases of the hosts that need to be redeployed to go from
+    the previous deployment manifest to the given one."""
+    if prev_manifest.get("binary") != manifest["binary"]:
+        return list(manifest["nodes"].keys())
+    prev_nodes = prev_manifest.get("nodes", dict())
+    return [
+        alias for alias, node in manifest["nodes"].items()
+        if prev_nodes.get(alias) != node
+    ]
+
+def fetch_tendermint_logs(
+    cfg: "TestConfig",
     workdir: str,
+    node_or_group_ids: List[str] = None,
+    fail_on_missing: bool = True,
+    transport=None,
+    log_files: Dict[str, str] = None,
+    summarize: bool = False,
+    **kwargs,
+) -> List[LogFetchResult]:
+    """Streams the Tendermint logs from all of the referenced nodes at once
+    into per-node files in the logs folder in the tmtest home folder. The byte
+    offset reached for each node is recorded, so that subsequent fetches only
+    transfer new log data. Each node's log is read from the given log file for
+    that node, if any (which we can read without becoming root), otherwise
+    from Tendermint's standard log file location. If `summarize` is set, only
+    summaries of the logs are fetched instead (see summarize_tendermint_logs)."""
+    inventory = load_ansible_inventory(os.path.join(workdir, "inventory"))
+    entries = resolve_inventory_entries(inventory, node_or_group_ids or [], fail_on_missing)
+    if summarize:
+        return summarize_tendermint_logs(cfg, entries, transport=transport, log_files=log_files)
+    logs_path = os.path.join(cfg.home, "logs")
+    ensure_path_exists(logs_path)
+    offsets_file = os.path.join(logs_path, "offsets.json")
+    offsets = load_json_config(offsets_file) if os.path.isfile(offsets_file) else dict()
+
+    start = time.monotonic()
+    results = asyncio.run(fetch_host_logs(
+        transport or default_transport(cfg),
+        entries,
+        logs_path,
+        offsets,
+        log_files=log_files,
+    ))
+
+    failed = []
+    for result in results:
+        if result.error is not None:
+            logger.error("%s (%s): failed to fetch logs: %s", result.alias, result.host, result.error)
+            failed.append(result.alias)
+            continue
+        offsets[result.alias] = {"host": result.host, "offset": result.end}
+        logger.info("%s (%s): fetched %d bytes of logs (%d bytes transferred) in %.2fs",
+            result.alias, result.host, result.end - result.start, result.transferred, result.duration)
+    save_json_config(offsets_file, offsets)
+    if failed:
+        raise Exception("Failed to fetch logs from %d host(s): %s" % (len(failed), ", ".join(failed)))
+    logger.info("Fetched logs from %d host(s) in %.2fs to %s", len(results), time.monotonic() - start, logs_path)
+    return results
+
+def summarize_tendermint_logs(
+    cfg: "TestConfig",
+    entries: List[AnsibleInventoryEntry],
+    transport=None,
+    log_files: Dict[str, str] = None,
+) -> List[LogFetchResult]:
+    """Summarizes the Tendermint logs of all of the given nodes at once on the
+    nodes themselves, using the agent that the install role puts on each host
+    (see LOG_AGENT_SCRIPT), and fetches only the summaries into the
+    "summaries" folder in the logs folder. The summaries are then analyzed in
+    the same way as the raw logs are by "logs analyze"."""
+    summaries_path = os.path.join(cfg.home, "logs", "summaries")
+    ensure_path_exists(summaries_path)
+    start = time.monotonic()
+    results = asyncio.run(fetch_host_log_summaries(
+        transport or default_transport(cfg),
+        entries,
+        summaries_path,
+        log_files=log_files,
+    ))
+
+    failed = []
+    for result in results:
+        if result.error is not None:
+            logger.error("%s (%s): failed to summarize logs: %s", result.alias, result.host, result.error)
+            failed.append(result.alias)
+            continue
+        logger.info("%s (%s): summarized %d bytes of logs into %d bytes transferred in %.2fs",
+            result.alias, result.host, result.end, result.transferred, result.duration)
+    if failed:
+        raise Exception("Failed to summarize logs on %d host(s): %s" % (len(failed), ", ".join(failed)))
+    logger.info("Summarized logs on %d host(s) in %.2fs (%d bytes transferred for %d bytes of logs) to %s",
+        len(results), time.monotonic() - start, sum(r.transferred for r in results), sum(r.end for r in results), summaries_path)
+
+    summaries = OrderedDict(
+        (result.alias, load_json_config(os.path.join(summaries_path, "%s.json" % result.alias)))
+        for result in results
+    )
+    report = analyze_log_index(log_index_from_summaries(summaries), os.path.join(summaries_path, "commits.csv"))
+    for alias, summary in summaries.items():
+        # the summaries count all events, not just those at the heights kept
+        report["nodes"][alias]["events"] = summary["events"]
+        report["nodes"][alias]["levels"] = summary["levels"]
+        report["nodes"][alias]["anomalies"] = summary["anomalies"]
+    save_json_config(os.path.join(summaries_path, "analysis.json"), report)
+    print_log_analysis(report)
+    print_log_anomalies(summaries)
+    return results
+
+async def fetch_host_log_summaries(
+    transport,
+    entries: List[AnsibleInventoryEntry],
+    summaries_path: str,
+    concurrency: int = 64,
+    log_files: Dict[str, str] = None,
+) -> List[LogFetchResult]:
+    sem = asyncio.Semaphore(concurrency)
+    log_files = log_files or dict()
+    # the agent is sent along with every run, so that hosts never need to
+    # have (an up-to-date copy of) it installed
+    with open(LOG_AGENT_SCRIPT, "rb") as f:
+        agent = f.read()
+
+    async def fetch_one(entry: AnsibleInventoryEntry) -> LogFetchResult:
+        if entry.alias in log_files:
+            cmd = "%s - --gzip %s" % (shlex.quote(sys.executable), shlex.quote(log_files[entry.alias]))
+        else:
+            cmd = remote_become("python3 - --gzip %s" % shlex.quote(TENDERMINT_LOG_FILE))
+        async with sem:
+            wall_start, start = time.time(), time.monotonic()
+            try:
+                p = await transport.spawn(entry.ansible_host, cmd, pipe_stdin=True)
+                data, stderr = await p.communicate(input=agent)
+                if p.returncode != 0:
+                    raise Exception("Log agent failed with return code %d: %s" % (p.returncode, stderr.decode("utf-8", errors="replace").strip()))
+                summary = json.loads(zlib.decompress(data, wbits=31))
+                save_json_config(os.path.join(summaries_path, "%s.json" % entry.alias), summary)
+            except Exception as e:
+                return LogFetchResult(entry.alias, entry.ansible_host, 0, 0, 0, time.monotonic() - start, str(e))
+            finally:
+                TRACER.add("summarize logs", wall_start, time.monotonic() - start, track="host: %s" % entry.alias, cat="remote")
+            return LogFetchResult(entry.alias, entry.ansible_host, summary["offset"], summary["log_size"], len(data), time.monotonic() - start)
+
+    return await asyncio.gather(*[fetch_one(entry) for entry in entries])
+
+async def fetch_host_logs(
+    transport,
+    entries: List[AnsibleInventoryEntry],
+    logs_path: str,
+    offsets: dict,
+    concurrency: int = 64,
+    log_files: Dict[str, str] = None,
+) -> List[LogFetchResult]:
+    sem = asyncio.Semaphore(concurrency)
+    log_files = log_files or dict()
+
+    async def fetch_one(entry: AnsibleInventoryEntry) -> LogFetchResult:
+        local_file = os.path.join(logs_path, "%s.log" % entry.alias)
+        prev = offsets.get(entry.alias, dict())
+        # only resume if our local copy is exactly what we last fetched
+        offset = prev.get("offset", 0)
+        if prev.get("host") != entry.ansible_host or \
+                not os.path.isfile(local_file) or \
+                os.path.getsize(local_file) != offset:
+            offset = 0
+        async with sem:
+            wall_start, start = time.time(), time.monotonic()
+            try:
+                log_start, log_end, transferred = await stream_host_log(
+                    transport,
+                    entry.ansible_host,
+                    local_file,
+                    offset,
+                    log_file=log_files.get(entry.alias, TENDERMINT_LOG_FILE),
+                    become=entry.alias not in log_files,
+                )
+            except Exception as e:
+                return LogFetchResult(entry.alias, entry.ansible_host, offset, offset, 0, time.monotonic() - start, str(e))
+            finally:
+                TRACER.add("fetch logs", wall_start, time.monotonic() - start, track="host: %s" % entry.alias, cat="remote")
+            return LogFetchResult(entry.alias, entry.ansible_host, log_start, log_end, transferred, time.monotonic() - start)
+
+    return await asyncio.gather(*[fetch_one(entry) for entry in entries])
+
+async def stream_host_log(
+    transport,
+    host: str,
+    local_file: str,
+    offset: int,
+    log_file: str = TENDERMINT_LOG_FILE,
+    become: bool = True,
 ):
-    inventory_file = os.path.join(workdir, "inventory")
-    sh([
-        "ansible-playbook",
-        "-i", inventory_file,
-        os.path.join("ansible", "fetch-logs.yaml"),
+    """Streams the remote log file's contents from the given offset onwards
+    into the given local file. Returns the range of the remote log file that
+    was fetched, along with the number of compressed bytes transferred."""
+    script = LOG_FETCH_SCRIPT % {"path": shlex.quote(log_file), "offset": offset}
+    cmd = "sh -c %s" % shlex.quote(script)
+    p = await transport.spawn(host, remote_become(cmd) if become else cmd)
+    try:
+        header = (await p.stdout.readline()).decode("utf-8").split()
+        if len(header) != 2:
+            raise Exception("Unexpected response from host: %s" % " ".join(header))
+        log_start, log_end = int(header[0]), int(header[1])
+        if log_start < offset:
+            logger.warning("Log file on %s has been truncated since the last fetch, fetching it from the start", host)
+            if os.path.isfile(local_file):
+                os.replace(local_file, local_file + ".1")
+
+        transferred = 0
+        decompressor = zlib.decompressobj(wbits=31)
+        with open(local_file, "ab" if log_start > 0 else "wb") as f:
+            while True:
+                chunk = await p.stdout.read(1024*1024)
+                if not chunk:
+                    break
+                transferred += len(chunk)
+                await asyncio.to_thread(lambda c: f.write(decompressor.decompress(c)), chunk)
+            f.write(decompressor.flush())
+        returncode = await p.wait()
+        if returncode != 0:
+            raise Exception("Process failed with return code %d: %s" % (returncode, (await p.stderr.read()).decode("utf-8").strip()))
+        if os.path.getsize(local_file) != log_end:
+            raise Exception("Local log file size does not match remote log size (%d != %d)" % (os.path.getsize(local_file), log_end))
+    finally:
+        if p.returncode is None:
+            p.kill()
+    return log_start, log_end, transferred
+
+# -----------------------------------------------------------------------------
+#
+#   Peer Topology
+#
+# -----------------------------------------------------------------------------
+
+def build_peer_topology(topology: TopologyConfig, node_count: int) -> List[Set[int]]:
+    """Builds the undirected peering graph for the given topology over nodes
+    0..node_count-1, returning each node's set of neighbours. The graph is
+    generated deterministically from the topology's seed, and an exception is
+    raised if it is not connected."""
+    if node_count < 2:
+        return [set() for _ in range(node_count)]
+    rng = random.Random(topology.seed)
+    degree = min(topology.degree, node_count - 1)
+    if topology.type == "ring":
+        edges = ring_topology_edges(list(range(node_count)), degree)
+    elif topology.type == "k-regular":
+        edges = k_regular_topology_edges(list(range(node_count)), degree, rng)
+    elif topology.type == "hub":
+        edges = hub_topology_edges(node_count, min(topology.hubs, node_count), degree, rng)
+    elif topology.type == "region":
+        edges = region_topology_edges(node_count, topology.regions, degree, topology.bridges, rng)
+    else:
+        raise Exception("Unsupported topology type: %s" % topology.type)
+
+    adjacency = [set() for _ in range(node_count)]
+    for u, v in edges:
+        adjacency[u].add(v)
+        adjacency[v].add(u)
+    if topology_eccentricity(adjacency, 0) is None:
+        raise Exception(
+            "Generated %s topology (degree %d, seed %d) is not connected - try a higher degree or a different seed" %
+            (topology.type, degree, topology.seed),
+        )
+    return adjacency
+
+def ring_topology_edges(nodes: List[int], degree: int) -> Set[tuple]:
+    """Connects each node to its degree/2 nearest neighbours on either side
+    of a ring (rounded up, so a degree of 1 still makes a ring)."""
+    edges = set()
+    n = len(nodes)
+    for i in range(n):
+        for step in range(1, (degree + 1) // 2 + 1):
+            j = (i + step) % n
+            if i != j:
+                edges.add((min(nodes[i], nodes[j]), max(nodes[i], nodes[j])))
+    return edges
+
+def k_regular_topology_edges(nodes: List[int], degree: int, rng: random.Random) -> Set[tuple]:
+    """Generates a random graph in which every node has the given degree,
+    using the Steger-Wormald algorithm: stubs are paired at random, and
+    only the pairs that would create self-loops or duplicate edges are
+    retried."""
+    if (len(nodes) * degree) % 2 != 0:
+        raise Exception("A k-regular topology needs an even number of node x degree (got %d nodes of degree %d)" % (len(nodes), degree))
+    for _ in range(100):
+        edges = set()
+        stubs = nodes * degree
+        while stubs:
+            leftover = collections.Counter()
+            rng.shuffle(stubs)
+            for u, v in zip(stubs[::2], stubs[1::2]):
+                edge = (min(u, v), max(u, v))
+                if u != v and edge not in edges:
+                    edges.add(edge)
+                else:
+                    leftover[u] += 1
+                    leftover[v] += 1
+            if leftover and all(
+                (min(u, v), max(u, v)) in edges
+                for u, v in itertools.combinations(leftover.keys(), 2)
+            ):
+                # stuck: none of the remaining stubs can be paired
+                edges = None
+                break
+            stubs = [node for node, count in leftover.items() for _ in range(count)]
+        if edges is not None:
+            return edges
+    raise Exception("Failed to generate a %d-regular topology over %d node(s)" % (degree, len(nodes)))
+
+def hub_topology_edges(node_count: int, hubs: int, degree: int, rng: random.Random) -> Set[tuple]:
+    """Fully connects the first `hubs` nodes to each other, and connects each
+    remaining node to `degree` randomly chosen hubs."""
+    edges = set(itertools.combinations(range(hubs), 2))
+    for spoke in range(hubs, node_count):
+        for hub in rng.sample(range(hubs), min(degree, hubs)):
+            edges.add((hub, spoke))
+    return edges
+
+def region_topology_edges(
+    node_count: int,
+    regions: OrderedDictType[str, int],
+    degree: int,
+    bridges: int,
+    rng: random.Random,
+) -> Set[tuple]:
+    """Assigns nodes to regions in order, connects the nodes within each
+    region as a random k-regular graph (or a ring if that's impossible), and
+    connects each pair of regions through `bridges` random links."""
+    if sum(regions.values()) != node_count:
+        raise Exception("Topology regions account for %d node(s), but there are %d" % (sum(regions.values()), node_count))
+    members = []
+    start = 0
+    for count in regions.values():
+        members.append(list(range(start, start + count)))
+        start += count
+    edges = set()
+    for nodes in members:
+        local_degree = min(degree, len(nodes) - 1)
+        if local_degree < 1:
+            continue
+        if (len(nodes) * local_degree) % 2 == 0 and local_degree > 2:
+            edges |= k_regular_topology_edges(nodes, local_degree, rng)
+        else:
+            edges |= ring_topology_edges(nodes, local_degree)
+    for a, b in itertools.combinations(members, 2):
+        for _ in range(bridges):
+            u, v = rng.choice(a), rng.choice(b)
+            edges.add((min(u, v), max(u, v)))
+    return edges
+
+def topology_eccentricity(adjacency: List[Set[int]], source: int) -> int:
+    """Returns the greatest number of hops from the given node to any other
+    node, or None if some node can't be reached from it."""
+    depth = {source: 0}
+    frontier = [source]
+    while frontier:
+        next_frontier = []
+        for u in frontier:
+            for v in adjacency[u]:
+                if v not in depth:
+                    depth[v] = depth[u] + 1
+                    next_frontier.append(v)
+        frontier = next_frontier
+    if len(depth) != len(adjacency):
+        return None
+    return max(depth.values())
+
+def describe_peer_topology(topology: TopologyConfig, adjacency: List[Set[int]], monikers: List[str]) -> dict:
+    """Computes and logs the summary statistics of the given peering graph,
+    returning them along with the graph itself."""
+    degrees = [len(neighbours) for neighbours in adjacency]
+    diameter = max(topology_eccentricity(adjacency, i) for i in range(len(adjacency)))
+    edge_count = sum(degrees) // 2
+    logger.info(
+        "Peer topology \"%s\": %d node(s), %d connection(s), degree min/mean/max %d/%.1f/%d, diameter %d",
+        topology.type,
+        len(adjacency),
+        edge_count,
+        min(degrees),
+        sum(degrees) / len(degrees),
+        max(degrees),
+        diameter,
+    )
+    return OrderedDict([
+        ("topology", topology._asdict()),
+        ("nodes", len(adjacency)),
+        ("connections", edge_count),
+        ("degree", OrderedDict([("min", min(degrees)), ("mean", sum(degrees) / len(degrees)), ("max", max(degrees))])),
+        ("diameter", diameter),
+        ("peers", OrderedDict([
+            (monikers[i], [monikers[j] for j in sorted(neighbours)])
+            for i, neighbours in enumerate(adjacency)
+        ])),
     ])
 
+def topology_node_p2p_config(topology: TopologyConfig, peer_ids: List[str]) -> dict:
+    """Returns the p2p configuration overrides for a node with the given
+    persistent peers in a sparse topology. Each node's connection limits are
+    raised to fit its peers (hubs can have many), and peer exchange is
+    disabled unless requested so that the topology isn't filled in."""
+    defaults = TENDERMINT_DEFAULT_CONFIG["p2p"]
+    return {
+        "persistent-peers": ",".join(peer_ids),
+        "pex": topology.pex,
+        "max-num-inbound-peers": max(defaults["max-num-inbound-peers"], len(peer_ids)),
+        "max-num-outbound-peers": max(defaults["max-num-outbound-peers"], len(peer_ids)),
+        "max-connections": max(defaults["max-connections"], len(peer_ids) * 2),
+    }
+
 # -----------------------------------------------------------------------------
 #
-#   Utilities
+#   Local Networks
 #
 # -----------------------------------------------------------------------------
 
-def sh(cmd):
-    logger.info("Executing command: %s" % " ".join(cmd))
-    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT) as p:
-        print("")
-        for line in p.stdout:
-            print(line.decode("utf-8").rstrip())
-        while p.poll() is None:
-            time.sleep(1)
-        print("")
-    
-        if p.returncode != 0:
-            raise Exception("Process failed with return code %d" % p.returncode)
+def deploy_local_tendermint_network(
+    cfg: "TestConfig",
+    keep_existing_tendermint_config: bool = False,
+    nodes: int = 4,
+    base_port: int = LOCAL_BASE_PORT,
+    workers: int = None,
+    **kwargs,
+):
+    """Deploys the network as separate Tendermint processes on this machine,
+    each with its own home folder and ports, using the same configuration
+    generation as for remote networks. Any previously deployed local nodes
+    are stopped first, and all nodes are started once deployed."""
+    if nodes < 1:
+        raise Exception("A local network needs at least one node")
+    workdir = local_network_path(cfg)
+    if os.path.isfile(os.path.join(workdir, "nodes.json")):
+        set_local_nodes_state(cfg, "stopped")
 
+    nodes_path = os.path.join(workdir, "nodes")
+    layout = [
+        LocalNode(
+            alias="node%d" % i,
+            home=os.path.join(nodes_path, "node%d" % i),
+            p2p_port=base_port + i * LOCAL_NODE_PORTS,
+            rpc_port=base_port + i * LOCAL_NODE_PORTS + 1,
+            prometheus_port=base_port + i * LOCAL_NODE_PORTS + 2,
+            pprof_port=base_port + i * LOCAL_NODE_PORTS + 3,
+        )
+        for i in range(nodes)
+    ]
+    with phase_timer("generate config"):
+        peers = tendermint_generate_config(
+            nodes_path,
+            nodes,
+            keep_existing_tendermint_config,
+            {"pub": ["127.0.0.1"] * nodes, "pri": ["127.0.0.1"] * nodes, "client": []},
+            workers=workers,
+        )
+    # all nodes share the same host, so they can only be told apart by port
+    peers = [
+        peer._replace(peer_id=tendermint_peer_id("127.0.0.1", peer.peer_id.split("@")[0], node.p2p_port))
+        for peer, node in zip(peers, layout)
+    ]
+    with phase_timer("finalize config"):
+        tendermint_finalize_config(
+            cfg,
+            peers,
+            workers=workers,
+            workdir=workdir,
+            node_overrides=[
+                {
+                    "p2p": {"laddr": "tcp://127.0.0.1:%d" % node.p2p_port},
+                    "rpc": {"laddr": "tcp://127.0.0.1:%d" % node.rpc_port, "pprof-laddr": "127.0.0.1:%d" % node.pprof_port},
+                    "instrumentation": {"prometheus-listen-addr": "127.0.0.1:%d" % node.prometheus_port},
+                }
+                for node in layout
+            ],
+        )
 
-def configure_logging(verbose=False):
-    """Supercharge our logger."""
-    handler = colorlog.StreamHandler()
-    handler.setFormatter(
-        colorlog.ColoredFormatter(
-            "%(log_color)s%(asctime)s\t%(levelname)s\t%(message)s",
-            log_colors={
-                "DEBUG": "cyan",
-                "INFO": "green",
-                "WARNING": "bold_yellow",
-                "ERROR": "bold_red",
-                "CRITICAL": "bold_red",
-            }
+    save_json_config(os.path.join(workdir, "nodes.json"), [node._asdict() for node in layout])
+    save_deployment_state(
+        os.path.join(workdir, "state.json"),
+        build_deployment_state(
+            cfg,
+            peers,
+            ["127.0.0.1"] * nodes,
+            ["127.0.0.1"] * nodes,
+            ["http://127.0.0.1:%d" % node.rpc_port for node in layout],
+            local=True,
         ),
     )
-    logger.addHandler(handler)
-    logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+    save_ansible_inventory(os.path.join(workdir, "inventory"), OrderedDict([
+        ("tendermint", [AnsibleInventoryEntry(alias=node.alias, ansible_host="127.0.0.1", node_id=node.alias) for node in layout]),
+    ]))
+    set_local_nodes_state(cfg, "started")
+    logger.info("Local Tendermint network deployed to %s, with RPC endpoints on ports %d-%d",
+        workdir, layout[0].rpc_port, layout[-1].rpc_port)
 
-def save_toml_config(filename, cfg):
-    with open(filename, "wt") as f:
-        toml.dump(cfg, f)
-    logger.debug("Wrote configuration to %s", filename)
+def local_network_path(cfg: "TestConfig") -> str:
+    return os.path.join(cfg.home, "local")
 
-def save_yaml_config(filename, cfg):
-    with open(filename, "wt") as f:
-        yaml.safe_dump(cfg, f)
-    logger.debug("Wrote configuration to %s", filename)
+def local_node_log_file(node: LocalNode) -> str:
+    return os.path.join(node.home, "tendermint.log")
 
-def save_ansible_inventory(filename: str, inventory: OrderedDictType[str, List]):
-    """Writes the given inventory structure to an Ansible inventory file.
-    The `inventory` variable is an ordered mapping of group names to lists of
-    hostnames (plain strings) or AnsibleInventoryEntry instances.
+def local_node_pid_file(node: LocalNode) -> str:
+    return os.path.join(node.home, "tendermint.pid")
 
-    If you use any AnsibleInventoryEntry instances in your inventory lists, the
-    `alias` property is required.
-    """
-    with open(filename, "wt") as f:
-        for group_name, entries in inventory.items():
-            f.write("[%s]\n" % group_name)
-            for entry in entries:
-                if isinstance(entry, str):
-                    f.write("%s\n" % entry)
-                elif isinstance(entry, AnsibleInventoryEntry):
-                    if entry.alias is None:
-                        raise Exception("Missing alias for Ansible inventory entry in group: %s" % group_name)
-                    line = "%s" % entry.alias
-                    if entry.ansible_host is not None:
-                        line += " ansible_host=%s" % entry.ansible_host
-                    if entry.node_id is not None:
-                        line += " node_id=%s" % entry.node_id
-                    f.write("%s\n" % line)
-                else:
-                    raise Exception("Unknown type for Ansible inventory entry: %s" % entry)
-                    
-            f.write("\n")
+def local_tendermint_binary() -> str:
+    binary = os.environ.get("TMTEST_TENDERMINT_BINARY", None) or shutil.which("tendermint")
+    if binary is None:
+        raise Exception("Cannot find the tendermint binary: put it on the PATH or set TMTEST_TENDERMINT_BINARY")
+    return binary
+
+def load_local_nodes(cfg: "TestConfig") -> OrderedDictType[str, LocalNode]:
+    nodes_file = os.path.join(local_network_path(cfg), "nodes.json")
+    if not os.path.isfile(nodes_file):
+        raise Exception("No local network has been deployed (see \"network deploy --local\")")
+    return OrderedDict([(node["alias"], LocalNode(**node)) for node in load_json_config(nodes_file)])
+
+def set_local_nodes_state(
+    cfg: "TestConfig",
+    state: str,
+    node_or_group_ids: List[str] = None,
+    fail_on_missing: bool = True,
+    **kwargs,
+):
+    """The local network equivalent of set_tendermint_nodes_state, which
+    starts or stops the referenced nodes' processes directly. Returns the
+    (monotonic) time at which each node that was started was launched."""
+    valid_states = {"started", "stopped", "restarted"}
+    if state not in valid_states:
+        raise Exception("Desired service state must be one of: %s" % ",".join(valid_states))
+    nodes = load_local_nodes(cfg)
+    inventory = load_ansible_inventory(os.path.join(local_network_path(cfg), "inventory"))
+    entries = resolve_inventory_entries(inventory, node_or_group_ids or [], fail_on_missing)
+    selected = [nodes[entry.alias] for entry in entries]
+    start = time.monotonic()
+    launched = OrderedDict()
+    if state in {"stopped", "restarted"}:
+        stop_local_nodes(selected)
+    if state in {"started", "restarted"}:
+        launched = start_local_nodes(selected, local_tendermint_binary())
+    logger.info("Local nodes' state successfully set to \"%s\" in %.2fs", state, time.monotonic() - start)
+    return launched
+
+def start_local_nodes(nodes: List[LocalNode], binary: str, grace_period: float = 1.0):
+    """Starts each of the given nodes that isn't already running, in its own
+    session so that it outlives us, and checks that none of them exit
+    immediately (e.g. because of a bad configuration or a port clash).
+    Returns the (monotonic) time at which each started node was launched, by
+    alias."""
+    started = []
+    launched = OrderedDict()
+    for node in nodes:
+        pid = local_node_pid(node)
+        if pid is not None:
+            logger.info("%s: already running (pid %d)", node.alias, pid)
+            continue
+        for port in [node.p2p_port, node.rpc_port, node.prometheus_port, node.pprof_port]:
+            if port is not None and not local_port_available(port):
+                raise Exception("%s: port %d is already in use" % (node.alias, port))
+        with open(local_node_log_file(node), "ab") as log_f:
+            p = subprocess.Popen(
+                [binary] + TENDERMINT_NODE_ARGS + ["--home", node.home],
+                stdin=subprocess.DEVNULL,
+                stdout=log_f,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+        launched[node.alias] = time.monotonic()
+        with open(local_node_pid_file(node), "wt") as f:
+            f.write("%d\n" % p.pid)
+        started.append((node, p))
+    if not started:
+        return launched
+    time.sleep(grace_period)
+    failed = []
+    for node, p in started:
+        if p.poll() is None:
+            logger.info("%s: started (pid %d), RPC on port %d", node.alias, p.pid, node.rpc_port)
+            continue
+        os.remove(local_node_pid_file(node))
+        with open(local_node_log_file(node), "rb") as f:
+            f.seek(max(0, os.path.getsize(local_node_log_file(node)) - 2048))
+            tail = f.read().decode("utf-8", errors="replace")
+        logger.error("%s: exited with return code %d\n%s", node.alias, p.returncode, tail.rstrip())
+        failed.append(node.alias)
+    if failed:
+        raise Exception("Failed to start %d local node(s): %s" % (len(failed), ", ".join(failed)))
+    return launched
+
+def stop_local_nodes(nodes: List[LocalNode], timeout: float = LOCAL_STOP_TIMEOUT):
+    """Asks all of the given nodes to stop at once, and kills those that
+    haven't stopped within the timeout."""
+    running = OrderedDict()
+    for node in nodes:
+        pid = local_node_pid(node)
+        if pid is None:
+            continue
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            continue
+        running[node.alias] = (node, pid)
+    deadline = time.monotonic() + timeout
+    while running and time.monotonic() < deadline:
+        for alias, (node, pid) in list(running.items()):
+            if not process_alive(pid):
+                os.remove(local_node_pid_file(node))
+                logger.info("%s: stopped", alias)
+                del running[alias]
+        if running:
+            time.sleep(0.1)
+    for alias, (node, pid) in running.items():
+        logger.warning("%s: did not stop within %.1fs, killing it", alias, timeout)
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        os.remove(local_node_pid_file(node))
+
+def local_node_pid(node: LocalNode) -> int:
+    """Returns the process ID of the given node if it's running, otherwise
+    None (cleaning up any stale PID file)."""
+    pid_file = local_node_pid_file(node)
+    if not os.path.isfile(pid_file):
+        return None
+    with open(pid_file, "rt") as f:
+        pid = int(f.read().strip())
+    if process_alive(pid):
+        return pid
+    os.remove(pid_file)
+    return None
+
+def process_alive(pid: int) -> bool:
+    try:
+        # reap the process if it's our own child that has exited
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def local_port_available(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(("127.0.0.1", port))
+        except OSError:
+            return False
+    return True
+
+# -----------------------------------------------------------------------------
+#
+#   Log Analysis
+#
+# -----------------------------------------------------------------------------
+
+def build_log_index(
+    logs_path: str,
+    index_path: str,
+    rebuild: bool = False,
+    workers: int = None,
+) -> LogIndex:
+    """Builds a columnar index of the relevant events from all of the fetched
+    node logs in the given folder, parsing the logs in parallel across a pool
+    of worker processes. The existing index is reused if none of the logs
+    have changed since it was built."""
+    log_files = sorted(
+        f for f in os.listdir(logs_path) if f.endswith(".log")
+    ) if os.path.isdir(logs_path) else []
+    if not log_files:
+        raise Exception("No fetched logs found in %s (run \"network fetch_logs\" first)" % logs_path)
+    nodes = [f[:-len(".log")] for f in log_files]
+    sources = OrderedDict([
+        (f, os.path.getsize(os.path.join(logs_path, f))) for f in log_files
+    ])
+
+    meta_file = os.path.join(index_path, "meta.json")
+    if not rebuild and os.path.isfile(meta_file):
+        meta = load_json_config(meta_file)
+        if meta.get("sources") == sources:
+            logger.info("Log index is up to date, reusing it")
+            return load_log_index(index_path)
+
+    start = time.monotonic()
+    workers = workers or os.cpu_count() or 1
+    logger.info("Indexing %d log file(s) (%d bytes) using %d worker(s)", len(log_files), sum(sources.values()), workers)
+    columns = OrderedDict([(name, array.array(typecode)) for name, typecode in LOG_INDEX_COLUMNS])
+    jobs = [(os.path.join(logs_path, f), i) for i, f in enumerate(log_files)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for node_columns in pool.map(parse_tendermint_log, jobs):
+            for name, data in node_columns.items():
+                columns[name].frombytes(data)
+
+    ensure_path_exists(index_path)
+    for name, column in columns.items():
+        with open(os.path.join(index_path, "%s.bin" % name), "wb") as f:
+            column.tofile(f)
+    save_json_config(meta_file, {
+        "nodes": nodes,
+        "events": [name for name, _ in LOG_EVENTS],
+        "sources": sources,
+    })
+    logger.info("Indexed %d event(s) in %.2fs", len(columns["event"]), time.monotonic() - start)
+    return LogIndex(nodes=nodes, **columns)
+
+def load_log_index(index_path: str) -> LogIndex:
+    meta = load_json_config(os.path.join(index_path, "meta.json"))
+    columns = dict()
+    for name, typecode in LOG_INDEX_COLUMNS:
+        filename = os.path.join(index_path, "%s.bin" % name)
+        column = array.array(typecode)
+        with open(filename, "rb") as f:
+            column.frombytes(f.read())
+        columns[name] = column
+    return LogIndex(nodes=meta["nodes"], **columns)
+
+def log_index_from_summaries(summaries: OrderedDictType[str, dict]) -> LogIndex:
+    """Builds a log index of the per-height consensus events recorded in the
+    given log summaries (see summarize_tendermint_logs), keyed by node."""
+    event_codes = dict((name, code) for code, (name, _) in enumerate(LOG_EVENTS))
+    columns = OrderedDict([(name, array.array(typecode)) for name, typecode in LOG_INDEX_COLUMNS])
+    for node, summary in enumerate(summaries.values()):
+        for height, start_ms, proposal_ms, commit_ms, max_round in summary["heights"]["rows"]:
+            for event, ts in [("new_round", start_ms), ("proposal", proposal_ms), ("commit", commit_ms)]:
+                if ts is None:
+                    continue
+                columns["height"].append(height)
+                columns["round"].append(max_round)
+                columns["timestamp"].append(ts)
+                columns["node"].append(node)
+                columns["event"].append(event_codes[event])
+    return LogIndex(nodes=list(summaries.keys()), **columns)
+
+def parse_tendermint_log(job) -> Dict[str, bytes]:
+    """Extracts the relevant events from a single node's log file. Intended
+    to be run in a worker process, so takes a single tuple of (log file path,
+    node index) as its argument, and returns the raw bytes of each index
+    column."""
+    filename, node = job
+    columns = OrderedDict([(name, array.array(typecode)) for name, typecode in LOG_INDEX_COLUMNS])
+    if os.path.getsize(filename) == 0:
+        return OrderedDict([(name, column.tobytes()) for name, column in columns.items()])
+
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = 0
+        while True:
+            m = LOG_EVENTS_RE.search(mm, pos)
+            if m is None:
+                break
+            line_start = mm.rfind(b"\n", 0, m.start()) + 1
+            line_end = mm.find(b"\n", m.end())
+            if line_end < 0:
+                line_end = len(mm)
+            pos = line_end + 1
+            line = mm[line_start:line_end]
+
+            ts = parse_log_timestamp(line)
+            if ts is None:
+                continue
+            height = LOG_HEIGHT_RE.search(line)
+            rnd = LOG_ROUND_RE.search(line)
+            columns["height"].append(int(height.group(1)) if height else -1)
+            columns["round"].append(int(rnd.group(1)) if rnd else -1)
+            columns["timestamp"].append(ts)
+            columns["node"].append(node)
+            columns["event"].append(int(m.lastgroup[1:]))
+    return OrderedDict([(name, column.tobytes()) for name, column in columns.items()])
+
+def parse_log_timestamp(line: bytes) -> int:
+    """Parses the timestamp at the start of the given log line, returning it
+    as milliseconds since the epoch (UTC), or None if the line has no
+    recognizable timestamp."""
+    m = LOG_TIMESTAMP_RE.match(line)
+    if m is None:
+        return None
+    if m.group("iso") is not None:
+        ts = m.group("iso").decode("utf-8")
+    else:
+        ts = "%sT%s" % (m.group("date").decode("utf-8"), m.group("time").decode("utf-8"))
+    dt = datetime.datetime.fromisoformat(ts)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+def analyze_log_index(index: LogIndex, commits_file: str = None) -> dict:
+    """Computes per-height commit timing, round change frequency and per-node
+    commit lag from the given log index. If `commits_file` is supplied, the
+    per-height figures are written to it in CSV format."""
+    event_codes = dict((name, code) for code, (name, _) in enumerate(LOG_EVENTS))
+    commit_code = event_codes["commit"]
+    commits = dict()    # height -> {node: timestamp}
+    max_rounds = dict() # height -> highest round seen
+    node_events = [dict((name, 0) for name, _ in LOG_EVENTS) for _ in index.nodes]
+
+    for height, rnd, ts, node, event in zip(index.height, index.round, index.timestamp, index.node, index.event):
+        node_events[node][LOG_EVENTS[event][0]] += 1
+        if height < 0:
+            continue
+        if rnd > max_rounds.get(height, -1):
+            max_rounds[height] = rnd
+        if event == commit_code:
+            node_commits = commits.setdefault(height, dict())
+            # keep the first commit of a height in case a node logs it twice
+            if node not in node_commits:
+                node_commits[node] = ts
+
+    heights = sorted(commits.keys())
+    intervals, spreads = [], []
+    node_lags = [[] for _ in index.nodes]
+    prev_first = None
+    rows = []
+    for height in heights:
+        node_commits = commits[height]
+        first, last = min(node_commits.values()), max(node_commits.values())
+        interval = (first - prev_first) if prev_first is not None else None
+        if interval is not None:
+            intervals.append(interval)
+        spreads.append(last - first)
+        for node, ts in node_commits.items():
+            node_lags[node].append(ts - first)
+        rows.append([height, first, interval if interval is not None else "", last - first,
+            max_rounds.get(height, -1), len(node_commits)])
+        prev_first = first
+
+    if commits_file is not None:
+        with open(commits_file, "wt", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["height", "first_commit_ms", "interval_ms", "spread_ms", "max_round", "nodes"])
+            writer.writerows(rows)
+        logger.debug("Wrote per-height commit timing to %s", commits_file)
+
+    round_changes = sum(1 for height in heights if max_rounds.get(height, -1) > 0)
+    return OrderedDict([
+        ("heights", OrderedDict([
+            ("first", heights[0] if heights else None),
+            ("last", heights[-1] if heights else None),
+            ("count", len(heights)),
+        ])),
+        ("block_interval_ms", summarize_values(intervals)),
+        ("commit_spread_ms", summarize_values(spreads)),
+        ("round_changes", OrderedDict([
+            ("heights", round_changes),
+            ("frequency", (round_changes / len(heights)) if heights else 0.0),
+            ("max_round", max(max_rounds.values()) if max_rounds else -1),
+        ])),
+        ("nodes", OrderedDict([
+            (alias, OrderedDict([
+                ("commits", len(node_lags[node])),
+                ("lag_ms", summarize_values(node_lags[node])),
+                ("events", node_events[node]),
+            ]))
+            for node, alias in enumerate(index.nodes)
+        ])),
+    ])
+
+def print_log_analysis(report: dict):
+    heights = report["heights"]
+    print("")
+    print("Heights %s to %s (%d committed)" % (heights["first"], heights["last"], heights["count"]))
+    for name in ["block_interval_ms", "commit_spread_ms"]:
+        stats = report[name]
+        print("%-20s mean=%-10.1f p50=%-8d p99=%-8d max=%d" % (name, stats["mean"], stats["p50"], stats["p99"], stats["max"]))
+    print("Round changes: %d height(s) (%.2f%%), max round %d" % (
+        report["round_changes"]["heights"],
+        report["round_changes"]["frequency"] * 100,
+        report["round_changes"]["max_round"],
+    ))
+    print("")
+    print("%-16s %8s %10s %10s %10s %10s %10s" % ("node", "commits", "lag mean", "lag p99", "lag max", "timeouts", "peer drops"))
+    for alias, node in report["nodes"].items():
+        print("%-16s %8d %10.1f %10d %10d %10d %10d" % (
+            alias,
+            node["commits"],
+            node["lag_ms"]["mean"],
+            node["lag_ms"]["p99"],
+            node["lag_ms"]["max"],
+            node["events"]["timeout"],
+            node["events"]["peer_removed"],
+        ))
+    print("")
+
+def print_log_anomalies(summaries: OrderedDictType[str, dict]):
+    print("%-16s %12s %8s %8s %8s %8s %8s %8s" % ("node", "log bytes", "errors", "timeouts", "rounds", "slow", "peers-", "excerpts"))
+    errors = OrderedDict()
+    for alias, summary in summaries.items():
+        anomalies = summary["anomalies"]
+        print("%-16s %12d %8d %8d %8d %8d %8d %8d" % (
+            alias,
+            summary["bytes"],
+            summary["levels"].get("error", 0),
+            anomalies.get("timeout", 0),
+            anomalies.get("round_change", 0),
+            anomalies.get("slow_height", 0),
+            anomalies.get("peer_removed", 0),
+            len(summary["excerpts"]),
+        ))
+        for error in summary["errors"]:
+            counts = errors.setdefault(error["message"], [0, 0])
+            counts[0] += error["count"]
+            counts[1] += 1
+    if errors:
+        print("")
+        print("%8s %6s  %s" % ("count", "nodes", "error"))
+        for message, (count, nodes) in sorted(errors.items(), key=lambda e: -e[1][0])[:20]:
+            print("%8d %6d  %s" % (count, nodes, message))
+    print("")
+
+# -----------------------------------------------------------------------------
+#
+#   Metrics
+#
+# -----------------------------------------------------------------------------
+
+def prometheus_scrape_config(cfg: "TestConfig", entries: List[AnsibleInventoryEntry], interval: float) -> dict:
+    """Builds a Prometheus configuration that scrapes all of the given
+    nodes, labelling each node's series with its alias."""
+    return {
+        "global": {
+            "scrape_interval": "%ds" % max(1, int(interval)),
+            "evaluation_interval": "%ds" % max(1, int(interval)),
+        },
+        "scrape_configs": [{
+            "job_name": cfg.id,
+            "static_configs": [
+                {
+                    "targets": ["%s:%d" % (entry.ansible_host, TENDERMINT_PROMETHEUS_PORT)],
+                    "labels": {"node": entry.alias},
+                }
+                for entry in entries
+            ],
+        }],
+    }
+
+def parse_prometheus_metrics(text: str, wanted: Set[str]) -> Dict[str, float]:
+    """Extracts the values of the wanted metrics from the given Prometheus
+    text exposition, summing across label sets."""
+    result = dict()
+    for line in text.splitlines():
+        if not line or line[0] == "#":
+            continue
+        name_end = len(line)
+        for sep in ("{", " "):
+            pos = line.find(sep)
+            if 0 <= pos < name_end:
+                name_end = pos
+        name = line[:name_end]
+        if name not in wanted:
+            continue
+        try:
+            value = float(line.rsplit("}", 1)[-1].split()[0])
+        except (ValueError, IndexError):
+            continue
+        result[name] = result.get(name, 0.0) + value
+    return result
+
+def poll_node_metrics(
+    entries: List[AnsibleInventoryEntry],
+    output_base: str,
+    interval: float = 1.0,
+    duration: float = 60.0,
+    timeout: float = None,
+):
+    """Polls the Prometheus metrics endpoints of all of the given nodes at
+    once every `interval` seconds for the given duration, through a pool of
+    persistent HTTP connections. Block interval and TPS are derived from
+    consecutive samples of each node, and all samples are appended to a
+    compact binary time series file (see METRICS_RECORD), alongside which a
+    JSON file names the nodes."""
+    if not entries:
+        raise Exception("No nodes to poll metrics from")
+    timeout = timeout or max(interval, 1.0)
+    save_json_config(output_base + ".json", {
+        "nodes": [entry.alias for entry in entries],
+        "record": METRICS_RECORD.format,
+        "fields": ["time", "node", "height", "total_txs", "mempool_size", "peers", "tps", "block_interval"],
+    })
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=len(entries), pool_maxsize=len(entries))
+    session.mount("http://", adapter)
+    urls = ["http://%s:%d/metrics" % (entry.ansible_host, TENDERMINT_PROMETHEUS_PORT) for entry in entries]
+    wanted = set(POLLED_METRICS.values())
+
+    def fetch(url: str):
+        try:
+            response = session.get(url, timeout=timeout)
+            response.raise_for_status()
+            return parse_prometheus_metrics(response.text, wanted)
+        except Exception as e:
+            logger.debug("Failed to poll %s: %s", url, e)
+            return None
+
+    logger.info("Polling metrics from %d node(s) every %.1fs for %.0fs, writing to %s.bin", len(entries), interval, duration, output_base)
+    prev = [None] * len(entries)
+    deadline = time.monotonic() + duration
+    next_poll = time.monotonic()
+    with open(output_base + ".bin", "ab") as out, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=min(64, len(entries))) as pool:
+        try:
+            while next_poll < deadline:
+                now = time.time()
+                samples = list(pool.map(fetch, urls))
+                records = []
+                for node, sample in enumerate(samples):
+                    if sample is None:
+                        continue
+                    values = dict((name, sample.get(metric, 0.0)) for name, metric in POLLED_METRICS.items())
+                    tps, block_interval = 0.0, 0.0
+                    if prev[node] is not None:
+                        prev_time, prev_values = prev[node]
+                        elapsed = now - prev_time
+                        tps = (values["total_txs"] - prev_values["total_txs"]) / elapsed
+                        blocks = values["height"] - prev_values["height"]
+                        block_interval = (elapsed / blocks) if blocks > 0 else 0.0
+                    prev[node] = (now, values)
+                    records.append(METRICS_RECORD.pack(
+                        now, node, int(values["height"]), int(values["total_txs"]),
+                        int(values["mempool_size"]), int(values["peers"]), tps, block_interval,
+                    ))
+                out.write(b"".join(records))
+                out.flush()
+                log_metrics_sample([METRICS_RECORD.unpack(r) for r in records], len(entries))
+
+                next_poll += interval
+                time.sleep(max(0.0, next_poll - time.monotonic()))
+        except KeyboardInterrupt:
+            logger.warning("Interrupted, stopping metrics polling")
+
+def log_metrics_sample(records: List[tuple], node_count: int):
+    if not records:
+        logger.warning("No nodes responded")
+        return
+    heights = [r[2] for r in records]
+    intervals = [r[7] for r in records if r[7] > 0]
+    logger.info("nodes=%d/%d height=%d..%d tps=%.1f mempool=%.0f block_interval=%s",
+        len(records), node_count, min(heights), max(heights),
+        max(r[6] for r in records),
+        sum(r[4] for r in records) / len(records),
+        ("%.3fs" % (sum(intervals) / len(intervals))) if intervals else "-",
+    )
+
+# -----------------------------------------------------------------------------
+#
+#   Block Harvesting
+#
+# -----------------------------------------------------------------------------
+
+class BlockCache:
+    """An on-disk cache of block metadata for a single chain, keyed by
+    height, so that repeated analyses never need to refetch a block. If an
+    identity is given for the chain, it is recorded in the cache, and a cache
+    recorded for a different chain is refused."""
+
+    def __init__(self, filename: str, identity: str = None):
+        self.db = sqlite3.connect(filename)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS blocks (height INTEGER PRIMARY KEY, meta TEXT NOT NULL, results TEXT)"
+        )
+        self.db.execute("CREATE TABLE IF NOT EXISTS chain (identity TEXT NOT NULL)")
+        if identity is not None:
+            row = self.db.execute("SELECT identity FROM chain").fetchone()
+            if row is None:
+                self.db.execute("INSERT INTO chain (identity) VALUES (?)", (identity,))
+                self.db.commit()
+            elif row[0] != identity:
+                self.db.close()
+                raise Exception("Block cache %s belongs to a different chain (%s, not %s)" % (filename, row[0], identity))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.db.close()
+
+    def heights(self, min_height: int, max_height: int, with_results: bool = False) -> Set[int]:
+        query = "SELECT height FROM blocks WHERE height BETWEEN ? AND ?"
+        if with_results:
+            query += " AND results IS NOT NULL"
+        return set(row[0] for row in self.db.execute(query, (min_height, max_height)))
+
+    def put(self, blocks: List[tuple]):
+        """Stores the given (height, meta, results) tuples."""
+        self.db.executemany(
+            "INSERT INTO blocks (height, meta, results) VALUES (?, ?, ?) " +
+            "ON CONFLICT(height) DO UPDATE SET meta=excluded.meta, results=COALESCE(excluded.results, blocks.results)",
+            [(height, json.dumps(meta), json.dumps(results) if results is not None else None) for height, meta, results in blocks],
+        )
+        self.db.commit()
+
+    def get(self, min_height: int, max_height: int) -> List[tuple]:
+        return [
+            (height, json.loads(meta), json.loads(results) if results is not None else None)
+            for height, meta, results in self.db.execute(
+                "SELECT height, meta, results FROM blocks WHERE height BETWEEN ? AND ? ORDER BY height",
+                (min_height, max_height),
+            )
+        ]
+
+def deployed_chain_identity(cfg: "TestConfig", local: bool = False) -> str:
+    """Identifies the deployed chain by its chain ID and genesis time, along
+    with when it was deployed. The chain ID is the same for every deploy, and
+    so is the genesis time unless the validators or consensus parameters
+    change, but every deploy starts a new chain."""
+    workdir = local_network_path(cfg) if local else os.path.join(cfg.home, "tendermint")
+    genesis_file = os.path.join(workdir, "genesis.json")
+    if not os.path.isfile(genesis_file):
+        raise Exception("Missing genesis file %s (has the network been deployed?)" % genesis_file)
+    genesis = load_json_config(genesis_file)
+    state = load_deployment_state(os.path.join(workdir, "state.json"))
+    return "%s/%s/%s" % (genesis["chain_id"], genesis["genesis_time"], state["deployed"])
+
+def open_chain_block_cache(cfg: "TestConfig", local: bool = False) -> BlockCache:
+    """Opens the block cache of the deployed chain, which is named after the
+    chain's identity (see deployed_chain_identity)."""
+    identity = deployed_chain_identity(cfg, local=local)
+    blocks_path = os.path.join(cfg.home, "blocks")
+    ensure_path_exists(blocks_path)
+    return BlockCache(
+        os.path.join(blocks_path, "%s-%s.sqlite" % (cfg.id, hashlib.sha256(identity.encode("utf-8")).hexdigest()[:12])),
+        identity=identity,
+    )
+
+def remove_block_caches(cfg: "TestConfig"):
+    """Removes the cached blocks of the network's chain(s), once the network
+    has been redeployed or reset."""
+    for pattern in ["%s.sqlite*", "%s-*.sqlite*"]:
+        for filename in glob.glob(os.path.join(cfg.home, "blocks", pattern % cfg.id)):
+            os.remove(filename)
+
+async def harvest_blocks(
+    endpoints: List[str],
+    cache: BlockCache,
+    min_height: int,
+    max_height: int = None,
+    rate: float = 50.0,
+    with_results: bool = False,
+    concurrency: int = 4,
+    max_attempts: int = 5,
+) -> List[tuple]:
+    """Fetches the metadata (and optionally the results) of all blocks in the
+    given height range that aren't already in the cache, paging through them
+    in parallel across all of the given RPC endpoints while keeping the total
+    request rate within `rate` requests per second. Returns all of the blocks
+    in the range (plus the preceding block, if any, so that inter-block times
+    can be computed) in order of height."""
+    clients = [RPCClient(endpoint) for endpoint in endpoints]
+    bucket = TokenBucket(rate)
+    try:
+        if max_height is None:
+            await bucket.acquire()
+            status = await clients[0].call("status")
+            max_height = int(status["sync_info"]["latest_block_height"])
+        min_height = max(1, min_height - 1)
+        if max_height < min_height:
+            raise Exception("Invalid height range: %d to %d" % (min_height, max_height))
+
+        cached = cache.heights(min_height, max_height, with_results)
+        missing = [h for h in range(min_height, max_height + 1) if h not in cached]
+        logger.info("Fetching %d of %d block(s) from %d endpoint(s) (%d already cached)",
+            len(missing), max_height - min_height + 1, len(endpoints), len(cached))
+
+        pages = asyncio.Queue()
+        for page in page_heights(missing, BLOCKCHAIN_RPC_PAGE_SIZE):
+            pages.put_nowait((page, 0))
+        remaining = [pages.qsize()]
+        failures = []
+
+        async def fetch_page(client: RPCClient, page: List[int]) -> List[tuple]:
+            await bucket.acquire()
+            result = await client.call("blockchain", {"minHeight": str(page[0]), "maxHeight": str(page[-1])})
+            metas = dict((int(meta["header"]["height"]), meta) for meta in result.get("block_metas", []))
+            blocks = []
+            for height in page:
+                if height not in metas:
+                    raise Exception("Block %d missing from response" % height)
+                results = None
+                if with_results:
+                    await bucket.acquire()
+                    results = await client.call("block_results", {"height": str(height)})
+                blocks.append((height, metas[height], results))
+            return blocks
+
+        async def worker(client_index: int):
+            while remaining[0] > 0:
+                try:
+                    page, attempts = await asyncio.wait_for(pages.get(), 0.1)
+                except asyncio.TimeoutError:
+                    # another worker may still put a page back for retrying
+                    continue
+                # move on to a different endpoint each time a page is retried
+                client = clients[(client_index + attempts) % len(clients)]
+                try:
+                    cache.put(await fetch_page(client, page))
+                    remaining[0] -= 1
+                except Exception as e:
+                    if attempts + 1 >= max_attempts:
+                        failures.append((page, str(e)))
+                        remaining[0] -= 1
+                    else:
+                        logger.debug("Failed to fetch blocks %d-%d from %s (%s), retrying", page[0], page[-1], client.url, e)
+                        pages.put_nowait((page, attempts + 1))
+
+        await asyncio.gather(*[
+            worker(i) for i in range(len(clients)) for _ in range(concurrency)
+        ])
+        for page, err in failures:
+            logger.error("Failed to fetch blocks %d-%d: %s", page[0], page[-1], err)
+        if failures:
+            raise Exception("Failed to fetch %d page(s) of blocks" % len(failures))
+    finally:
+        await asyncio.gather(*[client.close() for client in clients])
+    return cache.get(min_height, max_height)
+
+def page_heights(heights: List[int], page_size: int) -> List[List[int]]:
+    """Splits the given sorted heights into pages of contiguous heights of at
+    most `page_size` heights each."""
+    pages = []
+    for height in heights:
+        if pages and height == pages[-1][-1] + 1 and len(pages[-1]) < page_size:
+            pages[-1].append(height)
+        else:
+            pages.append([height])
+    return pages
+
+def block_stats(blocks: List[tuple]) -> List[list]:
+    """Computes per-block statistics (height, time, transaction count, failed
+    transaction count, size and milliseconds since the previous block) for
+    the given blocks. The first block only serves as the reference point for
+    the second block's inter-block time, unless it's the genesis block."""
+    stats = []
+    prev_time = None
+    for height, meta, results in blocks:
+        block_time = parse_rfc3339(meta["header"]["time"])
+        failed_txs = ""
+        if results is not None:
+            failed_txs = sum(1 for tx in (results.get("txs_results") or []) if tx.get("code", 0) != 0)
+        if prev_time is not None or height == 1:
+            stats.append([
+                height,
+                meta["header"]["time"],
+                int(meta["num_txs"]),
+                failed_txs,
+                int(meta["block_size"]),
+                int((block_time - prev_time).total_seconds() * 1000) if prev_time is not None else "",
+            ])
+        prev_time = block_time
+    return stats
+
+def log_block_stats(stats: List[list]):
+    if not stats:
+        logger.warning("No blocks in the requested range")
+        return
+    txs = sum(row[2] for row in stats)
+    intervals = [row[5] for row in stats if row[5] != ""]
+    elapsed = sum(intervals) / 1000.0
+    logger.info("Heights %d to %d: %d tx(s), mean block size %.0f bytes, mean block interval %.0fms, %.1f committed tx/s",
+        stats[0][0], stats[-1][0], txs,
+        sum(row[4] for row in stats) / len(stats),
+        (sum(intervals) / len(intervals)) if intervals else 0.0,
+        (txs / elapsed) if elapsed > 0 else 0.0,
+    )
+
+# -----------------------------------------------------------------------------
+#
+#   Load Testing
+#
+# -----------------------------------------------------------------------------
+
+class TokenBucket:
+    """An asyncio-friendly token bucket rate limiter. Up to `burst` tokens
+    can accumulate while idle, which allows callers to catch up after the
+    event loop has been briefly busy."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate / 100.0)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+def load_rpc_endpoints(cfg: "TestConfig", node_or_group_ids: List[str] = None, local: bool = False) -> List[str]:
+    """Returns the RPC endpoint URLs of the deployed nodes (optionally only
+    those referenced by the given node or group IDs)."""
+    if local:
+        nodes = load_local_nodes(cfg)
+        inventory = load_ansible_inventory(os.path.join(local_network_path(cfg), "inventory"))
+        return [
+            "http://127.0.0.1:%d" % nodes[entry.alias].rpc_port
+            for entry in resolve_inventory_entries(inventory, node_or_group_ids or [])
+        ]
+    inventory = load_ansible_inventory(os.path.join(cfg.home, "tendermint", "inventory"))
+    return [
+        "http://%s:%d" % (entry.ansible_host, TENDERMINT_RPC_PORT)
+        for entry in resolve_inventory_entries(inventory, node_or_group_ids or [])
+    ]
+
+def run_load_test(
+    lt: LoadTestConfig,
+    endpoints: List[str],
+    workers: int = None,
+    rate: float = None,
+    start_at: float = None,
+    client_id: int = 0,
+) -> dict:
+    """Runs the given load test against the given RPC endpoints, spreading the
+    load evenly across a number of worker processes, each of which keeps
+    `lt.connections` persistent connections open to each endpoint. Progress
+    is reported every second, and a summary of the run is returned.
+
+    If supplied, `rate` overrides the load test's configured rate, and
+    `start_at` (a UNIX timestamp) delays the start of load generation. The
+    transactions are tagged with the `client_id` of a distributed load test's
+    client."""
+    workers = workers or os.cpu_count() or 1
+    rate = rate or lt.rate
+    logger.info("Starting load test \"%s\": %d tx/s of %d bytes for %ds against %d endpoint(s) from %d worker(s)",
+        lt.id, rate, lt.size, lt.time, len(endpoints), workers)
+    counters = multiprocessing.Array("q", workers * 3, lock=False)
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=load_test_worker,
+            args=(i, lt, endpoints, rate / workers, counters, results, start_at, client_id),
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    if start_at is not None and start_at > time.time():
+        logger.info("Waiting %.1fs for synchronized start", start_at - time.time())
+        time.sleep(start_at - time.time())
+    start = time.monotonic()
+
+    histogram = LatencyHistogram()
+    endpoint_histograms = OrderedDict((endpoint, LatencyHistogram()) for endpoint in endpoints)
+    timeseries = []
+    received = 0
+    prev = (0, 0, 0)
+    next_report = start + 1
+    try:
+        while received < workers and (any(proc.is_alive() for proc in procs) or not results.empty()):
+            try:
+                result = results.get(timeout=max(0.0, next_report - time.monotonic()))
+                histogram.merge(LatencyHistogram.from_dict(result["latency"]))
+                for endpoint, endpoint_histogram in result["endpoints"].items():
+                    endpoint_histograms[endpoint].merge(LatencyHistogram.from_dict(endpoint_histogram))
+                received += 1
+            except queue.Empty:
+                pass
+            if time.monotonic() >= next_report:
+                totals = load_test_totals(counters, workers)
+                logger.info("sent=%d (%d/s) accepted=%d (%d/s) failed=%d",
+                    totals[0], totals[0] - prev[0], totals[1], totals[1] - prev[1], totals[2])
+                timeseries.append([int(time.time())] + [totals[i] - prev[i] for i in range(3)])
+                prev = totals
+                next_report += 1
+    except KeyboardInterrupt:
+        logger.warning("Interrupted, stopping load test")
+        for proc in procs:
+            proc.terminate()
+    for proc in procs:
+        proc.join()
+
+    duration = time.monotonic() - start
+    sent, accepted, failed = load_test_totals(counters, workers)
+    if (sent, accepted, failed) != prev:
+        timeseries.append([int(time.time()), sent - prev[0], accepted - prev[1], failed - prev[2]])
+    summary = OrderedDict([
+        ("load_test", lt._asdict()),
+        ("endpoints", endpoints),
+        ("workers", workers),
+        ("rate", rate),
+        ("duration", duration),
+        ("sent", sent),
+        ("accepted", accepted),
+        ("failed", failed),
+        ("accepted_rate", accepted / duration),
+        ("latency_us", histogram.summary()),
+        ("latency_histogram", histogram.to_dict()),
+        ("endpoint_latency_histograms", OrderedDict((endpoint, h.to_dict()) for endpoint, h in endpoint_histograms.items())),
+        ("timeseries", timeseries),
+    ])
+    log_load_test_summary(summary)
+    return summary
+
+def log_load_test_summary(summary: dict):
+    latency = summary["latency_us"]
+    logger.info("Load test \"%s\" complete: sent %d, accepted %d, failed %d in %.1fs (%.1f accepted tx/s)",
+        summary["load_test"]["id"], summary["sent"], summary["accepted"], summary["failed"],
+        summary["duration"], summary["accepted_rate"])
+    logger.info("Broadcast latency: p50=%.1fms p90=%.1fms p99=%.1fms max=%.1fms",
+        latency["p50"] / 1000, latency["p90"] / 1000, latency["p99"] / 1000, latency["max"] / 1000)
+
+def run_distributed_load_test(
+    lt: LoadTestConfig,
+    endpoints: List[str],
+    clients: List[AnsibleInventoryEntry],
+    transport,
+    script: str = None,
+    workers: int = None,
+    start_delay: float = 5.0,
+) -> dict:
+    """Runs the given load test from several clients at once, each of which
+    generates an equal share of the load. All clients start generating load
+    at the same moment (assuming their clocks are synchronized), and each
+    reports back a latency histogram and the commit latencies of its own
+    transactions, which are merged into cluster-wide results.
+
+    If no `script` path is given, this script is first uploaded to each
+    client host, which must already have this tool's requirements
+    installed."""
+    if script is None:
+        with open(os.path.abspath(__file__), "rb") as f:
+            source = f.read()
+        logger.info("Uploading load testing client to %d host(s)", len(clients))
+        results = asyncio.run(run_on_hosts(
+            transport,
+            clients,
+            "mkdir -p $(dirname %s) && cat > %s" % (REMOTE_CLIENT_SCRIPT, REMOTE_CLIENT_SCRIPT),
+            stdin=source,
+        ))
+        log_host_results(results)
+        script = REMOTE_CLIENT_SCRIPT
+
+    start_at = time.time() + start_delay
+    spec = {
+        "load_test": lt._asdict(),
+        "endpoints": endpoints,
+        "rate": lt.rate / len(clients),
+        "workers": workers,
+        "start_at": start_at,
+    }
+    client_ids = dict((entry.alias, i) for i, entry in enumerate(clients))
+    logger.info("Starting load test \"%s\" on %d client(s)", lt.id, len(clients))
+    results = asyncio.run(run_on_hosts(
+        transport,
+        clients,
+        lambda entry: "python3 %s loadtest client %s" % (script, shlex.quote(json.dumps(dict(spec, client=client_ids[entry.alias])))),
+        timeout=start_delay + lt.time + 120,
+    ))
+    log_host_results(results)
+
+    summary = merge_load_test_results(lt, [parse_load_test_client_output(result) for result in results])
+    summary["clients"] = [entry.ansible_host for entry in clients]
+    log_load_test_summary(summary)
+    return summary
+
+def parse_load_test_client_output(result: HostResult) -> dict:
+    for line in reversed(result.output.splitlines()):
+        if line.startswith(LOAD_TEST_RESULT_MARKER):
+            return json.loads(line[len(LOAD_TEST_RESULT_MARKER):])
+    raise Exception("No load test results reported by client %s (%s)" % (result.alias, result.host))
+
+def merge_load_test_results(lt: LoadTestConfig, client_summaries: List[dict]) -> dict:
+    """Merges the summaries reported by several load testing clients."""
+    histogram = LatencyHistogram()
+    endpoint_histograms = OrderedDict()
+    for client_summary in client_summaries:
+        histogram.merge(LatencyHistogram.from_dict(client_summary["latency_histogram"]))
+        for endpoint, endpoint_histogram in client_summary.get("endpoint_latency_histograms", dict()).items():
+            endpoint_histograms.setdefault(endpoint, LatencyHistogram()).merge(LatencyHistogram.from_dict(endpoint_histogram))
+    duration = max(client_summary["duration"] for client_summary in client_summaries)
+    totals = dict(
+        (field, sum(client_summary[field] for client_summary in client_summaries))
+        for field in ["workers", "rate", "sent", "accepted", "failed"]
+    )
+    timeseries = OrderedDict()
+    for client_summary in client_summaries:
+        for row in client_summary["timeseries"]:
+            counts = timeseries.setdefault(row[0], [0, 0, 0])
+            for i in range(3):
+                counts[i] += row[i + 1]
+    return OrderedDict([
+        ("load_test", lt._asdict()),
+        ("endpoints", client_summaries[0]["endpoints"]),
+        ("workers", totals["workers"]),
+        ("rate", totals["rate"]),
+        ("duration", duration),
+        ("sent", totals["sent"]),
+        ("accepted", totals["accepted"]),
+        ("failed", totals["failed"]),
+        ("accepted_rate", totals["accepted"] / duration),
+        ("latency_us", histogram.summary()),
+        ("latency_histogram", histogram.to_dict()),
+        ("endpoint_latency_histograms", OrderedDict((endpoint, h.to_dict()) for endpoint, h in endpoint_histograms.items())),
+        ("timeseries", [[t] + counts for t, counts in sorted(timeseries.items())]),
+        ("client_commit_latencies", [client_summary.get("commit_latencies", dict()) for client_summary in client_summaries]),
+    ])
+
+def loadtest_client(spec: str) -> int:
+    """Runs a single client's share of a distributed load test, as described
+    by the given JSON specification, and prints its results. Returns the
+    intended exit code."""
+    try:
+        spec = json.loads(spec)
+        tracker = CommitTracker(spec["endpoints"], since=time.time(), client_id=spec.get("client", 0))
+        tracker.start()
+        try:
+            summary = run_load_test(
+                LoadTestConfig(**spec["load_test"]),
+                spec["endpoints"],
+                workers=spec.get("workers", None),
+                rate=spec["rate"],
+                start_at=spec.get("start_at", None),
+                client_id=spec.get("client", 0),
+            )
+        finally:
+            tracker.stop()
+        summary["commit_latencies"] = tracker.to_dict()
+    except Exception as e:
+        logger.error("Load testing client failed")
+        logger.exception(e)
+        return 1
+    print(LOAD_TEST_RESULT_MARKER + json.dumps(summary), flush=True)
+    return 0
+
+def load_test_totals(counters, workers: int):
+    return tuple(sum(counters[i * 3 + j] for i in range(workers)) for j in range(3))
+
+def load_test_worker(
+    worker_id: int,
+    lt: LoadTestConfig,
+    endpoints: List[str],
+    rate: float,
+    counters,
+    results: multiprocessing.Queue,
+    start_at: float = None,
+    client_id: int = 0,
+):
+    """The entrypoint for a load-generating worker process. Counts of sent,
+    accepted and failed transactions are written to this worker's slots in
+    the shared `counters` array, and its latency histogram is put onto the
+    `results` queue once it's done."""
+    if start_at is not None and start_at > time.time():
+        time.sleep(start_at - time.time())
+    histogram = LatencyHistogram()
+    endpoint_histograms = OrderedDict((endpoint, LatencyHistogram()) for endpoint in endpoints)
+    try:
+        asyncio.run(generate_load(worker_id, lt, endpoints, rate, counters, histogram, endpoint_histograms, client_id=client_id))
+    except KeyboardInterrupt:
+        pass
+    results.put({
+        "latency": histogram.to_dict(),
+        "endpoints": dict((endpoint, h.to_dict()) for endpoint, h in endpoint_histograms.items()),
+    })
+
+async def generate_load(
+    worker_id: int,
+    lt: LoadTestConfig,
+    endpoints: List[str],
+    rate: float,
+    counters,
+    histogram: "LatencyHistogram",
+    endpoint_histograms: Dict[str, "LatencyHistogram"] = None,
+    max_in_flight: int = 512,
+    client_id: int = 0,
+):
+    bucket = TokenBucket(rate)
+    deadline = time.monotonic() + lt.time
+    method = "broadcast_tx_%s" % lt.broadcast_tx_method
+    sent, accepted, failed = worker_id * 3, worker_id * 3 + 1, worker_id * 3 + 2
+    # A per-run, per-client, per-worker prefix keeps transactions unique
+    # across clients, workers and runs, so they don't get rejected by the
+    # mempool cache.
+    prefix = b"%s%02x%02x" % (os.urandom(3).hex().encode("utf-8"), client_id % 256, worker_id % 256)
+    tx_seq = iter(range(1 << 62))
+    clients = [RPCClient(endpoint) for endpoint in endpoints for _ in range(lt.connections)]
+
+    async def broadcast(client: RPCClient, sem: asyncio.Semaphore):
+        start = time.monotonic()
+        try:
+            result = await client.call(method, {"tx": make_load_test_tx(prefix, next(tx_seq), lt.size)})
+            if result.get("code", 0) == 0:
+                counters[accepted] += 1
+                latency = int((time.monotonic() - start) * 1000000)
+                histogram.record(latency)
+                if endpoint_histograms is not None:
+                    endpoint_histograms[client.url].record(latency)
+            else:
+                counters[failed] += 1
+        except Exception:
+            counters[failed] += 1
+        finally:
+            sem.release()
+
+    async def drive(client: RPCClient):
+        sem = asyncio.Semaphore(max_in_flight)
+        tasks = set()
+        while time.monotonic() < deadline:
+            await bucket.acquire()
+            await sem.acquire()
+            counters[sent] += 1
+            task = asyncio.ensure_future(broadcast(client, sem))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+
+    try:
+        await asyncio.gather(*[drive(client) for client in clients])
+    finally:
+        await asyncio.gather(*[client.close() for client in clients])
+
+def save_load_test_timeseries(filename: str, timeseries: List[List[int]]):
+    with open(filename, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time", "sent", "accepted", "failed"])
+        writer.writerows(timeseries)
+    logger.debug("Wrote load test time series to %s", filename)
+
+def make_load_test_tx(prefix: bytes, seq: int, size: int, sent_us: int = None) -> str:
+    """Generates a unique kvstore-compatible (key=value) transaction of the
+    given size, returning it in base64-encoded form for the RPC. The value
+    starts with the time at which the transaction is sent (in microseconds
+    since the epoch), so that its commit latency can be measured from the
+    block that includes it."""
+    tx = b"%s%012x=%016x" % (prefix, seq, int(time.time() * 1000000) if sent_us is None else sent_us)
+    if len(tx) < size:
+        tx += b"x" * (size - len(tx))
+    return base64.b64encode(tx).decode("utf-8")
+
+def load_test_tx_origin(tx: bytes):
+    """Returns the index of the client that sent the given load test
+    transaction and the time (in microseconds since the epoch) at which it
+    was sent, or None if it isn't one."""
+    m = LOAD_TEST_TX_PATTERN.match(tx)
+    return (int(m.group(1), 16), int(m.group(2), 16)) if m is not None else None
+
+class CommitTracker:
+    """Subscribes to the NewBlock events of each of the given nodes over their
+    websockets while a load test runs, and records how long after it was sent
+    (according to the time embedded in it) each of the load test's
+    transactions was committed, as seen by each node. Latencies are kept in
+    arrays of 32-bit microsecond counts, so that millions of them fit in a
+    few megabytes.
+
+    A distributed load test's clients each track only their own transactions
+    (those tagged with their `client_id`), since the send times embedded by
+    other clients come from other clocks."""
+
+    def __init__(self, endpoints: List[str], since: float, client_id: int = None):
+        self.since_us = int(since * 1000000)
+        self.client_id = client_id
+        self.latencies = OrderedDict((endpoint, array.array("I")) for endpoint in endpoints)
+        self.errors = dict()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+        self.thread.start()
+
+    def count(self) -> int:
+        return sum(len(samples) for samples in self.latencies.values())
+
+    def stop(self, idle: float = 3.0, timeout: float = 30.0):
+        """Waits until no more of the load test's transactions have been
+        committed for `idle` seconds (or until the timeout), and then stops
+        tracking."""
+        deadline = time.monotonic() + timeout
+        last_count, last_change = self.count(), time.monotonic()
+        while time.monotonic() < deadline and time.monotonic() - last_change < idle:
+            time.sleep(0.2)
+            if self.count() != last_count:
+                last_count, last_change = self.count(), time.monotonic()
+        self.stopping.set()
+        self.thread.join()
+
+    async def run(self):
+        tasks = [asyncio.ensure_future(self.track(endpoint)) for endpoint in self.latencies]
+        while not self.stopping.is_set():
+            await asyncio.sleep(0.1)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def track(self, endpoint: str):
+        samples = self.latencies[endpoint]
+        subscribe = json.dumps({
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "subscribe",
+            "params": {"query": "tm.event='NewBlock'"},
+        }).encode("utf-8")
+        while True:
+            writer = None
+            try:
+                reader, writer = await websocket_connect(endpoint.rstrip("/") + "/websocket")
+                writer.write(websocket_frame(subscribe))
+                await writer.drain()
+                while True:
+                    message = await websocket_recv(reader, writer)
+                    received_us = int(time.time() * 1000000)
+                    data = (json.loads(message).get("result") or dict()).get("data") or dict()
+                    block = (data.get("value") or dict()).get("block", None)
+                    if block is None:
+                        continue
+                    for tx in block["data"].get("txs") or []:
+                        # the key and send time are in the first 39 bytes
+                        origin = load_test_tx_origin(base64.b64decode(tx[:52]))
+                        if origin is None or (self.client_id is not None and origin[0] != self.client_id % 256):
+                            continue
+                        if origin[1] >= self.since_us:
+                            samples.append(min(max(0, received_us - origin[1]), 0xFFFFFFFF))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if endpoint not in self.errors:
+                    logger.warning("Lost the block event subscription to %s (%s), reconnecting", endpoint, e)
+                self.errors[endpoint] = str(e)
+                await asyncio.sleep(1.0)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    def summary(self) -> dict:
+        return OrderedDict((endpoint, latency_array_summary(samples)) for endpoint, samples in self.latencies.items())
+
+    def to_dict(self) -> dict:
+        """Returns the latencies seen by each node in a compact, JSON-
+        serializable form (compressed and base64-encoded), for a client to
+        report them."""
+        return OrderedDict(
+            (endpoint, base64.b64encode(zlib.compress(samples.tobytes())).decode("utf-8"))
+            for endpoint, samples in self.latencies.items()
+        )
+
+    def merge(self, latencies: dict):
+        """Adds the latencies reported by a client (see to_dict)."""
+        for endpoint, encoded in latencies.items():
+            self.latencies.setdefault(endpoint, array.array("I")).frombytes(zlib.decompress(base64.b64decode(encoded)))
+
+    def save(self, filename: str):
+        """Saves the latencies seen by each node, in the order of the nodes'
+        endpoints, as the arrays endpoint0, endpoint1, etc."""
+        np.savez_compressed(filename, **dict(
+            ("endpoint%d" % i, np.frombuffer(samples, dtype=np.uint32))
+            for i, samples in enumerate(self.latencies.values())
+        ))
+
+def latency_array_summary(samples: array.array) -> dict:
+    """Summarizes the given latencies like LatencyHistogram.summary does,
+    but exactly."""
+    values = np.frombuffer(samples, dtype=np.uint32)
+    if len(values) == 0:
+        return LatencyHistogram().summary()
+    p50, p90, p99, p999 = np.percentile(values, [50, 90, 99, 99.9])
+    return OrderedDict([
+        ("count", len(values)),
+        ("mean", float(values.mean())),
+        ("min", int(values.min())),
+        ("p50", int(p50)),
+        ("p90", int(p90)),
+        ("p99", int(p99)),
+        ("p999", int(p999)),
+        ("max", int(values.max())),
+    ])
+
+def log_commit_latencies(summary: dict):
+    """Logs each node's latencies from the submission of a transaction to its
+    acceptance by the node's RPC endpoint (i.e. entering its mempool, for
+    broadcast_tx_sync), and to its commit."""
+    endpoint_histograms = summary.get("endpoint_latency_histograms", dict())
+    for endpoint, commit in summary["commit_latency_us"].items():
+        if commit["count"] == 0:
+            logger.warning("%s: no committed load test transactions seen", endpoint)
+            continue
+        mempool = LatencyHistogram.from_dict(endpoint_histograms[endpoint]).summary() if endpoint in endpoint_histograms else None
+        logger.info("%s: submit->mempool p50=%s p99=%s, submit->commit p50=%.1fms p90=%.1fms p99=%.1fms (%d tx(s))",
+            endpoint,
+            ("%.1fms" % (mempool["p50"] / 1000)) if mempool is not None and mempool["count"] > 0 else "-",
+            ("%.1fms" % (mempool["p99"] / 1000)) if mempool is not None and mempool["count"] > 0 else "-",
+            commit["p50"] / 1000, commit["p90"] / 1000, commit["p99"] / 1000, commit["count"])
+
+def read_trace(filename: str):
+    """Lazily yields the records of the given JSONL trace of RPC calls. The
+    file is memory-mapped, so that even multi-gigabyte traces are read
+    without being loaded into memory. The lines of a JSON array with one
+    record per line are accepted too, as are preallocated files (like
+    data/queries.active) whose unwritten remainder is zero-filled."""
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for n, line in enumerate(iter(mm.readline, b""), 1):
+                line, nul, _ = line.partition(b"\0")
+                line = line.strip().rstrip(b",")
+                if line not in {b"", b"[", b"]"}:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        raise Exception("Invalid JSON on line %d of %s" % (n, filename))
+                    if not isinstance(record, dict) or "method" not in record:
+                        raise Exception("Expected an RPC call with a \"method\" on line %d of %s" % (n, filename))
+                    yield record
+                if nul:
+                    return
+
+async def replay_trace(
+    filename: str,
+    endpoints: List[str],
+    speed: float = 1.0,
+    concurrency: int = 256,
+    rewrite_txs: bool = False,
+    limit: int = None,
+) -> dict:
+    """Replays the RPC calls in the given trace against the given endpoints,
+    keeping the calls' original spacing (according to their "time", in
+    seconds), sped up by the given factor (or as fast as possible if the
+    speed is 0). Calls go to the endpoints in turn, unless they name one by
+    its index (as "node"). At most `concurrency` calls are in flight at once,
+    and the trace is only read as fast as calls can be made. Returns a
+    summary of the replay, with latencies per method and how far behind the
+    trace's schedule the calls were made."""
+    clients = [RPCClient(endpoint, timeout=30.0) for endpoint in endpoints]
+    sem = asyncio.Semaphore(concurrency)
+    histograms = OrderedDict()
+    lag = LatencyHistogram()
+    counts = collections.Counter()
+    timeseries = []
+    # rewritten transactions look like those of a load test, so that their
+    # commit latency can be tracked in the same way
+    prefix = os.urandom(5).hex().encode("utf-8")
+    tx_seq = itertools.count()
+    tasks = set()
+
+    async def call(client: RPCClient, method: str, params: dict):
+        start = time.monotonic()
+        try:
+            result = await client.call(method, params)
+            ok = not (isinstance(result, dict) and result.get("code", 0) != 0)
+        except Exception as e:
+            logger.debug("%s to %s failed: %s", method, client.url, e)
+            ok = False
+        finally:
+            sem.release()
+        if ok:
+            counts["ok"] += 1
+            histograms.setdefault(method, LatencyHistogram()).record(int((time.monotonic() - start) * 1000000))
+        else:
+            counts["failed"] += 1
+
+    reported = [0, 0, 0]
+
+    def flush():
+        totals = [counts["sent"], counts["ok"], counts["failed"]]
+        timeseries.append([int(time.time())] + [totals[i] - reported[i] for i in range(3)])
+        reported[:] = totals
+
+    async def report():
+        while True:
+            await asyncio.sleep(1.0)
+            logger.info("sent=%d (%d/s) ok=%d failed=%d, up to %.1fms behind schedule",
+                counts["sent"], counts["sent"] - reported[0], counts["ok"], counts["failed"], (lag.max or 0) / 1000)
+            flush()
+
+    reporter = asyncio.ensure_future(report())
+    start = time.monotonic()
+    trace_start = None
+    try:
+        for i, record in enumerate(read_trace(filename)):
+            if limit is not None and i >= limit:
+                break
+            due = time.monotonic()
+            if record.get("time", None) is not None and speed > 0:
+                if trace_start is None:
+                    trace_start = float(record["time"])
+                due = start + (float(record["time"]) - trace_start) / speed
+                if due > time.monotonic():
+                    await asyncio.sleep(due - time.monotonic())
+            await sem.acquire()
+            lag.record(int(max(0.0, time.monotonic() - due) * 1000000))
+            method, params = record["method"], record.get("params", None) or dict()
+            if rewrite_txs and method.startswith("broadcast_tx_") and "tx" in params:
+                params = dict(params, tx=make_load_test_tx(prefix, next(tx_seq), len(base64.b64decode(params["tx"]))))
+            client = clients[int(record["node"]) % len(clients)] if "node" in record else clients[i % len(clients)]
+            counts["sent"] += 1
+            task = asyncio.ensure_future(call(client, method, params))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+    finally:
+        reporter.cancel()
+        await asyncio.gather(*[client.close() for client in clients])
+
+    duration = time.monotonic() - start
+    if [counts["sent"], counts["ok"], counts["failed"]] != reported:
+        flush()
+    totals = (counts["sent"], counts["ok"], counts["failed"])
+    return OrderedDict([
+        ("trace", os.path.abspath(filename)),
+        ("endpoints", endpoints),
+        ("speed", speed),
+        ("concurrency", concurrency),
+        ("duration", duration),
+        ("sent", totals[0]),
+        ("ok", totals[1]),
+        ("failed", totals[2]),
+        ("rate", totals[0] / duration if duration > 0 else 0.0),
+        ("latency_us", OrderedDict((method, h.summary()) for method, h in histograms.items())),
+        ("schedule_lag_us", lag.summary()),
+        ("timeseries", timeseries),
+    ])
+
+def log_replay_summary(summary: dict):
+    logger.info("Replayed %d call(s) (%d ok, %d failed) in %.1fs (%.1f calls/s), at most %.1fms behind schedule (p99 %.1fms)",
+        summary["sent"], summary["ok"], summary["failed"], summary["duration"], summary["rate"],
+        summary["schedule_lag_us"]["max"] / 1000, summary["schedule_lag_us"]["p99"] / 1000)
+    for method, latency in summary["latency_us"].items():
+        logger.info("%s: %d call(s), latency p50=%.1fms p90=%.1fms p99=%.1fms max=%.1fms",
+            method, latency["count"], latency["p50"] / 1000, latency["p90"] / 1000, latency["p99"] / 1000, latency["max"] / 1000)
+
+# -----------------------------------------------------------------------------
+#
+#   Resource Capture
+#
+# -----------------------------------------------------------------------------
+
+def load_resource_capture(cfg: "TestConfig", local: bool = False, **kwargs) -> "ResourceCapture":
+    """Sets up the capture of profiles from all of the deployed nodes, and of
+    samples of the resource usage of each of their hosts."""
+    if local:
+        nodes = list(load_local_nodes(cfg).values())
+        if any(node.pprof_port is None for node in nodes):
+            raise Exception("The local network was deployed without pprof listeners, redeploy it to capture profiles")
+        return ResourceCapture(
+            OrderedDict((node.alias, "http://127.0.0.1:%d" % node.pprof_port) for node in nodes),
+            OrderedDict([("localhost", "127.0.0.1")]),
+            LocalTransport(),
+            **kwargs,
+        )
+    inventory = load_ansible_inventory(os.path.join(cfg.home, "tendermint", "inventory"))
+    entries = resolve_inventory_entries(inventory, [])
+    hosts = OrderedDict()
+    for entry in entries:
+        if entry.ansible_host not in hosts.values():
+            hosts[entry.alias] = entry.ansible_host
+    return ResourceCapture(
+        OrderedDict((entry.alias, "http://%s:%d" % (entry.ansible_host, TENDERMINT_PPROF_PORT)) for entry in entries),
+        hosts,
+        default_transport(cfg),
+        **kwargs,
+    )
+
+class ResourceCapture:
+    """Records what the nodes were doing while a load test runs. Once
+    `profile_delay` seconds have passed, CPU profiles are taken from the
+    pprof listeners of all nodes at once, followed by their heap profiles.
+    Throughout, each host's CPU, memory, disk and network usage is sampled
+    every `sample_interval` seconds. Samples are timestamped with this
+    machine's clock, like the load test's own statistics, so that the two
+    line up."""
+
+    def __init__(
+        self,
+        pprof_urls: OrderedDictType[str, str],
+        hosts: OrderedDictType[str, str],
+        transport,
+        profile_delay: float = 5.0,
+        profile_seconds: int = 30,
+        sample_interval: float = 1.0,
+        max_duration: float = 86400.0,
+    ):
+        self.pprof_urls = pprof_urls
+        self.hosts = hosts
+        self.transport = transport
+        self.profile_delay = profile_delay
+        self.profile_seconds = profile_seconds
+        self.sample_interval = sample_interval
+        self.max_duration = max_duration
+        self.profiles = OrderedDict()
+        self.profile_windows = OrderedDict()
+        self.samples = []
+        self.errors = OrderedDict()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.started = None
+        self.stopped = None
+
+    def start(self):
+        self.started = time.time()
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops sampling the hosts, after waiting for any profiles that are
+        being taken."""
+        self.stopped = time.time()
+        self.stopping.set()
+        self.thread.join()
+
+    async def run(self):
+        samplers = [asyncio.ensure_future(self.sample_host(name, host)) for name, host in self.hosts.items()]
+        profiler = asyncio.ensure_future(self.profile_nodes())
+        while not self.stopping.is_set():
+            await asyncio.sleep(0.1)
+        for task in samplers:
+            task.cancel()
+        await asyncio.gather(*samplers, return_exceptions=True)
+        await profiler
+
+    async def profile_nodes(self):
+        deadline = time.monotonic() + self.profile_delay
+        while time.monotonic() < deadline:
+            if self.stopping.is_set():
+                logger.warning("The load test ended before its nodes could be profiled")
+                return
+            await asyncio.sleep(0.1)
+        logger.info("Taking %ds CPU profiles of %d node(s)", self.profile_seconds, len(self.pprof_urls))
+        # a thread per node, so that all of the nodes are profiled at once
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(self.pprof_urls))) as pool:
+            await asyncio.gather(*[
+                self.profile_node(pool, alias, url) for alias, url in self.pprof_urls.items()
+            ])
+
+    async def profile_node(self, pool: concurrent.futures.Executor, alias: str, url: str):
+        window = self.profile_windows.setdefault(alias, OrderedDict())
+        for kind, path in [("cpu", "/debug/pprof/profile?seconds=%d" % self.profile_seconds), ("heap", "/debug/pprof/heap")]:
+            start = time.time()
+            try:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    pool,
+                    lambda: requests.get(url + path, timeout=self.profile_seconds + 30),
+                )
+                response.raise_for_status()
+            except Exception as e:
+                logger.warning("%s: failed to take %s profile: %s", alias, kind, e)
+                self.errors["%s %s profile" % (alias, kind)] = str(e)
+                continue
+            self.profiles[(alias, kind)] = response.content
+            window[kind] = [start, time.time()]
+
+    async def sample_host(self, name: str, host: str):
+        script = HOST_SAMPLE_SCRIPT % {
+            "count": int(self.max_duration / self.sample_interval) + 1,
+            "interval": self.sample_interval,
+        }
+        # exec, so that killing the process stops the sampling loop itself
+        p = await self.transport.spawn(host, "exec sh -c %s" % shlex.quote(script))
+        prev, prev_time, lines = None, None, []
+        try:
+            while True:
+                line = await p.stdout.readline()
+                if not line:
+                    break
+                line = line.decode("utf-8", errors="replace").strip()
+                if line != "END":
+                    lines.append(line)
+                    continue
+                now = time.time()
+                sample = parse_host_sample(lines)
+                lines = []
+                if sample["cpu"] is None:
+                    continue
+                if prev is not None:
+                    self.samples.append(host_sample_row(name, prev, sample, now, now - prev_time))
+                prev, prev_time = sample, now
+            await p.wait()
+            if p.returncode != 0:
+                self.errors["%s samples" % name] = (await p.stderr.read()).decode("utf-8", errors="replace").strip()
+                logger.warning("%s: sampling stopped with return code %d", name, p.returncode)
+        finally:
+            if p.returncode is None:
+                p.kill()
+                await p.wait()
+
+    def summary(self) -> dict:
+        hosts = OrderedDict()
+        for name in self.hosts:
+            rows = [row for row in self.samples if row[1] == name]
+            hosts[name] = OrderedDict([("samples", len(rows))] + [
+                (column, OrderedDict([
+                    ("mean", sum(row[i] for row in rows) / len(rows) if rows else 0.0),
+                    ("max", max(row[i] for row in rows) if rows else 0.0),
+                ]))
+                for i, column in enumerate(HOST_SAMPLE_COLUMNS) if i >= 2
+            ])
+        return OrderedDict([
+            ("start", self.started),
+            ("end", self.stopped),
+            ("profile_seconds", self.profile_seconds),
+            ("sample_interval", self.sample_interval),
+            ("profiles", self.profile_windows),
+            ("hosts", hosts),
+            ("errors", self.errors),
+        ])
+
+    def save(self, path: str):
+        """Saves the profiles (as <node>.cpu.pb.gz and <node>.heap.pb.gz, for
+        "go tool pprof") and the hosts' samples (as hosts.csv) to the given
+        folder, along with a summary of the capture (as capture.json)."""
+        ensure_path_exists(os.path.join(path, "profiles"))
+        for (alias, kind), data in self.profiles.items():
+            with open(os.path.join(path, "profiles", "%s.%s.pb.gz" % (alias, kind)), "wb") as f:
+                f.write(data)
+        with open(os.path.join(path, "hosts.csv"), "wt", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(HOST_SAMPLE_COLUMNS)
+            writer.writerows(sorted(self.samples))
+        save_json_config(os.path.join(path, "capture.json"), self.summary())
+
+def parse_host_sample(lines: List[str]) -> dict:
+    """Parses the counters in a single sample from HOST_SAMPLE_SCRIPT."""
+    sample = {"cpu": None, "mem": dict(), "disks": dict(), "nets": dict()}
+    for line in lines:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "cpu":
+            sample["cpu"] = [int(v) for v in fields[1:9]]
+        elif fields[0] in {"MemTotal:", "MemAvailable:"}:
+            sample["mem"][fields[0][:-1]] = int(fields[1]) * 1024
+        elif fields[0] == "disk" and len(fields) == 4:
+            sample["disks"][fields[1]] = (int(fields[2]) * 512, int(fields[3]) * 512)
+        elif fields[0] == "net" and len(fields) == 4:
+            sample["nets"][fields[1]] = (int(fields[2]), int(fields[3]))
+    return sample
+
+def host_sample_row(name: str, prev: dict, cur: dict, now: float, elapsed: float) -> list:
+    """Computes a row of hosts.csv from two consecutive samples' counters."""
+    cpu = [c - p for c, p in zip(cur["cpu"], prev["cpu"])]
+    total = sum(cpu) or 1
+    mem_total = cur["mem"].get("MemTotal", 0)
+    disks = [d for d in whole_disks(cur["disks"].keys()) if d in prev["disks"]]
+    nets = [n for n in cur["nets"] if n != "lo" and n in prev["nets"]]
+    elapsed = elapsed or 1.0
+    return [
+        round(now, 3),
+        name,
+        round(100.0 * (total - cpu[3] - cpu[4]) / total, 2),
+        round(100.0 * cpu[4] / total, 2),
+        round(100.0 * (mem_total - cur["mem"].get("MemAvailable", 0)) / mem_total, 2) if mem_total else 0.0,
+        round(sum(cur["disks"][d][0] - prev["disks"][d][0] for d in disks) / elapsed),
+        round(sum(cur["disks"][d][1] - prev["disks"][d][1] for d in disks) / elapsed),
+        round(sum(cur["nets"][n][0] - prev["nets"][n][0] for n in nets) / elapsed),
+        round(sum(cur["nets"][n][1] - prev["nets"][n][1] for n in nets) / elapsed),
+    ]
+
+def whole_disks(names) -> List[str]:
+    """Returns the given block devices that are physical disks, leaving out
+    their partitions (whose I/O is already counted by their disk) and
+    virtual devices."""
+    names = [name for name in names if not re.match(r"^(loop|ram|zram|dm-|sr|md)\d", name)]
+    return [
+        name for name in names
+        if not any(other != name and re.match(r"^%sp?\d+$" % re.escape(other), name) for other in names)
+    ]
+
+def log_resource_capture(summary: dict):
+    logger.info("Took CPU and heap profiles of %d node(s)", sum(1 for window in summary["profiles"].values() if "cpu" in window))
+    for name, host in summary["hosts"].items():
+        logger.info("%s: cpu mean=%.1f%% max=%.1f%% iowait max=%.1f%% memory max=%.1f%% disk write mean=%.1fMB/s net rx/tx mean=%.1f/%.1fMB/s (%d sample(s))",
+            name,
+            host["cpu_pct"]["mean"],
+            host["cpu_pct"]["max"],
+            host["iowait_pct"]["max"],
+            host["mem_used_pct"]["max"],
+            host["disk_write_bps"]["mean"] / 1000000,
+            host["net_rx_bps"]["mean"] / 1000000,
+            host["net_tx_bps"]["mean"] / 1000000,
+            host["samples"])
+
+# -----------------------------------------------------------------------------
+#
+#   Load Test Reporting
+#
+# -----------------------------------------------------------------------------
+
+class WindowedCounts:
+    """Accumulates counts into fixed-width time windows, growing in either
+    direction as needed, so that memory use is bounded by the time span
+    covered rather than by the number of records."""
+
+    def __init__(self, columns: int):
+        self.origin = None
+        self.counts = np.zeros((0, columns), dtype=np.int64)
+
+    def add(self, windows: np.ndarray, values: np.ndarray):
+        if len(windows) == 0:
+            return
+        lo, hi = int(windows.min()), int(windows.max())
+        if self.origin is None:
+            self.origin = lo
+        if lo < self.origin:
+            self.counts = np.vstack([np.zeros((self.origin - lo, self.counts.shape[1]), dtype=np.int64), self.counts])
+            self.origin = lo
+        if hi - self.origin >= len(self.counts):
+            self.counts = np.vstack([self.counts, np.zeros((hi - self.origin + 1 - len(self.counts), self.counts.shape[1]), dtype=np.int64)])
+        offsets = windows - self.origin
+        for col in range(self.counts.shape[1]):
+            self.counts[:, col] += np.bincount(offsets, weights=values[:, col], minlength=len(self.counts)).astype(np.int64)
+
+def build_load_test_report(
+    stats_files: List[str],
+    window: float = 1.0,
+    align_start: bool = False,
+    max_points: int = 500,
+    chunk_rows: int = 65536,
+) -> dict:
+    """Streams the given load test stats CSV files in fixed-size chunks,
+    aggregating them into time windows of the given width, and computes
+    throughput percentiles and the steady-state period of the combined run.
+
+    Two kinds of stats files are understood: time series with a "time"
+    column (UNIX seconds) and any of "sent", "accepted" and "failed" count
+    columns (a row without count columns counts as one accepted
+    transaction), and tm-load-test's aggregate "Parameter,Value,Units"
+    statistics."""
+    windows = WindowedCounts(3)
+    aggregates = collections.Counter()
+    rows = 0
+    for stats_file in stats_files:
+        logger.info("Reading stats from %s", stats_file)
+        with open(stats_file, "rt") as f:
+            header = [col.strip().lower() for col in f.readline().split(",")]
+            if header[:2] == ["parameter", "value"]:
+                for row in csv.reader(f):
+                    if len(row) >= 2 and row[0].strip():
+                        aggregates[row[0].strip()] += float(row[1])
+                continue
+            if "time" not in header:
+                raise Exception("Unrecognized stats file format (expected a \"time\" column): %s" % stats_file)
+            time_col = header.index("time")
+            count_cols = [header.index(col) if col in header else None for col in ["sent", "accepted", "failed"]]
+            file_origin = None
+            while True:
+                lines = list(itertools.islice(f, chunk_rows))
+                if not lines:
+                    break
+                data = np.loadtxt(lines, delimiter=",", ndmin=2)
+                rows += len(data)
+                times = data[:, time_col]
+                if align_start:
+                    if file_origin is None:
+                        file_origin = times.min()
+                    times = times - file_origin
+                values = np.zeros((len(data), 3))
+                for i, col in enumerate(count_cols):
+                    if col is not None:
+                        values[:, i] = data[:, col]
+                if all(col is None for col in count_cols):
+                    values[:, 0] = values[:, 1] = 1
+                windows.add(np.floor(times / window).astype(np.int64), values)
+
+    counts = windows.counts
+    rates = counts[:, 1] / window if len(counts) else np.zeros(0)
+    steady_start, steady_end = detect_steady_state(rates)
+    steady = rates[steady_start:steady_end]
+    totals = counts.sum(axis=0) if len(counts) else np.zeros(3, dtype=np.int64)
+    rate_percentiles = np.percentile(rates, [1, 50, 99]) if len(rates) else np.zeros(3)
+    report = OrderedDict([
+        ("files", stats_files),
+        ("rows", rows),
+        ("window", window),
+        ("start", windows.origin * window if windows.origin is not None else None),
+        ("duration", len(counts) * window),
+        ("sent", int(totals[0])),
+        ("accepted", int(totals[1])),
+        ("failed", int(totals[2])),
+        ("accepted_rate", OrderedDict([
+            ("mean", float(rates.mean()) if len(rates) else 0.0),
+            ("p1", float(rate_percentiles[0])),
+            ("p50", float(rate_percentiles[1])),
+            ("p99", float(rate_percentiles[2])),
+            ("max", float(rates.max()) if len(rates) else 0.0),
+        ])),
+        ("steady_state", OrderedDict([
+            ("start", (windows.origin + steady_start) * window if len(steady) else None),
+            ("end", (windows.origin + steady_end) * window if len(steady) else None),
+            ("mean_rate", float(steady.mean()) if len(steady) else 0.0),
+            ("cv", float(steady.std() / steady.mean()) if len(steady) and steady.mean() > 0 else 0.0),
+        ])),
+    ])
+    if aggregates:
+        report["tm_load_test"] = dict(aggregates)
+    report["timeseries"] = downsample_windows(counts, windows.origin or 0, window, max_points)
+    return report
+
+def detect_steady_state(rates: np.ndarray, tolerance: float = 0.1, smoothing: int = 5):
+    """Finds the steady-state period of the given throughput series: the
+    longest contiguous run of windows whose smoothed rate lies within
+    `tolerance` of the median rate. Returns a (start, end) pair of window
+    offsets."""
+    if len(rates) == 0:
+        return 0, 0
+    k = min(smoothing, len(rates))
+    smoothed = np.convolve(rates, np.ones(k) / k, mode="same")
+    median = np.median(rates)
+    within = np.concatenate([[0], (np.abs(smoothed - median) <= tolerance * median).astype(np.int8), [0]])
+    edges = np.diff(within)
+    starts, ends = np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0]
+    if len(starts) == 0:
+        return 0, 0
+    longest = int(np.argmax(ends - starts))
+    return int(starts[longest]), int(ends[longest])
+
+def downsample_windows(counts: np.ndarray, origin: int, window: float, max_points: int) -> List[list]:
+    """Reduces the given windowed counts to at most `max_points` rows of
+    (time, sent, accepted, failed, accepted rate)."""
+    if len(counts) == 0:
+        return []
+    factor = max(1, int(np.ceil(len(counts) / max_points)))
+    padded = np.vstack([counts, np.zeros((-len(counts) % factor, counts.shape[1]), dtype=np.int64)])
+    merged = padded.reshape(-1, factor, counts.shape[1]).sum(axis=1)
+    times = (origin + np.arange(len(merged)) * factor) * window
+    return [
+        [float(t), int(row[0]), int(row[1]), int(row[2]), float(row[1]) / (factor * window)]
+        for t, row in zip(times, merged)
+    ]
+
+# -----------------------------------------------------------------------------
+#
+#   Benchmarks
+#
+# -----------------------------------------------------------------------------
+
+def sweep_points(parameters: OrderedDictType[str, list]) -> List[OrderedDictType[str, object]]:
+    """Expands the given parameter grid into its points, varying the last
+    parameter fastest."""
+    return [
+        OrderedDict(zip(parameters.keys(), values))
+        for values in itertools.product(*parameters.values())
+    ]
+
+def apply_sweep_point(cfg: "TestConfig", point: OrderedDictType[str, object]) -> "TestConfig":
+    """Returns a copy of the given configuration with the Tendermint
+    configuration and consensus parameters of the given sweep point applied
+    on top of those from the test plan."""
+    tendermint_config = deepcopy(cfg.tendermint_config)
+    consensus_params = deepcopy(cfg.consensus_params)
+    for path, value in point.items():
+        parts = path.split(".")
+        if parts[0] == "consensus_params":
+            consensus_params.setdefault(parts[1], dict())[parts[2]] = value
+        elif len(parts) == 2:
+            tendermint_config.setdefault(parts[0], dict())[parts[1]] = value
+        else:
+            tendermint_config[parts[0]] = value
+    return cfg._replace(tendermint_config=tendermint_config, consensus_params=consensus_params)
+
+def run_sweep(
+    cfg: "TestConfig",
+    sweep: SweepConfig,
+    sweep_path: str,
+    workers: int = None,
+    local: bool = False,
+    deploy_kwargs: dict = None,
+    label: str = None,
+) -> List[dict]:
+    """Runs each point of the given sweep that doesn't yet have a result.
+    Each point's result is appended to results.jsonl as soon as it's known,
+    so that an interrupted sweep can resume where it left off. Points that
+    failed are logged and retried when the sweep is resumed. Returns the
+    results of all points, in grid order."""
+    points = sweep_points(sweep.parameters)
+    grid = OrderedDict([("parameters", sweep.parameters), ("repeat", sweep.repeat), ("load_test", sweep.load_test)])
+    grid_file = os.path.join(sweep_path, "grid.json")
+    if os.path.isfile(grid_file):
+        if json.dumps(load_json_config(grid_file)) != json.dumps(grid):
+            raise Exception("Sweep \"%s\" has changed since its results in %s were recorded (use --restart to discard them)" % (sweep.id, sweep_path))
+    else:
+        save_json_config(grid_file, grid)
+
+    results_file = os.path.join(sweep_path, "results.jsonl")
+    results = OrderedDict()
+    if os.path.isfile(results_file):
+        with open(results_file, "rt") as f:
+            for line in f:
+                # the last line may be incomplete if we were interrupted
+                if line.endswith("\n"):
+                    result = json.loads(line)
+                    results[(result["point"], result["repeat"])] = result
+
+    runs = [(i, r) for i in range(len(points)) for r in range(sweep.repeat)]
+    pending = [run for run in runs if run not in results]
+    logger.info("Sweep \"%s\": %d point(s) x %d repetition(s), %d run(s) already complete",
+        sweep.id, len(points), sweep.repeat, len(runs) - len(pending))
+    failed = []
+    for n, (i, r) in enumerate(pending):
+        point = points[i]
+        logger.info("Sweep \"%s\" run %d of %d (point %d, repetition %d): %s", sweep.id, n + 1, len(pending), i, r,
+            ", ".join("%s=%s" % (k, v) for k, v in point.items()))
+        try:
+            with phase_timer("sweep point %d" % i):
+                result = run_sweep_point(
+                    apply_sweep_point(cfg, point),
+                    sweep,
+                    sweep_path,
+                    i,
+                    r,
+                    workers=workers,
+                    local=local,
+                    deploy_kwargs=deploy_kwargs,
+                    label=label,
+                )
+        except KeyboardInterrupt:
+            logger.warning("Interrupted, run the sweep again to resume it")
+            raise
+        except Exception as e:
+            logger.error("Sweep point %d failed: %s", i, e)
+            logger.exception(e)
+            failed.append(i)
+            continue
+        result = OrderedDict([("point", i), ("repeat", r), ("parameters", point)], **result)
+        with open(results_file, "at") as f:
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        results[(i, r)] = result
+        save_sweep_results(os.path.join(sweep_path, "results.csv"), sweep, [results[run] for run in runs if run in results])
+
+    rows = [results[run] for run in runs if run in results]
+    save_sweep_results(os.path.join(sweep_path, "results.csv"), sweep, rows)
+    if failed:
+        raise Exception("%d sweep run(s) failed (points %s), run the sweep again to retry them" % (
+            len(failed), ", ".join(str(i) for i in sorted(set(failed)))))
+    return rows
+
+def run_sweep_point(
+    cfg: "TestConfig",
+    sweep: SweepConfig,
+    sweep_path: str,
+    point: int,
+    repeat: int,
+    workers: int = None,
+    local: bool = False,
+    deploy_kwargs: dict = None,
+    label: str = None,
+) -> dict:
+    """Deploys a fresh network with the given (sweep point) configuration,
+    runs the sweep's load test against it, and measures the resulting
+    throughput and latency, both as seen by the load test and from the
+    blocks committed by the network."""
+    network_deploy(cfg, local=local, force=True, **(deploy_kwargs or dict()))
+    # don't start the clock on settling until the network is producing blocks
+    _, nodes = load_deployed_nodes(cfg, local=local)
+    times = asyncio.run(wait_for_network_ready(nodes, time.monotonic()))
+    if any(None in node_times.values() for node_times in times):
+        raise Exception("Network for sweep point %d did not become ready" % point)
+    if sweep.settle > 0:
+        logger.info("Waiting %ds for the network to settle", sweep.settle)
+        time.sleep(sweep.settle)
+    run_path = loadtest_start(cfg, sweep.load_test, workers=workers, local=local, label=label)
+    summary = load_json_config(os.path.join(run_path, "summary.json"))
+
+    cache_file = os.path.join(sweep_path, "blocks", "point%d-%d.sqlite" % (point, repeat))
+    ensure_path_exists(os.path.dirname(cache_file))
+    # each run starts a new chain
+    for filename in [cache_file, cache_file + "-wal", cache_file + "-shm"]:
+        if os.path.isfile(filename):
+            os.remove(filename)
+    with BlockCache(cache_file) as cache:
+        stats = block_stats(asyncio.run(harvest_blocks(load_rpc_endpoints(cfg, local=local), cache, 1)))
+    # only consider the blocks from the first to the last one with transactions
+    active = [i for i, row in enumerate(stats) if row[2] > 0]
+    active_stats = stats[active[0]:active[-1] + 1] if active else []
+    committed = sum(row[2] for row in active_stats)
+    intervals = [row[5] for row in active_stats if row[5] != ""]
+    latency = summary["latency_us"]
+    return OrderedDict([
+        ("sent", summary["sent"]),
+        ("accepted", summary["accepted"]),
+        ("failed", summary["failed"]),
+        ("accepted_rate", summary["accepted_rate"]),
+        ("committed", committed),
+        ("committed_rate", committed / max(summary["duration"], sum(intervals) / 1000.0)),
+        ("mean_block_interval_ms", (sum(intervals) / len(intervals)) if intervals else None),
+        ("mean_block_size", (sum(row[4] for row in active_stats) / len(active_stats)) if active_stats else None),
+        ("latency_p50_ms", latency["p50"] / 1000.0),
+        ("latency_p90_ms", latency["p90"] / 1000.0),
+        ("latency_p99_ms", latency["p99"] / 1000.0),
+        ("run_path", run_path),
+    ])
+
+def save_sweep_results(filename: str, sweep: SweepConfig, rows: List[dict]):
+    with open(filename, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["point", "repeat"] + list(sweep.parameters.keys()) + SWEEP_RESULT_COLUMNS + ["run_path"])
+        for row in rows:
+            writer.writerow(
+                [row["point"], row["repeat"]] +
+                [row["parameters"][name] for name in sweep.parameters.keys()] +
+                [row[column] for column in SWEEP_RESULT_COLUMNS] +
+                [row["run_path"]]
+            )
+
+def print_sweep_results(sweep: SweepConfig, rows: List[dict]):
+    headers = ["run"] + list(sweep.parameters.keys()) + ["accepted tx/s", "committed tx/s", "p50 ms", "p99 ms", "failed"]
+    table = [
+        [str(row["point"]) if sweep.repeat == 1 else "%d.%d" % (row["point"], row["repeat"])] +
+        [str(row["parameters"][name]) for name in sweep.parameters.keys()] +
+        [
+            "%.1f" % row["accepted_rate"],
+            "%.1f" % row["committed_rate"],
+            "%.1f" % row["latency_p50_ms"],
+            "%.1f" % row["latency_p99_ms"],
+            str(row["failed"]),
+        ]
+        for row in rows
+    ]
+    widths = [max([len(headers[i])] + [len(r[i]) for r in table]) for i in range(len(headers))]
+    print("")
+    print("  ".join(h.rjust(w) for h, w in zip(headers, widths)))
+    for r in table:
+        print("  ".join(v.rjust(w) for v, w in zip(r, widths)))
+    print("")
+
+def capacity_probe(
+    cfg: "TestConfig",
+    lt: LoadTestConfig,
+    rate: float,
+    endpoints: List[str],
+    cache: BlockCache,
+    workers: int = None,
+    local: bool = False,
+    label: str = None,
+    warmup: float = 5.0,
+) -> dict:
+    """Runs the given load test at the given rate, and measures the rate at
+    which its transactions were committed once the network had warmed up,
+    from the blocks committed during the run."""
+    probe_cfg = cfg._replace(load_tests=OrderedDict(cfg.load_tests, **{lt.id: lt._replace(rate=rate)}))
+    statuses = asyncio.run(query_node_statuses(endpoints[:1]))
+    from_height = statuses[0]["height"] or 1
+    run_path = loadtest_start(probe_cfg, lt.id, workers=workers, local=local, label=label)
+    summary = load_json_config(os.path.join(run_path, "summary.json"))
+    with open(os.path.join(run_path, "stats.csv"), "rt", newline="") as f:
+        timeseries = [[int(v) for v in row] for row in list(csv.reader(f))[1:]]
+    # measure both rates over the same whole seconds of the run, after the
+    # warmup (each time series row counts the second before its time)
+    window_start = timeseries[0][0] - 1 + warmup
+    window_end = timeseries[-2][0] if len(timeseries) > 1 else timeseries[-1][0]
+    window = max(1.0, window_end - window_start)
+    accepted = sum(row[2] for row in timeseries if window_start < row[0] <= window_end)
+    stats = block_stats(asyncio.run(harvest_blocks(endpoints, cache, from_height)))
+    committed = sum(
+        row[2] for row in stats
+        if window_start < parse_rfc3339(row[1]).timestamp() <= window_end
+    )
+    return OrderedDict([
+        ("rate", rate),
+        ("accepted_rate", accepted / window),
+        ("committed_rate", committed / window),
+        ("failed", summary["failed"]),
+        ("latency_p99_ms", summary["latency_us"]["p99"] / 1000.0),
+        ("run_path", run_path),
+    ])
+
+def wait_for_mempool_drain(endpoints: List[str], timeout: float):
+    """Waits (up to the timeout) until the mempools of all of the given nodes
+    are empty, so that the backlog of one probe isn't committed during the
+    next."""
+    async def mempool_sizes():
+        clients = [RPCClient(endpoint, timeout=2.0) for endpoint in endpoints]
+        try:
+            results = await asyncio.gather(*[client.call("num_unconfirmed_txs") for client in clients])
+        finally:
+            await asyncio.gather(*[client.close() for client in clients])
+        return [int(result["total"]) for result in results]
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if sum(asyncio.run(mempool_sizes())) == 0:
+                return
+        except Exception as e:
+            logger.debug("Failed to query mempool sizes: %s", e)
+        time.sleep(0.5)
+    logger.warning("Mempools not drained after %.0fs", timeout)
+
+def capacity_probe_failures(probe: dict, tolerance: float, slo_p99_ms: float) -> List[str]:
+    """Returns the reasons (if any) why the network couldn't sustain the
+    probe's rate."""
+    reasons = []
+    if probe["accepted_rate"] < tolerance * probe["rate"]:
+        reasons.append("accepted %.1f tx/s" % probe["accepted_rate"])
+    if probe["committed_rate"] < tolerance * probe["rate"]:
+        reasons.append("committed %.1f tx/s" % probe["committed_rate"])
+    if probe["latency_p99_ms"] > slo_p99_ms:
+        reasons.append("p99 latency %.1fms" % probe["latency_p99_ms"])
+    return reasons
+
+def find_capacity(
+    probe_fn,
+    start_rate: float,
+    max_rate: float = None,
+    precision: float = 0.05,
+    growth: float = 2.0,
+    confirmations: int = 2,
+) -> dict:
+    """Finds the highest rate that the given probe function (which returns
+    whether the network sustained a rate) passes, by multiplying the rate by
+    `growth` until a probe fails (or dividing it until one passes), and then
+    bisecting until the highest passing and lowest failing rates are within
+    `precision` of each other. The highest passing rate is then probed again
+    `confirmations` times, and if any of these fail, the search continues
+    below it. Returns the knee along with the rates that bound it."""
+    lo, hi = None, None
+    probes = []
+    rate = start_rate if max_rate is None else min(start_rate, max_rate)
+    while True:
+        ok = probe_fn(rate)
+        probes.append((rate, ok))
+        if ok:
+            lo = rate
+        else:
+            hi = rate
+        if lo is None:
+            rate = hi / growth
+            if rate < 1.0:
+                raise Exception("The network could not sustain even %.1f tx/s" % hi)
+            continue
+        if hi is None and (max_rate is None or lo < max_rate):
+            rate = lo * growth if max_rate is None else min(lo * growth, max_rate)
+            continue
+        if hi is not None and hi - lo > precision * lo:
+            rate = (lo + hi) / 2.0
+            continue
+        confirmed = True
+        for _ in range(confirmations):
+            confirmed = probe_fn(lo)
+            probes.append((lo, confirmed))
+            if not confirmed:
+                break
+        if confirmed:
+            break
+        logger.info("%.1f tx/s could not be sustained consistently, searching below it", lo)
+        hi = lo
+        lo = max([r for r, ok in probes if ok and r < hi], default=None)
+        rate = (lo + hi) / 2.0 if lo is not None else hi / growth
+    return OrderedDict([
+        ("knee", lo),
+        ("upper_bound", hi),
+        ("probes", probes),
+    ])
+
+def save_capacity_probes(filename: str, probes: List[dict]):
+    with open(filename, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CAPACITY_PROBE_COLUMNS)
+        writer.writerows([probe[column] for column in CAPACITY_PROBE_COLUMNS] for probe in probes)
+
+def print_capacity(result: dict, probes: List[dict]):
+    print("")
+    print("%10s  %14s  %15s  %8s  %8s  %s" % ("tx/s", "accepted tx/s", "committed tx/s", "p99 ms", "failed", "sustained"))
+    for probe in probes:
+        print("%10.1f  %14.1f  %15.1f  %8.1f  %8d  %s" % (
+            probe["rate"],
+            probe["accepted_rate"],
+            probe["committed_rate"],
+            probe["latency_p99_ms"],
+            probe["failed"],
+            "yes" if probe["sustained"] else "no",
+        ))
+    print("")
+    if result["upper_bound"] is None:
+        print("Sustained the maximum rate of %.1f tx/s (committed %.1f-%.1f tx/s over %d probe(s))" % (
+            result["knee"], result["committed_min"], result["committed_max"], result["knee_probes"]))
+    else:
+        print("Maximum sustainable throughput: %.1f tx/s (committed %.1f-%.1f tx/s over %d probe(s)), with the knee between %.1f and %.1f tx/s" % (
+            result["knee"], result["committed_min"], result["committed_max"], result["knee_probes"], result["knee"], result["upper_bound"]))
+    print("")
+
+# -----------------------------------------------------------------------------
+#
+#   Fault Injection
+#
+# -----------------------------------------------------------------------------
+
+def fault_timeline(schedule: FaultScheduleConfig, inventory: OrderedDictType[str, List[AnsibleInventoryEntry]]) -> List[tuple]:
+    """Resolves the nodes of each of the schedule's events (events with a
+    count or fraction take the last validators in the inventory), and adds an
+    event to undo each event that has a duration. Returns the (time, action,
+    node aliases) of all events in the order in which to take them."""
+    validators = [entry.alias for entry in inventory.get("tendermint", [])]
+    timeline = []
+    for event in schedule.events:
+        count = event.count
+        if event.fraction is not None:
+            # up to the given fraction, e.g. 0.33 of 4 validators is 1
+            count = int(event.fraction * len(validators))
+            if count == 0:
+                raise Exception("Cannot %s %g of %d validator(s), which is less than one" % (event.action, event.fraction, len(validators)))
+        if count is not None:
+            if not 0 < count <= len(validators):
+                raise Exception("Cannot %s %d of %d validator(s)" % (event.action, count, len(validators)))
+            aliases = validators[-count:]
+        else:
+            aliases = [entry.alias for entry in resolve_inventory_entries(inventory, event.nodes)]
+        timeline.append((event.at, event.action, aliases))
+        if event.duration is not None:
+            timeline.append((event.at + event.duration, FAULT_ACTIONS[event.action], aliases))
+    return sorted(timeline, key=lambda event: event[0])
+
+def apply_fault(cfg: "TestConfig", action: str, aliases: List[str], local: bool = False, transport=None):
+    """Takes the given fault action on the given nodes. Local nodes can't be
+    partitioned without root privileges, so they are frozen (with SIGSTOP)
+    instead, which cuts them off from their peers in the same way."""
+    if not local:
+        inventory = load_ansible_inventory(os.path.join(cfg.home, "tendermint", "inventory"))
+        cmd = REMOTE_FAULT_COMMANDS[action] % {"port": TENDERMINT_P2P_PORT}
+        log_host_results(asyncio.run(run_on_hosts(
+            transport or default_transport(cfg),
+            resolve_inventory_entries(inventory, aliases),
+            remote_become("sh -c %s" % shlex.quote(cmd)),
+        )))
+        return
+    nodes = load_local_nodes(cfg)
+    selected = [nodes[alias] for alias in aliases]
+    if action in {"stop", "restart"}:
+        stop_local_nodes(selected)
+    if action in {"start", "restart"}:
+        start_local_nodes(selected, local_tendermint_binary(), grace_period=0.0)
+    signals = {"kill": signal.SIGKILL, "partition": signal.SIGSTOP, "heal": signal.SIGCONT}
+    if action in signals:
+        for node in selected:
+            pid = local_node_pid(node)
+            if pid is None:
+                logger.warning("%s: not running, cannot %s it", node.alias, action)
+                continue
+            try:
+                os.kill(pid, signals[action])
+            except ProcessLookupError:
+                pass
+
+def run_fault_timeline(
+    cfg: "TestConfig",
+    timeline: List[tuple],
+    started: float,
+    taken: List[dict],
+    abort: threading.Event,
+    local: bool = False,
+    transport=None,
+):
+    """Takes each of the timeline's actions at its time (in seconds since the
+    given monotonic start time), recording them in `taken`, until the
+    timeline is complete or aborted."""
+    for at, action, aliases in timeline:
+        if abort.wait(max(0.0, started + at - time.monotonic())):
+            return
+        wall_start = time.time()
+        logger.info("Fault schedule: %s %s at %.1fs", action, ", ".join(aliases), time.monotonic() - started)
+        apply_fault(cfg, action, aliases, local=local, transport=transport)
+        TRACER.add("%s %s" % (action, ", ".join(aliases)), wall_start, time.time() - wall_start, cat="fault")
+        taken.append(OrderedDict([("at", at), ("time", wall_start), ("action", action), ("nodes", aliases)]))
+
+def restore_faults(cfg: "TestConfig", taken: List[dict], local: bool = False, transport=None):
+    """Heals any partitions and starts any nodes that the taken fault actions
+    have left in place."""
+    down, partitioned = OrderedDict(), OrderedDict()
+    for event in taken:
+        for alias in event["nodes"]:
+            if event["action"] in {"kill", "stop"}:
+                down[alias] = True
+            elif event["action"] in {"start", "restart"}:
+                down.pop(alias, None)
+            if event["action"] == "partition":
+                partitioned[alias] = True
+            elif event["action"] == "heal":
+                partitioned.pop(alias, None)
+    for action, aliases in [("heal", list(partitioned)), ("start", list(down))]:
+        if aliases:
+            logger.info("Restoring nodes left faulty by the fault schedule: %s %s", action, ", ".join(aliases))
+            apply_fault(cfg, action, aliases, local=local, transport=transport)
+
+def monitor_heights(nodes: List[dict], interval: float, samples: list, stop: threading.Event):
+    """Polls the height of all of the given nodes every interval until told
+    to stop, appending (UNIX time, node alias, height or None) samples to the
+    given list. All samples of a poll share its time."""
+    async def poll():
+        while not stop.is_set():
+            next_poll = time.monotonic() + interval
+            now = time.time()
+            statuses = await query_node_statuses([node["rpc"] for node in nodes], timeout=interval)
+            samples.extend((now, node["alias"], status["height"]) for node, status in zip(nodes, statuses))
+            await asyncio.sleep(max(0.0, next_poll - time.monotonic()))
+
+    asyncio.run(poll())
+
+def latest_heights(samples: List[tuple]) -> Dict[str, int]:
+    """Returns the height of each node in the most recent poll."""
+    if not samples:
+        return dict()
+    latest = samples[-1][0]
+    return dict((alias, height) for t, alias, height in samples if t == latest)
+
+def wait_for_catch_up(nodes: List[dict], samples: List[tuple], timeout: float, interval: float) -> bool:
+    """Waits until all of the given nodes are within a block of the highest
+    one, according to the height monitor's samples."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        heights = [latest_heights(samples).get(node["alias"], None) for node in nodes]
+        if None not in heights and min(heights) >= max(heights) - 1:
+            return True
+        time.sleep(interval)
+    return False
+
+def run_fault_schedule(
+    cfg: "TestConfig",
+    schedule: FaultScheduleConfig,
+    run_path: str,
+    workers: int = None,
+    local: bool = False,
+    label: str = None,
+    transport=None,
+) -> dict:
+    """Runs the schedule's load test against the deployed network while
+    taking the schedule's fault actions on its timeline, monitoring the
+    height of every node throughout. Once the network has recovered, it
+    measures the impact of each fault from the committed blocks."""
+    workdir = local_network_path(cfg) if local else os.path.join(cfg.home, "tendermint")
+    timeline = fault_timeline(schedule, load_ansible_inventory(os.path.join(workdir, "inventory")))
+    _, nodes = load_deployed_nodes(cfg, local=local)
+    if not local:
+        transport = transport or default_transport(cfg)
+
+    samples, taken = [], []
+    stop_monitor, abort = threading.Event(), threading.Event()
+    restored = False
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+        monitor = pool.submit(monitor_heights, nodes, schedule.monitor_interval, samples, stop_monitor)
+        try:
+            started, wall_started = time.monotonic(), time.time()
+            scheduler = pool.submit(run_fault_timeline, cfg, timeline, started, taken, abort, local, transport)
+            lt_run_path = loadtest_start(cfg, schedule.load_test, workers=workers, local=local, label=label)
+            wall_ended = time.time()
+            scheduler.result()
+            restore_faults(cfg, taken, local=local, transport=transport)
+            restored = True
+            logger.info("Waiting up to %ds for all nodes to catch up", schedule.recovery)
+            if not wait_for_catch_up(nodes, samples, schedule.recovery, schedule.monitor_interval):
+                logger.warning("Not all nodes caught up within %ds", schedule.recovery)
+        finally:
+            abort.set()
+            if not restored:
+                restore_faults(cfg, taken, local=local, transport=transport)
+            stop_monitor.set()
+        monitor.result()
+
+    with open(os.path.join(run_path, "heights.csv"), "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time", "node", "height"])
+        writer.writerows((t, alias, "" if height is None else height) for t, alias, height in samples)
+
+    heights = [height for t, alias, height in samples if height is not None]
+    first_poll = [height for t, alias, height in samples if t == samples[0][0] and height is not None]
+    with BlockCache(os.path.join(run_path, "blocks.sqlite")) as cache:
+        stats = block_stats(asyncio.run(harvest_blocks(
+            [node["rpc"] for node in nodes],
+            cache,
+            min(first_poll) if first_poll else 1,
+            max_height=max(heights),
+        )))
+    report = fault_impact(stats, taken, samples, wall_started, wall_ended)
+    report["fault_schedule"] = schedule.id
+    report["load_test_run"] = lt_run_path
+    return report
+
+def fault_impact(
+    stats: List[list],
+    events: List[dict],
+    samples: List[tuple],
+    wall_started: float,
+    wall_ended: float,
+) -> dict:
+    """Measures the impact of the given fault events from the blocks
+    committed during a load test: the committed throughput before and during
+    the faults, how long it took to recover, how long the network stalled
+    after each event, and how quickly each node that was started, restarted
+    or healed caught up with the rest of the network."""
+    blocks = [(parse_rfc3339(row[1]).timestamp(), row[2]) for row in stats]
+    intervals = sorted(row[5] / 1000.0 for row in stats if row[5] != "")
+    median_interval = intervals[len(intervals) // 2] if intervals else 1.0
+    # throughput is counted over windows spanning a few blocks, since the
+    # number of blocks committed in any one second varies
+    window = max(1.0, math.ceil(2 * median_interval))
+    # (only whole windows, so that the end of the run doesn't look like a dip)
+    rates = [0.0] * max(1, int((wall_ended - wall_started) // window))
+    for t, txs in blocks:
+        i = int((t - wall_started) // window)
+        if 0 <= i < len(rates):
+            rates[i] += txs / window
+
+    first_fault = events[0]["time"] if events else wall_ended
+    last_fault = events[-1]["time"] if events else wall_ended
+    # skip the first window, while the load test is ramping up
+    baseline = rates[1:int((first_fault - wall_started) // window)]
+    baseline_rate = (sum(baseline) / len(baseline)) if baseline else None
+    faulty = rates[int((first_fault - wall_started) // window):]
+    min_rate = min(faulty) if faulty else None
+    recovered_s = None
+    if baseline_rate is not None:
+        for i in range(int((last_fault - wall_started) // window), len(rates)):
+            if rates[i] >= 0.9 * baseline_rate:
+                recovered_s = max(0.0, wall_started + i * window - last_fault)
+                break
+
+    rounds = OrderedDict()
+    for t, alias, height in samples:
+        rounds.setdefault(t, dict())[alias] = height
+
+    event_impacts = []
+    for i, event in enumerate(events):
+        window_end = events[i + 1]["time"] if i + 1 < len(events) else float("inf")
+        prev_time = max([t for t, _ in blocks if t <= event["time"]], default=None)
+        after = [t for t, _ in blocks if event["time"] < t <= window_end]
+        gaps = [(b - a, b) for a, b in zip(([prev_time] if prev_time is not None else []) + after, after)]
+        longest, longest_end = max(gaps) if gaps else (None, None)
+        stalled = longest is not None and longest > 3 * median_interval
+        impact = OrderedDict([
+            ("at", event["at"]),
+            ("action", event["action"]),
+            ("nodes", event["nodes"]),
+            ("next_block_s", (after[0] - event["time"]) if after else None),
+            ("longest_block_interval_s", longest),
+            ("liveness_regained_s", (longest_end - event["time"]) if stalled else 0.0),
+            ("catch_up", []),
+        ])
+        if event["action"] in {"start", "restart", "heal"}:
+            impact["catch_up"] = [node_catch_up(rounds, alias, event["time"]) for alias in event["nodes"]]
+        event_impacts.append(impact)
+
+    return OrderedDict([
+        ("window_s", window),
+        ("baseline_committed_rate", baseline_rate),
+        ("min_committed_rate", min_rate),
+        ("throughput_dip", (1.0 - min_rate / baseline_rate) if baseline_rate and min_rate is not None else None),
+        ("recovered_s", recovered_s),
+        ("committed_rates", rates),
+        ("events", event_impacts),
+    ])
+
+def node_catch_up(rounds: OrderedDictType[float, Dict[str, int]], alias: str, since: float) -> dict:
+    """Measures how far behind the given node was when it first responded
+    after the given time, how long it took (since that time) to come within
+    a block of the highest node, and how many blocks per second it synced
+    while catching up."""
+    first, caught_up = None, None
+    for t, heights in rounds.items():
+        height = heights.get(alias, None)
+        if t < since or height is None:
+            continue
+        max_height = max(h for h in heights.values() if h is not None)
+        if first is None:
+            first = (t, height, max_height - height)
+        if height >= max_height - 1:
+            caught_up = (t, height)
+            break
+    result = OrderedDict([
+        ("node", alias),
+        ("behind", first[2] if first is not None else None),
+        ("catch_up_s", (caught_up[0] - since) if caught_up is not None else None),
+        ("blocks_per_s", None),
+    ])
+    if first is not None and caught_up is not None and caught_up[0] > first[0]:
+        result["blocks_per_s"] = (caught_up[1] - first[1]) / (caught_up[0] - first[0])
+    return result
+
+def print_fault_report(report: dict):
+    def fmt(value, spec="%.2f"):
+        return "-" if value is None else (spec % value)
+
+    print("")
+    print("Committed throughput: %s tx/s before the first fault, at least %s tx/s after it (dip %s), recovered to 90%% %s after the last fault" % (
+        fmt(report["baseline_committed_rate"], "%.1f"),
+        fmt(report["min_committed_rate"], "%.1f"),
+        fmt(report["throughput_dip"] * 100.0 if report["throughput_dip"] is not None else None, "%.0f%%"),
+        fmt(report["recovered_s"], "%.1fs"),
+    ))
+    print("")
+    print("%8s  %-10s  %-24s  %10s  %12s  %10s" % ("at (s)", "action", "nodes", "next block", "longest gap", "liveness"))
+    for event in report["events"]:
+        nodes = ", ".join(event["nodes"])
+        print("%8.1f  %-10s  %-24s  %10s  %12s  %10s" % (
+            event["at"],
+            event["action"],
+            nodes if len(nodes) <= 24 else nodes[:21] + "...",
+            fmt(event["next_block_s"], "%.2fs"),
+            fmt(event["longest_block_interval_s"], "%.2fs"),
+            fmt(event["liveness_regained_s"], "%.2fs"),
+        ))
+    catch_ups = [(event, catch_up) for event in report["events"] for catch_up in event["catch_up"]]
+    if catch_ups:
+        print("")
+        print("%8s  %-10s  %-10s  %8s  %10s  %10s" % ("at (s)", "action", "node", "behind", "catch-up", "blocks/s"))
+        for event, catch_up in catch_ups:
+            print("%8.1f  %-10s  %-10s  %8s  %10s  %10s" % (
+                event["at"],
+                event["action"],
+                catch_up["node"],
+                fmt(catch_up["behind"], "%d"),
+                fmt(catch_up["catch_up_s"], "%.2fs"),
+                fmt(catch_up["blocks_per_s"], "%.1f"),
+            ))
+    print("")
+
+# -----------------------------------------------------------------------------
+#
+#   Results Database
+#
+# -----------------------------------------------------------------------------
+
+class ResultsDB:
+    """A local database of load test runs, recording the binary, rendered
+    configuration and topology of the network each run was made against
+    along with the run's summary metrics, so that runs can be compared across
+    binaries."""
+
+    COLUMNS = [
+        ("started", "TEXT NOT NULL"),
+        ("chain_id", "TEXT"),
+        ("load_test", "TEXT NOT NULL"),
+        ("binary_hash", "TEXT"),
+        ("binary_label", "TEXT"),
+        ("binary_version", "TEXT"),
+        ("config_hash", "TEXT"),
+        ("config", "TEXT"),
+        ("consensus_params", "TEXT"),
+        ("topology", "TEXT"),
+        ("nodes", "INTEGER"),
+        ("local", "INTEGER"),
+        ("sent", "INTEGER"),
+        ("accepted", "INTEGER"),
+        ("failed", "INTEGER"),
+        ("duration", "REAL"),
+        ("accepted_rate", "REAL"),
+        ("latency_p50_us", "REAL"),
+        ("latency_p90_us", "REAL"),
+        ("latency_p99_us", "REAL"),
+        ("latency_mean_us", "REAL"),
+        ("timeseries", "TEXT"),
+        ("summary", "TEXT"),
+        ("run_path", "TEXT"),
+    ]
+
+    # Network startup times (see "network start --wait"), in seconds since
+    # the nodes were started
+    STARTUP_COLUMNS = [
+        ("started", "TEXT NOT NULL"),
+        ("chain_id", "TEXT"),
+        ("binary_hash", "TEXT"),
+        ("binary_label", "TEXT"),
+        ("binary_version", "TEXT"),
+        ("nodes", "INTEGER"),
+        ("local", "INTEGER"),
+        ("first_block_s", "REAL"),
+        ("all_first_block_s", "REAL"),
+        ("full_peering_s", "REAL"),
+        ("ready_s", "REAL"),
+        ("node_times", "TEXT"),
+    ]
+
+    def __init__(self, filename: str):
+        self.db = sqlite3.connect(filename)
+        self.db.row_factory = sqlite3.Row
+        for table, columns in [("runs", self.COLUMNS), ("startups", self.STARTUP_COLUMNS)]:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS %s (id INTEGER PRIMARY KEY AUTOINCREMENT, %s)" %
+                (table, ", ".join("%s %s" % column for column in columns))
+            )
+        self.db.execute("CREATE INDEX IF NOT EXISTS runs_binary ON runs (binary_label, binary_hash)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.db.close()
+
+    def record(self, run: dict) -> int:
+        """Stores the given run and returns its ID."""
+        return self.insert("runs", self.COLUMNS, run)
+
+    def record_startup(self, startup: dict) -> int:
+        """Stores the given network startup and returns its ID."""
+        return self.insert("startups", self.STARTUP_COLUMNS, startup)
+
+    def insert(self, table: str, columns: list, row: dict) -> int:
+        names = [name for name, _ in columns]
+        cursor = self.db.execute(
+            "INSERT INTO %s (%s) VALUES (%s)" % (table, ", ".join(names), ", ".join("?" for _ in names)),
+            [row.get(name, None) for name in names],
+        )
+        self.db.commit()
+        return cursor.lastrowid
+
+    def runs(self, binary: str = None, load_test: str = None, limit: int = 10) -> List[dict]:
+        """Returns the most recent runs, newest first, optionally only those
+        of the given load test and/or binary. A binary is identified by its
+        label, or failing that its version, or failing that a prefix of its
+        hash (the same binary may be run under several labels)."""
+        if binary is None:
+            return self.query("", [], load_test, limit)
+        for condition, value in [
+            ("binary_label = ?", binary),
+            ("binary_version = ?", binary),
+            ("binary_hash LIKE ?", binary.lower() + "%"),
+        ]:
+            runs = self.query(" AND " + condition, [value], load_test, limit)
+            if runs:
+                return runs
+        return []
+
+    def query(self, condition: str, params: list, load_test: str, limit: int) -> List[dict]:
+        query = "SELECT * FROM runs WHERE 1=1" + condition
+        params = list(params)
+        if load_test is not None:
+            query += " AND load_test = ?"
+            params.append(load_test)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self.db.execute(query, params)]
+
+def load_test_run_record(
+    cfg: "TestConfig",
+    summary: dict,
+    timeseries: List[List[int]],
+    run_path: str,
+    local: bool = False,
+    label: str = None,
+) -> dict:
+    """Describes a completed load test run, and the network it was run
+    against, for the results database."""
+    workdir = local_network_path(cfg) if local else os.path.join(cfg.home, "tendermint")
+    node_config_path = os.path.join(workdir, "nodes" if local else "config", "node0", "config")
+    config = None
+    consensus_params = None
+    if os.path.isfile(os.path.join(node_config_path, "config.toml")):
+        config = normalized_node_config(load_toml_config(os.path.join(node_config_path, "config.toml")))
+        with open(os.path.join(node_config_path, "genesis.json"), "rt") as f:
+            consensus_params = json.load(f).get("consensus_params", None)
+    topology = cfg.topology._asdict() if cfg.topology is not None else None
+    if os.path.isfile(os.path.join(workdir, "topology.json")):
+        topology = load_json_config(os.path.join(workdir, "topology.json"))
+        topology.pop("peers", None)
+    nodes = None
+    if os.path.isfile(os.path.join(workdir, "inventory")):
+        nodes = len(load_ansible_inventory(os.path.join(workdir, "inventory")).get("tendermint", []))
+
+    binary_hash, label, binary_version = deployed_binary_label(cfg, local, label)
+
+    latency = summary["latency_us"]
+    return {
+        "started": datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "chain_id": cfg.id,
+        "load_test": summary["load_test"]["id"],
+        "binary_hash": binary_hash,
+        "binary_label": label,
+        "binary_version": binary_version,
+        "config_hash": hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest() if config is not None else None,
+        "config": json.dumps(config, sort_keys=True) if config is not None else None,
+        "consensus_params": json.dumps(consensus_params) if consensus_params is not None else None,
+        "topology": json.dumps(topology) if topology is not None else None,
+        "nodes": nodes,
+        "local": int(local),
+        "sent": summary["sent"],
+        "accepted": summary["accepted"],
+        "failed": summary["failed"],
+        "duration": summary["duration"],
+        "accepted_rate": summary["accepted_rate"],
+        "latency_p50_us": latency["p50"],
+        "latency_p90_us": latency["p90"],
+        "latency_p99_us": latency["p99"],
+        "latency_mean_us": latency["mean"],
+        "timeseries": json.dumps(timeseries),
+        "summary": json.dumps(summary),
+        "run_path": run_path,
+    }
+
+def normalized_node_config(config: dict) -> dict:
+    """Strips the node-specific parameters from the given node configuration,
+    leaving those that are common to the whole network."""
+    result = deepcopy(config)
+    for section, keys in NODE_SPECIFIC_CONFIG.items():
+        if keys is None:
+            result.pop(section, None)
+        elif isinstance(result.get(section, None), dict):
+            for key in keys:
+                result[section].pop(key, None)
+    return result
+
+def deployed_binary(cfg: "TestConfig", local: bool = False):
+    """Returns the hash of the Tendermint binary that the network is running,
+    along with the path to a local copy of it (if any)."""
+    if local:
+        path = local_tendermint_binary()
+        return hash_file(path), path
+    manifest = load_deploy_manifest(os.path.join(cfg.home, "tendermint", "deploy-manifest.json"))
+    path = TENDERMINT_SOURCE_BINARY if os.path.isfile(TENDERMINT_SOURCE_BINARY) else None
+    binary_hash = manifest.get("binary", None)
+    if binary_hash is None and path is not None:
+        binary_hash = hash_file(path)
+    return binary_hash, path
+
+def deployed_binary_label(cfg: "TestConfig", local: bool = False, label: str = None):
+    """Returns the hash, label and version of the Tendermint binary that the
+    network is running. Unless a label is given, the binary is labelled with
+    its name in the test plan's tendermint_binaries, or its version."""
+    binary_hash, binary_path = deployed_binary(cfg, local)
+    binary_version = tendermint_binary_version(binary_path) if binary_path is not None else None
+    if label is None and binary_hash is not None:
+        for name, path in cfg.tendermint_binaries.items():
+            if os.path.isfile(path) and hash_file(path) == binary_hash:
+                label = name
+                break
+    if label is None:
+        label = binary_version or (binary_hash[:12] if binary_hash is not None else None)
+    return binary_hash, label, binary_version
+
+def tendermint_binary_version(path: str) -> str:
+    try:
+        output = subprocess.run([path, "version"], capture_output=True, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    lines = output.decode("utf-8", errors="replace").strip().splitlines()
+    return lines[0].strip() if lines else None
+
+def steady_state_rates(runs: List[dict]) -> List[float]:
+    """Returns the median per-second accepted transaction rate over the
+    steady state of each of the given runs. Consecutive seconds of a run are
+    not independent of each other, so each run contributes a single sample."""
+    rates = []
+    for run in runs:
+        accepted = np.array([row[2] for row in json.loads(run["timeseries"] or "[]")], dtype=np.float64)
+        start, end = detect_steady_state(accepted)
+        if end - start < 2:
+            # too short to find a steady state, so just drop the partial
+            # first and last seconds
+            start, end = min(1, len(accepted) // 3), max(len(accepted) - 1, len(accepted) - len(accepted) // 3)
+        if end > start:
+            rates.append(float(np.median(accepted[start:end])))
+    return rates
+
+def compare_runs(baseline: List[dict], candidate: List[dict], alpha: float = 0.05, threshold: float = 0.05) -> List[dict]:
+    """Compares each metric's per-run values from the baseline and candidate
+    runs with a two-sided Mann-Whitney U test. There must be enough runs on
+    each side for a difference to be able to reach significance (e.g. 4 of
+    each at an alpha of 0.05). A metric regresses if it differs significantly
+    and its median is worse by more than the threshold."""
+    result = []
+    for metric, higher_is_better, samples in RUN_COMPARISON_METRICS:
+        a, b = samples(baseline), samples(candidate)
+        comparison = OrderedDict([
+            ("metric", metric),
+            ("baseline", float(np.median(a)) if a else None),
+            ("candidate", float(np.median(b)) if b else None),
+            ("change", None),
+            ("p_value", None),
+            ("verdict", "insufficient data"),
+        ])
+        if a and b and mann_whitney_min_p(len(a), len(b)) < alpha:
+            _, p_value = mann_whitney_u(a, b)
+            change = (comparison["candidate"] - comparison["baseline"]) / comparison["baseline"] if comparison["baseline"] else 0.0
+            worse = -change if higher_is_better else change
+            comparison["change"] = change
+            comparison["p_value"] = p_value
+            if p_value >= alpha or abs(change) < threshold:
+                comparison["verdict"] = "no significant change"
+            else:
+                comparison["verdict"] = "regression" if worse > 0 else "improvement"
+        result.append(comparison)
+    return result
+
+def mann_whitney_u(a: List[float], b: List[float]):
+    """Computes the Mann-Whitney U statistic of the two samples and its two-
+    sided p-value. The p-value is exact for small samples without ties, and
+    otherwise uses the normal approximation with tie and continuity
+    corrections."""
+    n1, n2 = len(a), len(b)
+    values = np.concatenate([np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)])
+    order = np.argsort(values, kind="mergesort")
+    sorted_values = values[order]
+    # average the ranks of tied values
+    _, first, counts = np.unique(sorted_values, return_index=True, return_counts=True)
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[order] = np.repeat(first + (counts + 1) / 2.0, counts)
+    u1 = ranks[:n1].sum() - n1 * (n1 + 1) / 2.0
+    if len(counts) == n1 + n2 and n1 * n2 <= MANN_WHITNEY_EXACT_MAX_PAIRS:
+        return u1, mann_whitney_exact_p(u1, n1, n2)
+    n = n1 + n2
+    mean = n1 * n2 / 2.0
+    variance = n1 * n2 / 12.0 * ((n + 1) - (counts ** 3 - counts).sum() / (n * (n - 1)))
+    if variance <= 0:
+        return u1, 1.0
+    z = (abs(u1 - mean) - 0.5) / np.sqrt(variance)
+    return u1, float(min(1.0, math.erfc(max(z, 0.0) / np.sqrt(2))))
+
+def mann_whitney_exact_p(u: float, n1: int, n2: int) -> float:
+    """Returns the exact two-sided p-value of the Mann-Whitney U statistic of
+    two samples of the given sizes without ties, from the number of
+    orderings of the samples that give each value of U."""
+    # dist[j] is the distribution of U for samples of sizes i and j: the
+    # largest value either comes from the first sample, adding j to U, or
+    # from the second, adding nothing
+    dist = [np.ones(1) for _ in range(n2 + 1)]
+    for i in range(1, n1 + 1):
+        row = [np.ones(1)]
+        for j in range(1, n2 + 1):
+            counts = np.zeros(i * j + 1)
+            counts[:len(row[j - 1])] += row[j - 1]
+            counts[j:j + len(dist[j])] += dist[j]
+            row.append(counts)
+        dist = row
+    k = int(min(u, n1 * n2 - u))
+    return float(min(1.0, 2 * dist[n2][:k + 1].sum() / dist[n2].sum()))
+
+def mann_whitney_min_p(n1: int, n2: int) -> float:
+    """Returns the smallest two-sided p-value that a Mann-Whitney U test of
+    samples of the given sizes can give (when they don't overlap at all)."""
+    return 2.0 / math.comb(n1 + n2, n1)
+
+def print_results_runs(runs: List[dict]):
+    print("")
+    print("%5s  %-20s  %-12s  %-24s  %5s  %10s  %8s  %8s" % ("id", "started", "load test", "binary", "nodes", "tx/s", "p50 ms", "p99 ms"))
+    for run in runs:
+        print("%5d  %-20s  %-12s  %-24s  %5s  %10.1f  %8.1f  %8.1f" % (
+            run["id"], run["started"], run["load_test"][:12], (run["binary_label"] or "")[:24],
+            run["nodes"] if run["nodes"] is not None else "", run["accepted_rate"],
+            run["latency_p50_us"] / 1000.0, run["latency_p99_us"] / 1000.0,
+        ))
+    print("")
+
+def print_run_comparison(baseline: str, candidate: str, baseline_runs: int, candidate_runs: int, comparisons: List[dict]):
+    print("")
+    print("Baseline: %s (%d run(s)), candidate: %s (%d run(s))" % (baseline, baseline_runs, candidate, candidate_runs))
+    print("%-30s  %12s  %12s  %8s  %8s  %s" % ("metric", "baseline", "candidate", "change", "p", "verdict"))
+    for c in comparisons:
+        print("%-30s  %12s  %12s  %8s  %8s  %s" % (
+            c["metric"],
+            "%.2f" % c["baseline"] if c["baseline"] is not None else "-",
+            "%.2f" % c["candidate"] if c["candidate"] is not None else "-",
+            "%+.1f%%" % (c["change"] * 100) if c["change"] is not None else "-",
+            "%.4f" % c["p_value"] if c["p_value"] is not None else "-",
+            c["verdict"],
+        ))
+    print("")
+
+# -----------------------------------------------------------------------------
+#
+#   RPC Client
+#
+# -----------------------------------------------------------------------------
+
+class RPCClient:
+    """A minimal asyncio JSON-RPC client for Tendermint's RPC endpoint, which
+    keeps a single persistent HTTP/1.1 connection open. Requests are
+    pipelined: several calls may be in flight on the connection at once, and
+    their responses are matched to them in order."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        parsed = urllib.parse.urlparse(url if "://" in url else "http://%s" % url)
+        self.url = url
+        self.host = parsed.hostname
+        self.port = parsed.port or TENDERMINT_RPC_PORT
+        self.path = parsed.path or "/"
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.read_task = None
+        self.pending = collections.deque()
+        self.connect_lock = asyncio.Lock()
+        self.next_id = 0
+
+    async def connect(self):
+        async with self.connect_lock:
+            if self.writer is not None:
+                return
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port),
+                self.timeout,
+            )
+            self.read_task = asyncio.ensure_future(self.read_responses(self.reader))
+
+    async def close(self):
+        if self.read_task is not None:
+            self.read_task.cancel()
+        self.disconnect(Exception("Connection closed"))
+
+    def disconnect(self, err: Exception):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader, self.writer, self.read_task = None, None, None
+        while self.pending:
+            fut = self.pending.popleft()
+            if not fut.done():
+                fut.set_exception(err)
+
+    async def call(self, method: str, params: dict = None):
+        """Calls the given RPC method, returning its result. Raises an
+        exception if the call fails or the RPC returns an error."""
+        if self.writer is None:
+            await self.connect()
+        self.next_id += 1
+        body = json.dumps({
+            "jsonrpc": "2.0",
+            "id": self.next_id,
+            "method": method,
+            "params": params or dict(),
+        }).encode("utf-8")
+        fut = asyncio.get_running_loop().create_future()
+        self.pending.append(fut)
+        self.writer.write(
+            b"POST %s HTTP/1.1\r\nHost: %s:%d\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (
+                self.path.encode("utf-8"), self.host.encode("utf-8"), self.port, len(body), body,
+            ),
+        )
+        await self.writer.drain()
+        response = await asyncio.wait_for(fut, self.timeout)
+        if response.get("error"):
+            raise Exception("RPC call to %s failed: %s" % (method, response["error"]))
+        return response.get("result", dict())
+
+    async def read_responses(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                status, body = await read_http_response(reader)
+                if not self.pending:
+                    raise Exception("Unexpected response from %s" % self.url)
+                fut = self.pending.popleft()
+                if fut.done():
+                    continue
+                if status != 200 and not body:
+                    fut.set_exception(Exception("HTTP request to %s failed with status %d" % (self.url, status)))
+                else:
+                    fut.set_result(json.loads(body))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if reader is self.reader:
+                self.disconnect(e)
+
+async def read_http_response(reader: asyncio.StreamReader):
+    """Reads a single HTTP/1.1 response from the given stream, returning its
+    status code and body."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise Exception("Connection closed by server")
+    status = int(status_line.split(b" ", 2)[1])
+    headers = dict()
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get(b"transfer-encoding", b"").lower() == b"chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    elif b"content-length" in headers:
+        body = await reader.readexactly(int(headers[b"content-length"]))
+    else:
+        body = await reader.read()
+    return status, body
+
+async def websocket_connect(url: str, timeout: float = 10.0):
+    """Opens a client websocket connection (RFC 6455) to the given URL,
+    returning its stream reader and writer once the handshake completes."""
+    parsed = urllib.parse.urlparse(url)
+    host, port = parsed.hostname, parsed.port or TENDERMINT_RPC_PORT
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    writer.write(
+        b"GET %s HTTP/1.1\r\nHost: %s:%d\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: %s\r\nSec-WebSocket-Version: 13\r\n\r\n" % (
+            (parsed.path or "/").encode("utf-8"), host.encode("utf-8"), port, base64.b64encode(os.urandom(16)),
+        ),
+    )
+    await writer.drain()
+    status_line = await asyncio.wait_for(reader.readline(), timeout)
+    if b" 101 " not in status_line:
+        writer.close()
+        raise Exception("Websocket handshake with %s failed: %s" % (url, status_line.decode("utf-8", errors="replace").strip()))
+    while (await asyncio.wait_for(reader.readline(), timeout)) not in {b"\r\n", b""}:
+        pass
+    return reader, writer
+
+def websocket_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    """Builds a single, final, masked client frame carrying the given
+    payload."""
+    mask = os.urandom(4)
+    n = len(payload)
+    if n < 126:
+        header = struct.pack(">BB", 0x80 | opcode, 0x80 | n)
+    elif n < (1 << 16):
+        header = struct.pack(">BBH", 0x80 | opcode, 0x80 | 126, n)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 0x80 | 127, n)
+    return header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+async def websocket_recv(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bytes:
+    """Reads the next complete (possibly fragmented) data message from the
+    given websocket connection, answering any pings along the way."""
+    message = b""
+    while True:
+        b0, b1 = await reader.readexactly(2)
+        opcode, n = b0 & 0x0F, b1 & 0x7F
+        if n == 126:
+            n = struct.unpack(">H", await reader.readexactly(2))[0]
+        elif n == 127:
+            n = struct.unpack(">Q", await reader.readexactly(8))[0]
+        mask = (await reader.readexactly(4)) if b1 & 0x80 else None
+        payload = await reader.readexactly(n)
+        if mask is not None:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        if opcode == 0x8:
+            raise Exception("Connection closed by the server")
+        if opcode == 0x9:
+            writer.write(websocket_frame(payload, opcode=0xA))
+            continue
+        if opcode == 0xA:
+            continue
+        message += payload
+        if b0 & 0x80:
+            return message
+
+# -----------------------------------------------------------------------------
+#
+#   Remote Execution
+#
+# -----------------------------------------------------------------------------
+
+class SSHTransport:
+    """Executes commands on remote hosts through the system's OpenSSH client.
+    A multiplexed master connection is kept open per host, so that
+    subsequent commands to the same host don't pay for a new handshake."""
+
+    def __init__(self, control_path: str, user: str = None, persist: str = "10m", connect_timeout: int = 10):
+        ensure_path_exists(control_path)
+        self.control_path = control_path
+        self.user = user
+        self.persist = persist
+        self.connect_timeout = connect_timeout
+
+    def ssh_args(self, host: str) -> List[str]:
+        return [
+            "ssh",
+            "-o", "BatchMode=yes",
+            "-o", "StrictHostKeyChecking=no",
+            "-o", "ConnectTimeout=%d" % self.connect_timeout,
+            "-o", "ControlMaster=auto",
+            "-o", "ControlPath=%s" % os.path.join(self.control_path, "%C"),
+            "-o", "ControlPersist=%s" % self.persist,
+            ("%s@%s" % (self.user, host)) if self.user else host,
+        ]
+
+    async def run(self, host: str, cmd: str, stdin: bytes = None):
+        """Runs the given shell command on the given host. Returns a tuple
+        containing the command's return code and its combined output."""
+        return await run_subprocess(self.ssh_args(host) + [cmd], stdin=stdin)
+
+    async def spawn(self, host: str, cmd: str, pipe_stdin: bool = False):
+        """Starts the given shell command on the given host, returning the
+        process so that its output can be streamed (and, with `pipe_stdin`,
+        its input written)."""
+        return await spawn_subprocess(self.ssh_args(host) + [cmd], pipe_stdin=pipe_stdin)
+
+    async def close(self, hosts: List[str]):
+        """Shuts down the master connections to the given hosts."""
+        await asyncio.gather(*[
+            run_subprocess(self.ssh_args(host)[:-1] + ["-O", "exit", self.ssh_args(host)[-1]])
+            for host in hosts
+        ])
+
+class LocalTransport:
+    """A stand-in for SSHTransport that executes all commands on the local
+    machine, regardless of the host they are meant for. The target host is
+    made available to the command through the TMTEST_HOST environment
+    variable."""
+
+    async def run(self, host: str, cmd: str, stdin: bytes = None):
+        return await run_subprocess(
+            ["sh", "-c", cmd],
+            stdin=stdin,
+            env=dict(os.environ, TMTEST_HOST=host),
+        )
+
+    async def spawn(self, host: str, cmd: str, pipe_stdin: bool = False):
+        return await spawn_subprocess(["sh", "-c", cmd], env=dict(os.environ, TMTEST_HOST=host), pipe_stdin=pipe_stdin)
+
+    async def close(self, hosts: List[str]):
+        pass
+
+def default_transport(cfg: "TestConfig"):
+    return SSHTransport(
+        os.path.join(cfg.home, "ssh"),
+        user=os.environ.get("TMTEST_SSH_USER", None),
+    )
+
+async def run_subprocess(cmd: List[str], stdin: bytes = None, env: dict = None):
+    p = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        env=env,
+    )
+    try:
+        output, _ = await p.communicate(input=stdin)
+    except asyncio.CancelledError:
+        if p.returncode is None:
+            p.kill()
+        raise
+    return p.returncode, output.decode("utf-8", errors="replace")
+
+async def spawn_subprocess(cmd: List[str], env: dict = None, pipe_stdin: bool = False):
+    return await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=subprocess.PIPE if pipe_stdin else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+
+async def run_on_hosts(
+    transport,
+    entries: List[AnsibleInventoryEntry],
+    cmd,
+    timeout: float = 60.0,
+    concurrency: int = 256,
+    stdin: bytes = None,
+) -> List[HostResult]:
+    """Runs the given shell command on all of the given hosts at once, and
+    returns the per-host results in the same order as the given entries. The
+    command may also be given as a function that returns the command to run
+    for each entry."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def run_one(entry: AnsibleInventoryEntry) -> HostResult:
+        host_cmd = cmd if isinstance(cmd, str) else cmd(entry)
+        async with sem:
+            wall_start, start = time.time(), time.monotonic()
+            try:
+                returncode, output = await asyncio.wait_for(
+                    transport.run(entry.ansible_host, host_cmd, stdin=stdin),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                returncode, output = -1, "Timed out after %.1fs" % timeout
+            TRACER.add(
+                host_cmd if len(host_cmd) <= 60 else host_cmd[:57] + "...",
+                wall_start,
+                time.monotonic() - start,
+                track="host: %s" % entry.alias,
+                cat="remote",
+                args={"returncode": returncode},
+            )
+            return HostResult(
+                alias=entry.alias,
+                host=entry.ansible_host,
+                returncode=returncode,
+                output=output,
+                duration=time.monotonic() - start,
+                finished=time.monotonic(),
+            )
+
+    return await asyncio.gather(*[run_one(entry) for entry in entries])
+
+def log_host_results(results: List[HostResult]):
+    """Logs the outcome of each host's command execution and raises an
+    exception if any of them failed."""
+    failed = []
+    for result in results:
+        if result.returncode == 0:
+            logger.info("%s (%s): ok in %.2fs", result.alias, result.host, result.duration)
+        else:
+            logger.error("%s (%s): failed with return code %d in %.2fs\n%s",
+                result.alias, result.host, result.returncode, result.duration, result.output.rstrip())
+            failed.append(result.alias)
+    if failed:
+        raise Exception("Command failed on %d host(s): %s" % (len(failed), ", ".join(failed)))
+
+def remote_become(cmd: str) -> str:
+    """Wraps the given command such that it runs as root on the remote host,
+    using sudo only when we haven't logged in as root."""
+    return 'if [ "$(id -u)" -eq 0 ]; then %s; else sudo -n %s; fi' % (cmd, cmd)
+
+def set_tendermint_nodes_state(
+    cfg: "TestConfig",
+    workdir: str,
+    state: str,
+    node_or_group_ids: List[str] = None,
+    fail_on_missing: bool = True,
+    transport=None,
+    **kwargs,
+):
+    """Ensures that the Tendermint service on all of the referenced nodes (or
+    all nodes, if no references are given) is set to the desired state. All
+    hosts are contacted concurrently. Returns the (monotonic) time at which
+    each node's service command returned, by alias."""
+    valid_states = {"started": "start", "stopped": "stop", "restarted": "restart"}
+    if state not in valid_states:
+        raise Exception("Desired service state must be one of: %s" % ",".join(valid_states))
+    state_verb = "starting" if state in {"started", "restarted"} else "stopping"
+
+    inventory = load_ansible_inventory(os.path.join(workdir, "inventory"))
+    entries = resolve_inventory_entries(inventory, node_or_group_ids or [], fail_on_missing)
+    transport = transport or default_transport(cfg)
+    logger.info("%s %d host(s)", state_verb.capitalize(), len(entries))
+    start = time.monotonic()
+    results = asyncio.run(run_on_hosts(
+        transport,
+        entries,
+        remote_become("systemctl %s tendermint" % valid_states[state]),
+    ))
+    log_host_results(results)
+    logger.info("Hosts' state successfully set to \"%s\" in %.2fs", state, time.monotonic() - start)
+    return OrderedDict((result.alias, result.finished) for result in results)
+
+def resolve_inventory_entries(
+    inventory: OrderedDictType[str, List[AnsibleInventoryEntry]],
+    node_or_group_ids: List[str],
+    fail_on_missing: bool = True,
+    default_group: str = "tendermint",
+) -> List[AnsibleInventoryEntry]:
+    """Resolves the given list of group names, host aliases and/or indexed
+    group references (e.g. "tendermint[0]") to the inventory entries they
+    refer to. An empty list refers to all hosts in the default group."""
+    all_entries = OrderedDict()
+    for entries in inventory.values():
+        for entry in entries:
+            all_entries[entry.alias] = entry
+    if not node_or_group_ids:
+        return list(inventory.get(default_group, []))
+
+    result = OrderedDict()
+    for ref in node_or_group_ids:
+        indexed = INDEXED_GROUP_REF_RE.match(ref)
+        if ref in inventory:
+            for entry in inventory[ref]:
+                result[entry.alias] = entry
+        elif indexed and indexed.group("group") in inventory and \
+                int(indexed.group("index")) < len(inventory[indexed.group("group")]):
+            entry = inventory[indexed.group("group")][int(indexed.group("index"))]
+            result[entry.alias] = entry
+        elif ref in all_entries:
+            result[ref] = all_entries[ref]
+        elif fail_on_missing:
+            raise Exception("Unrecognized node or group ID: %s" % ref)
+        else:
+            logger.warning("Skipping unrecognized node or group ID: %s", ref)
+    return list(result.values())
+
+# -----------------------------------------------------------------------------
+#
+#   Utilities
+#
+# -----------------------------------------------------------------------------
+
+def sh(cmd, env=None):
+    logger.info("Executing command: %s" % " ".join(cmd))
+    with phase_timer(" ".join(os.path.basename(part) for part in cmd[:1] + cmd[-1:])), \
+            subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env) as p:
+        print("")
+        for line in p.stdout:
+            print(line.decode("utf-8").rstrip(), flush=True)
+        p.wait()
+        print("")
+    
+        if p.returncode != 0:
+            raise Exception("Process failed with return code %d" % p.returncode)
+
+
+def configure_logging(verbose=False):
+    """Supercharge our logger."""
+    handler = colorlog.StreamHandler()
+    handler.setFormatter(
+        colorlog.ColoredFormatter(
+            "%(log_color)s%(asctime)s\t%(levelname)s\t%(message)s",
+            log_colors={
+                "DEBUG": "cyan",
+                "INFO": "green",
+                "WARNING": "bold_yellow",
+                "ERROR": "bold_red",
+                "CRITICAL": "bold_red",
+            }
+        ),
+    )
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+def print_trace_summary(rows: List[tuple]):
+    print("")
+    print("%-10s %-50s %6s %10s %10s %10s" % ("category", "name", "count", "total (s)", "mean (s)", "max (s)"))
+    for cat, name, count, total, mean, longest in rows:
+        print("%-10s %-50s %6d %10.3f %10.3f %10.3f" % (cat, name[:50], count, total, mean, longest))
+    print("")
+
+def phase_timer(name: str):
+    """Returns a context manager that logs how long the enclosed phase of
+    work took, and records it in the trace when profiling."""
+    return PhaseTimer(name)
+
+class PhaseTimer:
+    def __init__(self, name: str):
+        self.name = name
+        self.start = None
+        self.duration = None
+
+    def __enter__(self):
+        self.wall_start = time.time()
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *args):
+        self.duration = time.monotonic() - self.start
+        TRACER.add(self.name, self.wall_start, self.duration)
+        logger.info("Phase \"%s\" took %.2fs", self.name, self.duration)
+
+def link_or_copy(src: str, dest: str):
+    """Hard-links the given file to the given destination, replacing any
+    existing file there, or copies it if it can't be hard-linked."""
+    if os.path.lexists(dest):
+        if os.path.samefile(src, dest):
+            return
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+def hash_file(filename: str, cache: dict = None) -> str:
+    """Computes the SHA256 hash of the given file's contents. If a cache is
+    given, files that have already been hashed (including other hard links
+    to the same file) are not hashed again."""
+    if cache is not None:
+        st = os.stat(filename)
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        if key not in cache:
+            cache[key] = hash_file(filename)
+        return cache[key]
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1024*1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def hash_directory(path: str, cache: dict = None) -> str:
+    """Computes a SHA256 hash over the relative paths and contents of all of
+    the files in the given directory tree."""
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            full_path = os.path.join(root, filename)
+            h.update(os.path.relpath(full_path, path).encode("utf-8"))
+            h.update(b"\0")
+            h.update(hash_file(full_path, cache).encode("utf-8"))
+    return h.hexdigest()
+
+class LatencyHistogram:
+    """A compact, mergeable histogram of non-negative integer values (e.g.
+    latencies in microseconds), in the spirit of HdrHistogram. Each
+    power-of-two range of values is split into a fixed number of linear
+    buckets, so values are recorded with a bounded relative error. Only
+    non-empty buckets are stored, and histograms from different processes or
+    hosts can be merged exactly by adding up their bucket counts."""
+
+    def __init__(self, precision_bits: int = HISTOGRAM_PRECISION_BITS):
+        self.precision_bits = precision_bits
+        self.sub_buckets = 1 << precision_bits
+        self.half_sub_buckets = self.sub_buckets >> 1
+        self.counts = collections.Counter()
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def bucket_index(self, value: int) -> int:
+        if value < self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return self.sub_buckets + (shift - 1) * self.half_sub_buckets + ((value >> shift) - self.half_sub_buckets)
+
+    def bucket_value(self, index: int) -> int:
+        """Returns the value in the middle of the range covered by the bucket
+        with the given index."""
+        if index < self.sub_buckets:
+            return index
+        shift = (index - self.sub_buckets) // self.half_sub_buckets + 1
+        mantissa = (index - self.sub_buckets) % self.half_sub_buckets + self.half_sub_buckets
+        return (mantissa << shift) + ((1 << shift) >> 1)
+
+    def record(self, value: int, count: int = 1):
+        value = max(0, int(value))
+        self.counts[self.bucket_index(value)] += count
+        self.total += count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram"):
+        if other.precision_bits != self.precision_bits:
+            raise Exception("Cannot merge histograms of different precision (%d != %d)" % (other.precision_bits, self.precision_bits))
+        self.counts.update(other.counts)
+        self.total += other.total
+        for value in [other.min, other.max]:
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, p: float) -> int:
+        if self.total == 0:
+            return 0
+        rank = max(1, int(-(-p * self.total // 100)))
+        seen = 0
+        for index in sorted(self.counts.keys()):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self.bucket_value(index), self.min), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        if self.total == 0:
+            return 0.0
+        return sum(self.bucket_value(index) * count for index, count in self.counts.items()) / self.total
+
+    def summary(self) -> dict:
+        return OrderedDict([
+            ("count", self.total),
+            ("mean", self.mean()),
+            ("min", self.min or 0),
+            ("p50", self.percentile(50)),
+            ("p90", self.percentile(90)),
+            ("p99", self.percentile(99)),
+            ("p999", self.percentile(99.9)),
+            ("max", self.max or 0),
+        ])
+
+    def to_dict(self) -> dict:
+        return {
+            "precision_bits": self.precision_bits,
+            "min": self.min,
+            "max": self.max,
+            "counts": dict((str(index), count) for index, count in sorted(self.counts.items())),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LatencyHistogram":
+        histogram = cls(precision_bits=d["precision_bits"])
+        for index, count in d["counts"].items():
+            histogram.counts[int(index)] += count
+            histogram.total += count
+        histogram.min = d["min"]
+        histogram.max = d["max"]
+        return histogram
+
+def parse_rfc3339(ts: str) -> datetime.datetime:
+    """Parses an RFC3339 timestamp as produced by Tendermint, which may have
+    nanosecond precision (truncated here to microseconds)."""
+    m = re.match(r"^(?P<base>[^.Z+]+)(?:\.(?P<frac>\d+))?(?P<tz>Z|[+-]\d\d:\d\d)?$", ts)
+    if m is None:
+        raise Exception("Invalid timestamp: %s" % ts)
+    frac = ("." + m.group("frac")[:6]) if m.group("frac") else ""
+    tz = m.group("tz") or "Z"
+    return datetime.datetime.fromisoformat(m.group("base") + frac + ("+00:00" if tz == "Z" else tz))
+
+def summarize_values(values: List[float]) -> dict:
+    """Computes summary statistics (count, mean, min, max and percentiles)
+    for the given list of values."""
+    values = sorted(values)
+    if not values:
+        return OrderedDict([("count", 0), ("mean", 0.0), ("min", 0), ("p50", 0), ("p90", 0), ("p99", 0), ("max", 0)])
+    return OrderedDict([
+        ("count", len(values)),
+        ("mean", sum(values) / len(values)),
+        ("min", values[0]),
+        ("p50", percentile(values, 50)),
+        ("p90", percentile(values, 90)),
+        ("p99", percentile(values, 99)),
+        ("max", values[-1]),
+    ])
+
+def percentile(sorted_values: List[float], p: float):
+    """Returns the nearest-rank percentile `p` of the given sorted values."""
+    if not sorted_values:
+        return 0
+    rank = max(1, int(-(-p * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def save_toml_config(filename, cfg):
+    with open(filename, "wt") as f:
+        toml.dump(cfg, f)
+    logger.debug("Wrote configuration to %s", filename)
+
+def load_json_config(filename):
+    logger.debug("Loading JSON configuration file: %s", filename)
+    with open(filename, "rt") as f:
+        return json.load(f)
+
+def save_json_config(filename, cfg):
+    with open(filename, "wt") as f:
+        json.dump(cfg, f, indent=2)
+    logger.debug("Wrote configuration to %s", filename)
+
+def save_yaml_config(filename, cfg):
+    with open(filename, "wt") as f:
+        yaml.safe_dump(cfg, f)
+    logger.debug("Wrote configuration to %s", filename)
+
+def save_ansible_inventory(filename: str, inventory: OrderedDictType[str, List]):
+    """Writes the given inventory structure to an Ansible inventory file.
+    The `inventory` variable is an ordered mapping of group names to lists of
+    hostnames (plain strings) or AnsibleInventoryEntry instances.
+
+    If you use any AnsibleInventoryEntry instances in your inventory lists, the
+    `alias` property is required.
+    """
+    with open(filename, "wt") as f:
+        for group_name, entries in inventory.items():
+            f.write("[%s]\n" % group_name)
+            for entry in entries:
+                if isinstance(entry, str):
+                    f.write("%s\n" % entry)
+                elif isinstance(entry, AnsibleInventoryEntry):
+                    if entry.alias is None:
+                        raise Exception("Missing alias for Ansible inventory entry in group: %s" % group_name)
+                    line = "%s" % entry.alias
+                    if entry.ansible_host is not None:
+                        line += " ansible_host=%s" % entry.ansible_host
+                    if entry.node_id is not None:
+                        line += " node_id=%s" % entry.node_id
+                    f.write("%s\n" % line)
+                else:
+                    raise Exception("Unknown type for Ansible inventory entry: %s" % entry)
+                    
+            f.write("\n")
+
+def load_ansible_inventory(filename: str) -> OrderedDictType[str, List[AnsibleInventoryEntry]]:
+    """Loads an Ansible inventory file previously written by
+    save_ansible_inventory."""
+    inventory = OrderedDict()
+    group = None
+    with open(filename, "rt") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or line.startswith(";"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                group = line[1:-1]
+                inventory[group] = []
+                continue
+            if group is None:
+                raise Exception("Ansible inventory entry outside of a group in %s: %s" % (filename, line))
+            parts = shlex.split(line)
+            attrs = dict(part.split("=", 1) for part in parts[1:] if "=" in part)
+            inventory[group].append(
+                AnsibleInventoryEntry(
+                    alias=parts[0],
+                    ansible_host=attrs.get("ansible_host", parts[0]),
+                    node_id=attrs.get("node_id", None),
+                ),
+            )
+    return inventory
 
 def load_toml_config(filename):
     logger.debug("Loading TOML configuration file: %s", filename)
@@ -762,8 +7067,39 @@ def resolve_relative_path(path: str, base_path: str) -> str:
         return path
     return os.path.normpath(os.path.join(base_path, path))
 
-def tendermint_peer_id(host: str, address: str = None) -> str:
-    return ("%s@%s:26656" % (address, host)) if address is not None else ("%s:26656" % host)
+def tendermint_peer_id(host: str, address: str = None, port: int = TENDERMINT_P2P_PORT) -> str:
+    return ("%s@%s:%d" % (address, host, port)) if address is not None else ("%s:%d" % (host, port))
+
+def generate_ed25519_priv_key() -> bytes:
+    """Generates a new ed25519 private key in Tendermint's format, i.e. the 32
+    byte seed followed by the 32 byte public key."""
+    key = Ed25519PrivateKey.generate()
+    seed = key.private_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PrivateFormat.Raw,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    pub_key = key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw,
+    )
+    return seed + pub_key
+
+def generate_tendermint_priv_validator_key() -> TendermintNodePrivValidatorKey:
+    """Generates a new ed25519 validator key."""
+    priv_key = generate_ed25519_priv_key()
+    pub_key = priv_key[32:]
+    return TendermintNodePrivValidatorKey(
+        address=hashlib.sha256(pub_key).digest()[:20].hex().upper(),
+        pub_key=TendermintNodeKey(
+            type="tendermint/PubKeyEd25519",
+            value=base64.b64encode(pub_key).decode("utf-8"),
+        ),
+        priv_key=TendermintNodeKey(
+            type="tendermint/PrivKeyEd25519",
+            value=base64.b64encode(priv_key).decode("utf-8"),
+        ),
+    )
 
 def ed25519_pub_key_to_id(pub_key: bytes) -> str:
     """Converts the given ed25519 public key into a Tendermint-compatible ID."""